@@ -0,0 +1,52 @@
+import numpy
+
+from functools import cached_property
+
+from spacy.tokens import Doc
+from textblob import TextBlob
+
+from app.models.general import get_document_model, get_embedding_model
+from app.models.sentiment import get_vader_model
+
+
+class AnalysisContext:
+    """Lazily compute and share the expensive intermediates of a single request's content"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self._documents: dict[str, Doc] = {}
+
+    @classmethod
+    def batch(cls, contents: list[str], tasks: tuple=()) -> list["AnalysisContext"]:
+        """Return the context of each content, parsing the documents of each task in batches"""
+        contexts = [cls(content) for content in contents]
+        for task in tasks:
+            for context, document in zip(contexts, get_document_model().pipe(contents, task=task)):
+                context._documents[task] = document
+        return contexts
+
+    def document(self, task: str="full") -> Doc:
+        """Return the spacy Doc of the content processed for the given task"""
+        if task not in self._documents:
+            self._documents[task] = get_document_model()(self.content, task=task)
+        return self._documents[task]
+
+    @cached_property
+    def sentences(self) -> list[str]:
+        """Return the text of each sentence in the content"""
+        return [sentence.text for sentence in self.document("sentences").sents]
+
+    @cached_property
+    def blob_sentiment(self):
+        """Return the textblob (polarity, subjectivity) sentiment of the content"""
+        return TextBlob(self.content).sentiment
+
+    @cached_property
+    def vader_scores(self) -> dict[str, float]:
+        """Return the vader (neg, neu, pos, compound) scores of the content"""
+        return get_vader_model()(self.content)
+
+    @cached_property
+    def embedding(self) -> numpy.ndarray:
+        """Return the (1, dim) sentence embedding of the content"""
+        return get_embedding_model()([self.content])
@@ -1,7 +1,7 @@
-from app.core.common.generate import generate_summary
+from app.core.common.context import AnalysisContext
+from app.core.common.generate import generate_summaries
 from app.core.common.relevance import maximal_marginal_relevance, semantic_similarity
-from app.models.general import get_document_model
-from app.models.keyword import get_keyword_model
+from app.models.keyword import TOP_N, get_keyword_model
 from app.settings import get_settings
 
 from app.core.common.text import SAMPLE_TEXT
@@ -11,48 +11,49 @@ from app.core.common.text import SAMPLE_TEXT
 settings = get_settings()
 TAG_PROMPTS = settings.model.prompts.tag
 
-# Get module level variables
-doc_model = get_document_model()
-keyword_model = get_keyword_model(top_n=10)
 
-
-def extract_entities(content: str, top_n: int=5) -> list:
+def extract_entities(content: str, top_n: int=5, context: AnalysisContext=None) -> list:
     """Extract entities and return the top_n results"""
     # Extract entity tags from spacy pipeline
-    entities = list({entity.text.strip() for entity in doc_model(content).ents})
+    context = context if context else AnalysisContext(content)
+    entities = list({entity.text.strip() for entity in context.document("entities").ents})
 
     if len(entities):
-        entities, scores = semantic_similarity(content, entities)
+        entities, scores = semantic_similarity(content, entities, context.embedding)
         return entities[:top_n], scores[:top_n]
     else:
         return [], []
 
 
-def extract_keywords(content: str, top_n: int=10) -> list:
+def extract_keywords(content: str, top_n: int=10, context: AnalysisContext=None) -> list:
     """Extract entities and return the top_n most relevant results"""
     # Extract keywords and compare source relevance with cosine similiarty
-    candidates = keyword_model(content)
-    keywords, scores = semantic_similarity(content, candidates)
+    context = context if context else AnalysisContext(content)
+    candidates, embeddings = get_keyword_model(top_n=TOP_N)(content, context.embedding)
 
-    return keywords[:top_n], scores[:top_n]
+    if len(candidates):
+        keywords, scores = semantic_similarity(content, candidates, context.embedding, embeddings)
+        return keywords[:top_n], scores[:top_n]
+    else:
+        return [], []
 
 
-def extract_related(content: str, min_length: int=1, max_length: int=3, top_n: int=10) -> dict:
+def extract_related(content: str, min_length: int=1, max_length: int=3, top_n: int=10, context: AnalysisContext=None) -> dict:
     """Use language models to generate lists of related concepts and topics"""
-    # Generate related topics, themes, and concepts
-    tag_strings = []
-    for prompt in TAG_PROMPTS:
-        tag_strings += generate_summary(
-            content=content,
-            prompt=prompt,
-            format="list", 
-            max_new_tokens=top_n * 12, 
-            temperature=0.7
-        )
+    # Generate related topics, themes, and concepts for all prompts in a single batch
+    responses = generate_summaries(
+        [(content, prompt) for prompt in TAG_PROMPTS],
+        format="list", 
+        max_new_tokens=top_n * 12, 
+        max_items=top_n,
+        temperature=0.7
+    )
+    tag_strings = [tag for tags in responses for tag in tags]
 
     # Filter generated tag by length and return the top_n similarity results    
     candidates = [s for s in tag_strings if len(s.split()) >= min_length and len(s.split()) <= max_length]
-    tags, scores = maximal_marginal_relevance(content, candidates)
+    context = context if context else AnalysisContext(content)
+    tags, scores = maximal_marginal_relevance(content, candidates, content_embedding=context.embedding)
 
     return tags[:top_n], scores[:top_n]
 
@@ -1,5 +1,7 @@
 import re
 
+from typing import Iterator
+
 from app.settings import get_settings
 from app.models.generative import get_generative_model
 from app.core.common.text import SAMPLE_TEXT
@@ -9,39 +11,77 @@ from app.core.common.text import SAMPLE_TEXT
 settings = get_settings()
 DEFAULT_MODEL = settings.model.language_model
 DEFAULT_TEMPLATE = settings.model.prompts.template
+PREFIX_TEMPLATE = settings.model.prompts.prefix_template
+SUFFIX_TEMPLATE = settings.model.prompts.suffix_template
+PREFIX_CACHE = settings.model.inference.prefix_cache
 DEFAULT_KWARGS = settings.model.transformers.model_dump()
 
-# Load the tokenizer and model
-generator = get_generative_model()
+# Define the output formats parsed (and early stopped) as lists
+LIST_FORMATS = ("outline", "list", "points")
 
 
 def generate_response(content: str, prompt: str, delimiter: str="Output:", **kwargs) -> list[str]:
     """Generate a content summary string using a specified model and prompt"""
     # Apply the prompt template and generate the summary
     text_prompt = DEFAULT_TEMPLATE.format(prompt=prompt, content=content, delimiter=delimiter)
-    return generator(text_prompt, **kwargs)
+    return get_generative_model()(text_prompt, **kwargs)
 
 
-def generate_summary(content: str, prompt: str, format: str=None, tone: str=None, **kwargs) -> list[str]:
-    """Generate a summary with the provided prompt and parse the model output accordingly"""
-    # Add a conversational tone to the supplied prompt if requested
-    if tone: prompt += f" in a {tone} tone"
+def generate_responses(requests: list[tuple[str, str]], delimiter: str="Output:", **kwargs) -> list[list[str]]:
+    """Generate the responses of many (content, prompt) pairs in batched model calls"""
+    if PREFIX_CACHE:
+        return generate_prefixed_responses(requests, delimiter, **kwargs)
 
-    # Apply the prompt template and generate the summary text
-    if format:
-        # Use the supplied summary type as the generated text output delimeter
-        response = generate_response(content, prompt, delimiter=f"<|{format}|>:", **kwargs)
-    else:
-        # Use the default delimiter
-        response = generate_response(content, prompt, **kwargs)
-    
+    # Apply the prompt template to each pair and generate all responses together
+    text_prompts = [
+        DEFAULT_TEMPLATE.format(prompt=prompt, content=content, delimiter=delimiter) 
+        for content, prompt in requests
+    ]
+    return get_generative_model()(text_prompts, **kwargs) if text_prompts else []
+
+
+def generate_prefixed_responses(requests: list[tuple[str, str]], delimiter: str="Output:", **kwargs) -> list[list[str]]:
+    """Generate the responses of many (content, prompt) pairs, prefilling each distinct content once"""
+    # Group the prompts by content, preserving the original request order
+    groups: dict[str, list[int]] = {}
+    for i, (content, _) in enumerate(requests):
+        groups.setdefault(content, []).append(i)
+
+    responses = [None] * len(requests)
+    for content, indices in groups.items():
+        # Place the shared content first and each prompt instruction in the suffix
+        prefix = PREFIX_TEMPLATE.format(content=content)
+        suffixes = [SUFFIX_TEMPLATE.format(prompt=requests[i][1], delimiter=delimiter) for i in indices]
+        for i, response in zip(indices, get_generative_model()(suffixes, prefix=prefix, **kwargs)):
+            responses[i] = response
+
+    return responses
+
+
+def is_list_format(format: str=None) -> bool:
+    """Return True if the output format is parsed as a list of items"""
+    return bool(format) and format.lower() in LIST_FORMATS
+
+
+def item_pattern(format: str=None) -> str:
+    """Return the regex pattern separating the items of a generated response"""
     # Parse and format the generated text based on known special characters:
-    if format and format.lower() in ("outline", "list", "points"):
+    if is_list_format(format):
         # Split results on common list delimiters
-        regex_pattern = r"[.,:;<>\[\]`|\n*-]|\*\*|--|---"
+        return r"[.,:;<>\[\]`|\n*-]|\*\*|--|---"
     else:
         # Simply attempt to split results into sentences or phrases
-        regex_pattern = r"[.,:;<>\[\]`|\n]"
+        return r"[.,:;<>\[\]`|\n]"
+
+
+def clean_items(substrings: list[str]) -> list[str]:
+    """Strip the supplied substrings and drop any without alphabetic characters"""
+    return [s.strip() for s in substrings if s and re.search(r'[a-zA-Z]', s)]
+
+
+def parse_response(response: list[str], format: str=None) -> list[str]:
+    """Split the generated sequences into a list of summary items based on the output format"""
+    regex_pattern = item_pattern(format)
 
     # Return a list of extracted summary items
     parsed_list = []
@@ -49,11 +89,69 @@ def generate_summary(content: str, prompt: str, format: str=None, tone: str=None
         # Filter out empty or 1 character strings and strings without alphabetic characters
         if len(response_string) >= 2:
             substrings = re.split(regex_pattern, response_string)
-            parsed_list.extend([s.strip() for s in substrings if s and re.search(r'[a-zA-Z]', s)])
+            parsed_list.extend(clean_items(substrings))
 
     return parsed_list 
 
 
+def stream_summary(content: str, prompt: str, format: str=None, tone: str=None, max_items: int=None, **kwargs) -> Iterator[str]:
+    """Yield each parsed summary item as soon as the generated text completes it"""
+    # Add a conversational tone to the supplied prompt if requested
+    if tone: prompt += f" in a {tone} tone"
+    delimiter = f"<|{format}|>:" if format else "Output:"
+
+    # Stop decoding once the requested number of list items is complete
+    if max_items and is_list_format(format):
+        kwargs.update(max_items=max_items, item_pattern=item_pattern(format))
+
+    # Stream the generated text, prefilling the shared content prefix if enabled
+    generator = get_generative_model()
+    if PREFIX_CACHE:
+        suffix = SUFFIX_TEMPLATE.format(prompt=prompt, delimiter=delimiter)
+        chunks = generator(suffix, prefix=PREFIX_TEMPLATE.format(content=content), stream=True, **kwargs)
+    else:
+        text_prompt = DEFAULT_TEMPLATE.format(prompt=prompt, content=content, delimiter=delimiter)
+        chunks = generator(text_prompt, stream=True, **kwargs)
+
+    # Every substring followed by a delimiter is complete, the last one may still be growing
+    regex_pattern = item_pattern(format)
+    response_string, n_complete = "", 0
+    for chunk in chunks:
+        response_string += chunk
+        substrings = re.split(regex_pattern, response_string)
+        yield from clean_items(substrings[n_complete:-1])
+        n_complete = max(n_complete, len(substrings) - 1)
+
+    if len(response_string) >= 2:
+        yield from clean_items(re.split(regex_pattern, response_string)[n_complete:])
+
+
+def generate_summary(content: str, prompt: str, format: str=None, tone: str=None, max_items: int=None, **kwargs) -> list[str]:
+    """Generate a summary with the provided prompt and parse the model output accordingly"""
+    return generate_summaries([(content, prompt)], format=format, tone=tone, max_items=max_items, **kwargs)[0]
+
+
+def generate_summaries(requests: list[tuple[str, str]], format: str=None, tone: str=None, max_items: int=None, 
+        **kwargs) -> list[list[str]]:
+    """Generate a summary for each (content, prompt) pair in batches and parse each model output"""
+    # Add a conversational tone to the supplied prompts if requested
+    if tone: requests = [(content, prompt + f" in a {tone} tone") for content, prompt in requests]
+
+    # Stop decoding each sequence once the requested number of list items is complete
+    if max_items and is_list_format(format):
+        kwargs.update(max_items=max_items, item_pattern=item_pattern(format))
+
+    # Apply the prompt template and generate the summary text
+    if format:
+        # Use the supplied summary type as the generated text output delimeter
+        responses = generate_responses(requests, delimiter=f"<|{format}|>:", **kwargs)
+    else:
+        # Use the default delimiter
+        responses = generate_responses(requests, **kwargs)
+
+    return [parse_response(response, format) for response in responses]
+
+
 # Example usage and testing function
 def demo_generator():
     """Test the summarization function with different parameters"""
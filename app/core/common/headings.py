@@ -1,8 +1,10 @@
 import numpy
 
-from app.core.common.generate import generate_summary
+from typing import Any, Iterator
+
+from app.core.common.context import AnalysisContext
+from app.core.common.generate import generate_summary, generate_summaries, stream_summary
 from app.core.common.relevance import composite_scores
-from app.models.general import get_document_model
 from app.settings import get_settings
 
 from app.core.common.text import SAMPLE_TEXT
@@ -11,22 +13,18 @@ from app.core.common.text import SAMPLE_TEXT
 settings = get_settings()
 MODEL_PROMPTS = settings.model.prompts.model_dump()
 
-# Define module-level variables
-doc_model = get_document_model()
-
 
-def get_headings(content: str, heading: str, top_n: int) -> tuple[list, list]:
+def get_headings(content: str, heading: str, top_n: int, context: AnalysisContext=None) -> tuple[list, list]:
     """Generate a list of short heading summaries for the supplied content"""
     if not heading in MODEL_PROMPTS:
         raise ValueError(f"Supplied heading type '{heading}' is not a supported value.")
     
-    # Define common generation kwargs
-    generation_kwargs = dict(format="list", max_new_tokens=top_n * 12)
+    # Define common generation kwargs (stopping once top_n list items are generated)
+    generation_kwargs = dict(format="list", max_new_tokens=top_n * 12, max_items=top_n)
 
-    candidates = []
-    for prompt in MODEL_PROMPTS[heading][:-1]:
-        # Generate candidate tiles for each prompt
-        candidates += generate_summary(content=content, prompt=prompt, **generation_kwargs)
+    # Generate candidate titles for all prompts in a single batch
+    requests = [(content, prompt) for prompt in MODEL_PROMPTS[heading][:-1]]
+    candidates = [c for summaries in generate_summaries(requests, **generation_kwargs) for c in summaries]
 
     # Combine all generated titles into a new content string
     title_content = " ".join(candidates)
@@ -34,50 +32,52 @@ def get_headings(content: str, heading: str, top_n: int) -> tuple[list, list]:
     # Add some more variety detached from the source content
     re_prompt = MODEL_PROMPTS[heading][-1]
     candidates += generate_summary(content=title_content, prompt=re_prompt, **generation_kwargs)
-    candidates, scores = composite_scores(content=content, candidates=candidates)
+    context = context if context else AnalysisContext(content)
+    candidates, scores = composite_scores(content=content, candidates=candidates, content_embedding=context.embedding)
 
     return candidates[:top_n], scores[:top_n]
 
 
-def get_title(content: str, top_n: int=3) -> tuple[list, list]:
+def get_title(content: str, top_n: int=3, context: AnalysisContext=None) -> tuple[list, list]:
     """Generate a list of titles for the supplied content"""
-    return get_headings(content, heading="title", top_n=top_n)
+    return get_headings(content, heading="title", top_n=top_n, context=context)
 
 
-def get_subtitle(content: str, top_n: int=3) -> tuple[list, list]:
+def get_subtitle(content: str, top_n: int=3, context: AnalysisContext=None) -> tuple[list, list]:
     """Generate a list of short subtitles for the supplied content"""
-    return get_headings(content, heading="subtitle", top_n=top_n)
+    return get_headings(content, heading="subtitle", top_n=top_n, context=context)
 
 
-def get_description(content: str, top_n: int=3) -> tuple[list, list]:
+def get_description(content: str, top_n: int=3, context: AnalysisContext=None) -> tuple[list, list]:
     """Generate a list of short description summaries for the supplied content"""
-    return get_headings(content, heading="description", top_n=top_n)
+    return get_headings(content, heading="description", top_n=top_n, context=context)
 
 
-def get_outline(content: str, n_sections: int=3) -> list:
+def get_outline(content: str, n_sections: int=3, context: AnalysisContext=None) -> list:
     """Perform map-reduce sentence summarization to generate an outline"""
     # Split the supplied content string into individual sentences
-    content_sentences = [s.text for s in doc_model(content).sents]
+    context = context if context else AnalysisContext(content)
+    content_sentences = context.sentences
 
     if len(content_sentences) == 0:
         raise ValueError("Supplied content string must contain one or more sentences.")
 
     # Split the document into n_sections and iteratively combine sentences 
-    sections = []
-    n_sentences = int(numpy.ceil(len(content_sentences) / n_sections))
-    for i in range(0, n_sentences * n_sections, n_sentences):
-        sections.append(" ".join(content_sentences[i:i + n_sentences]))
+    sections = split_sections(content_sentences, n_sections)
 
     # Define outline-specific generation kwargs
     generation_kwargs = dict(format="list", max_new_tokens=32)
 
+    # Generate candidate summaries for every (section, prompt) pair in a single batch
+    prompts = MODEL_PROMPTS["description"][:-1]
+    requests = [(section, prompt) for section in sections for prompt in prompts]
+    responses = generate_summaries(requests, **generation_kwargs)
+
     # Generate candidate section descriptions
     section_summaries, section_scores = [], []
-    for section in sections:
-        # Generate candidate summaries for each prompt
-        section_candidates = []
-        for prompt in MODEL_PROMPTS["description"][:-1]:
-            section_candidates += generate_summary(content=section, prompt=prompt, **generation_kwargs)
+    for i, section in enumerate(sections):
+        section_responses = responses[i * len(prompts):(i + 1) * len(prompts)]
+        section_candidates = [c for summaries in section_responses for c in summaries]
         
         # Score and select the top_n descriptions for each section
         candidates, scores = composite_scores(content=section, candidates=section_candidates)
@@ -87,12 +87,73 @@ def get_outline(content: str, n_sections: int=3) -> list:
     return section_summaries, section_scores
 
 
+def split_sections(sentences: list[str], n_sections: int) -> list[str]:
+    """Combine consecutive sentences into n_sections sections of (roughly) equal length"""
+    sections = []
+    n_sentences = int(numpy.ceil(len(sentences) / n_sections))
+    for i in range(0, n_sentences * n_sections, n_sentences):
+        sections.append(" ".join(sentences[i:i + n_sentences]))
+    return sections
+
+
+def stream_headings(content: str, heading: str, top_n: int=3, context: AnalysisContext=None) -> Iterator[tuple[str, Any]]:
+    """Yield ("candidate", text) events as headings are generated and a final ("result", (headings, scores))"""
+    if not heading in MODEL_PROMPTS:
+        raise ValueError(f"Supplied heading type '{heading}' is not a supported value.")
+
+    # Define common generation kwargs (stopping once top_n list items are generated)
+    generation_kwargs = dict(format="list", max_new_tokens=top_n * 12, max_items=top_n)
+
+    candidates = []
+    for prompt in MODEL_PROMPTS[heading][:-1]:
+        # Emit each candidate as soon as the list parser can split it off
+        for candidate in stream_summary(content=content, prompt=prompt, **generation_kwargs):
+            candidates.append(candidate)
+            yield "candidate", candidate
+
+    # Add some more variety detached from the source content
+    title_content = " ".join(candidates)
+    re_prompt = MODEL_PROMPTS[heading][-1]
+    for candidate in stream_summary(content=title_content, prompt=re_prompt, **generation_kwargs):
+        candidates.append(candidate)
+        yield "candidate", candidate
+
+    context = context if context else AnalysisContext(content)
+    candidates, scores = composite_scores(content=content, candidates=candidates, content_embedding=context.embedding)
+    yield "result", (candidates[:top_n], scores[:top_n])
+
+
+def stream_outline(content: str, n_sections: int=3, context: AnalysisContext=None) -> Iterator[tuple[str, Any]]:
+    """Yield ("candidate", text) events as section summaries are generated and a final ("result", (outline, scores))"""
+    context = context if context else AnalysisContext(content)
+    if len(context.sentences) == 0:
+        raise ValueError("Supplied content string must contain one or more sentences.")
+
+    # Define outline-specific generation kwargs
+    generation_kwargs = dict(format="list", max_new_tokens=32)
+
+    section_summaries, section_scores = [], []
+    for section in split_sections(context.sentences, n_sections):
+        section_candidates = []
+        for prompt in MODEL_PROMPTS["description"][:-1]:
+            for candidate in stream_summary(content=section, prompt=prompt, **generation_kwargs):
+                section_candidates.append(candidate)
+                yield "candidate", candidate
+
+        # Score and select the top description for each section
+        candidates, scores = composite_scores(content=section, candidates=section_candidates)
+        section_summaries.append(candidates[0])
+        section_scores.append(scores[0])
+
+    yield "result", (section_summaries, section_scores)
+
+
 # Example usage and testing function
 def demo_headings():
     """Test the heading and section outline generation functionality"""
     print("\n=== Generate Headings ===")
     n_sections, top_n = 3, 5
-    for heading in MODEL_PROMPTS.keys():
+    for heading in ("title", "subtitle", "description"):
         result = get_headings(SAMPLE_TEXT, heading=heading, top_n=top_n)
         print(f"\nGenerated {heading}s:", result)
 
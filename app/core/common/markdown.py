@@ -0,0 +1,189 @@
+import hashlib
+import re
+import yaml
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from markdown_it import MarkdownIt
+
+from app.core.common.text import SAMPLE_TEXT
+
+
+# Define the markdown parser (commonmark with tables)
+MARKDOWN = MarkdownIt("commonmark").enable("table")
+
+# Map the opening token of each top-level block to its section type
+SECTION_TYPES = {
+    "heading_open": "heading",
+    "paragraph_open": "paragraph",
+    "bullet_list_open": "list",
+    "ordered_list_open": "list",
+    "table_open": "table",
+    "blockquote_open": "paragraph",
+    "fence": "paragraph",
+    "code_block": "paragraph",
+    "html_block": "paragraph",
+}
+
+# Match list item markers and the opening (or closing) line of a fenced code block
+LIST_MARKER = re.compile(r"^\s*([-*+]|\d+[.)])\s")
+FENCE_MARKER = re.compile(r"^\s*(`{3,}|~{3,})")
+
+
+@dataclass
+class ParsedSection:
+    """A typed top-level block of a markdown document"""
+    type: str
+    content: str
+    position: int
+    level: int | None = None
+
+    @property
+    def content_hash(self) -> str:
+        return content_hash(self.content)
+
+
+def content_hash(content: str) -> str:
+    """Return the sha256 hash of the whitespace-normalized content"""
+    return hashlib.sha256(" ".join(content.split()).encode("utf-8")).hexdigest()
+
+
+class SectionParser:
+    """Incrementally parse markdown text into typed sections as chunks of the document arrive
+
+    Lines are grouped into blocks at blank lines (outside fenced code, and unless the next line
+    continues a list), each completed block is parsed on its own as soon as it ends. The parser
+    only buffers the current block, callers decide whether to keep the text and sections.
+    """
+
+    def __init__(self):
+        self.frontmatter: dict | None = None
+        self._remainder = ""
+        self._block: list[str] = []
+        self._fence: str | None = None
+        self._pending_blank = False
+        self._frontmatter_lines: list[str] | None = None
+        self._started = False
+        self._position = 0
+
+    def feed(self, chunk: str) -> list[ParsedSection]:
+        """Consume a chunk of markdown text and return the sections it completed"""
+        lines = (self._remainder + chunk).split("\n")
+        self._remainder = lines.pop()
+        sections = []
+        for line in lines:
+            sections += self._feed_line(line.rstrip("\r"))
+        return sections
+
+    def close(self) -> list[ParsedSection]:
+        """Flush any buffered text and return the remaining sections"""
+        sections = self._feed_line(self._remainder.rstrip("\r")) if self._remainder else []
+        self._remainder = ""
+        if self._frontmatter_lines is not None:
+            # An unterminated frontmatter block is treated as content
+            self._block, self._frontmatter_lines = ["---"] + self._frontmatter_lines + self._block, None
+        return sections + self._flush()
+
+    def _feed_line(self, line: str) -> list[ParsedSection]:
+        # Collect a leading YAML frontmatter block
+        if not self._started:
+            self._started = True
+            if line.strip() == "---":
+                self._frontmatter_lines = []
+                return []
+        if self._frontmatter_lines is not None:
+            if line.strip() in ("---", "..."):
+                self.frontmatter = yaml.safe_load("\n".join(self._frontmatter_lines)) or {}
+                self._frontmatter_lines = None
+            else:
+                self._frontmatter_lines.append(line)
+            return []
+
+        # Keep fenced code blocks (including their blank lines) in a single block
+        if self._fence is not None:
+            self._block.append(line)
+            if line.strip().startswith(self._fence):
+                self._fence = None
+            return []
+
+        if not line.strip():
+            self._pending_blank = bool(self._block)
+            return []
+
+        sections = []
+        if self._pending_blank:
+            # A blank line ends the block unless the next line continues a list
+            is_indented = line.startswith((" ", "\t"))
+            is_list_item = bool(LIST_MARKER.match(line)) and bool(LIST_MARKER.match(self._block[0]))
+            if is_indented or is_list_item:
+                self._block.append("")
+            else:
+                sections = self._flush()
+            self._pending_blank = False
+
+        fence = FENCE_MARKER.match(line)
+        if fence:
+            self._fence = fence.group(1)
+        self._block.append(line)
+        return sections
+
+    def _flush(self) -> list[ParsedSection]:
+        """Parse the buffered block into one section per top-level markdown element"""
+        lines, self._block = self._block, []
+        self._pending_blank = False
+        if not lines:
+            return []
+
+        sections = []
+        tokens = MARKDOWN.parse("\n".join(lines))
+        for i, token in enumerate(tokens):
+            if token.level != 0 or token.nesting == -1 or token.map is None or token.type not in SECTION_TYPES:
+                continue
+            content = "\n".join(lines[token.map[0]:token.map[1]]).strip()
+            if not content:
+                continue
+
+            section_type, level = SECTION_TYPES[token.type], None
+            if section_type == "heading":
+                level = int(token.tag[1:])
+            elif token.type == "paragraph_open" and is_figure(tokens[i + 1]):
+                section_type = "figure"
+
+            sections.append(ParsedSection(type=section_type, content=content, position=self._position, level=level))
+            self._position += 1
+
+        return sections
+
+
+def is_figure(inline_token) -> bool:
+    """Return True if an inline paragraph only contains images"""
+    children = [
+        c for c in (inline_token.children or [])
+        if c.type not in ("softbreak", "hardbreak") and not (c.type == "text" and not c.content.strip())
+    ]
+    return bool(children) and all(c.type == "image" for c in children)
+
+
+def parse_sections(chunks: Iterable[str]) -> tuple[SectionParser, Iterator[ParsedSection]]:
+    """Return a parser and an iterator of the sections of markdown supplied in chunks"""
+    parser = SectionParser()
+
+    def iterate() -> Iterator[ParsedSection]:
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+        yield from parser.close()
+
+    return parser, iterate()
+
+
+# Example usage and testing function
+def demo_markdown():
+    """Test the markdown section parser on the sample text"""
+    parser, sections = parse_sections([f"# Sample\n\n{SAMPLE_TEXT}\n"])
+    for section in sections:
+        print(section.position, section.type, section.level, section.content[:60].replace("\n", " "))
+
+
+if __name__ == "__main__":
+    demo_markdown()
@@ -6,23 +6,19 @@ from app.models.sentiment import get_acceptability_model
 from app.models.general import get_embedding_model
 
 
-# Load a model fine-tuned on the CoLA dataset for linguistic acceptability scoring
-classifier = get_acceptability_model()
-
-# Define module level variables
-embedding_model = get_embedding_model()
-
-
-def composite_scores(content: str, candidates: list[str]) -> tuple:
+def composite_scores(content: str, candidates: list[str], content_embedding: numpy.ndarray=None) -> tuple:
     """Select candidates using compound (linguistic + similarity) scores"""
     # Filter out duplicate candidate headings
     candidates = list({s.lower() for s in candidates})
 
-    # Calculate linguistic acceptability scores for each candidate
-    linguistic_scores = numpy.array([classifier(candidate)['score'] for candidate in candidates])
+    # Calculate linguistic acceptability scores with a model fine-tuned on the CoLA dataset
+    classifier = get_acceptability_model()
+    linguistic_scores = numpy.array([result['score'] for result in classifier(candidates)])
 
     # Select the candidate with the highest compound (content similarity * linguistic) scores
-    content_embedding = embedding_model([content])
+    embedding_model = get_embedding_model()
+    if content_embedding is None:
+        content_embedding = embedding_model([content])
     candidate_embeddings = embedding_model(candidates)
     similarity_scores = cosine_similarity(content_embedding, candidate_embeddings).flatten()
     composite_scores = linguistic_scores * similarity_scores
@@ -34,45 +30,62 @@ def composite_scores(content: str, candidates: list[str]) -> tuple:
     return list(candidates), list(scores)
 
 
-def maximal_marginal_relevance(content: str, candidates: list, sim_lambda=0.5, top_n=10) -> tuple:
+def maximal_marginal_relevance(content: str, candidates: list, sim_lambda=0.5, top_n=10, content_embedding=None) -> tuple:
     """Select candidate words using maximal marginal relevance scoring"""
-    # Create embeddings
-    content_embedding = embedding_model([content])
-    candidate_embeddings = embedding_model(candidates)
+    if not len(candidates):
+        return [], []
+
+    # Create embeddings (reusing a precomputed content embedding if supplied)
+    embedding_model = get_embedding_model()
+    if content_embedding is None:
+        content_embedding = embedding_model([content])
+    candidate_embeddings = normalize_rows(embedding_model(candidates))
+    content_embedding = normalize_rows(content_embedding)
+
+    # Compute content and pairwise candidate cosine similarities once
+    similarities = (candidate_embeddings @ content_embedding.T).flatten()
+    pairwise_similarities = candidate_embeddings @ candidate_embeddings.T
 
     # Select the candidate with the highest similarity
-    similarities = cosine_similarity(content_embedding, candidate_embeddings).flatten()
+    selected_index = int(numpy.argmax(similarities))
+    selected, scores = [selected_index], [float(similarities[selected_index])]
+    available = numpy.ones(len(candidates), dtype=bool)
+    available[selected_index] = False
 
-    # List available candidates (candidate, embedding, similarity)
-    available_candidates = list(zip(candidates, candidate_embeddings, similarities))
-    selected_index = numpy.argmax(similarities)
-    selected = [available_candidates[selected_index]]
-    scores = [float(similarities[selected_index].item())]
-    available_candidates.pop(selected_index)
+    # Track each candidate's max similarity to the selected items
+    max_similarities = pairwise_similarities[selected_index].copy()
 
     for _ in range(top_n):
-        if not len(available_candidates): break
-        mmr_scores = []
-        for _, embedding, similarity in available_candidates:
-            # Calculate max similarities to selected items
-            max_similarity = max([cosine_similarity(embedding.reshape(1, -1), emb.reshape(1, -1)).flatten() for _, emb, _ in selected])
-            mmr_scores.append(sim_lambda * similarity - (1 - sim_lambda) * max_similarity)
-        
+        if not available.any(): break
+        mmr_scores = sim_lambda * similarities - (1 - sim_lambda) * max_similarities
+        mmr_scores[~available] = -numpy.inf
+
         # Select the next best candidate and remove it from the pool
-        mmr_scores = numpy.array(mmr_scores).flatten()
-        selected_index = numpy.argmax(mmr_scores)
-        scores.append(float(mmr_scores[selected_index].item()))
-        selected.append(available_candidates[selected_index])
-        available_candidates.pop(selected_index)
+        selected_index = int(numpy.argmax(mmr_scores))
+        scores.append(float(mmr_scores[selected_index]))
+        selected.append(selected_index)
+        available[selected_index] = False
+        max_similarities = numpy.maximum(max_similarities, pairwise_similarities[selected_index])
+
+    return [candidates[i] for i in selected], scores
 
-    return [s[0] for s in selected], scores
 
+def normalize_rows(embeddings: numpy.ndarray) -> numpy.ndarray:
+    """Return the supplied embeddings scaled to unit length"""
+    embeddings = numpy.atleast_2d(numpy.asarray(embeddings, dtype=numpy.float32))
+    norms = numpy.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / numpy.maximum(norms, 1e-12)
 
-def semantic_similarity(content: str, candidates: list) -> tuple:
+
+def semantic_similarity(content: str, candidates: list, content_embedding: numpy.ndarray=None, 
+        candidate_embeddings: numpy.ndarray=None) -> tuple:
     """Rank words by semantic similarity to text using embeddings"""
-    # Create embeddings
-    content_embedding = embedding_model([content])
-    candidate_embeddings = embedding_model(candidates)
+    # Create embeddings (reusing precomputed content and candidate embeddings if supplied)
+    embedding_model = get_embedding_model()
+    if content_embedding is None:
+        content_embedding = embedding_model([content])
+    if candidate_embeddings is None:
+        candidate_embeddings = embedding_model(candidates)
     
     # Calculate cosine similarity and create word-score pairs
     similarities = cosine_similarity(content_embedding, candidate_embeddings)[0]
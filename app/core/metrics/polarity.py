@@ -1,29 +1,29 @@
+from app.core.common.context import AnalysisContext
 from app.models.sentiment import get_polarity_model
-from app.models.general import get_document_model
 
 from app.core.common.text import NEGATIVE_TEXT, NEUTRAL_TEXT, POSITIVE_TEXT, SAMPLE_TEXT
 
 
-# Get module level variables
-polarity_model = get_polarity_model()
-doc_model = get_document_model()
-
-
-def score_polarity(content: str) -> dict[str, float]:
+def score_polarity(content: str, context: AnalysisContext=None) -> dict[str, float]:
     """Compute blob and vader polarity for the supplied string"""
     # For both sets of scores: -1 most extreme negative, +1 most extreme positive
-    doc = doc_model(content)
-    return dict(polarity=round(float(polarity_model(doc.text)['score']), 4))
+    context = context if context else AnalysisContext(content)
+    result = get_polarity_model()(
+        content, 
+        blob_sentiment=context.blob_sentiment, 
+        vader_scores=context.vader_scores,
+    )
+    return dict(polarity=round(float(result['score']), 4))
 
 
-def sentence_polarity(content: str) -> dict[str, list]:
+def sentence_polarity(content: str, context: AnalysisContext=None) -> dict[str, list]:
     """Compute blob and vader polarity for each sentence in the supplied string"""
-    doc = doc_model(content)
+    context = context if context else AnalysisContext(content)
+    polarity_model = get_polarity_model()
 
     sentence_list, score_list = [], []
-    for sentence in doc.sents:
+    for sentence_text in context.sentences:
         # For both sets of scores: -1 most extreme negative, +1 most extreme positive
-        sentence_text = sentence.text
         sentence_list.append(sentence_text)
         score_list.append(round(float(polarity_model(sentence_text)['score']), 4))
 
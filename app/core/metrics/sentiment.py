@@ -1,5 +1,5 @@
+from app.core.common.context import AnalysisContext
 from app.models.sentiment import get_sentiment_model
-from app.models.general import get_document_model
 
 from app.core.common.text import SAMPLE_TEXT, NEGATIVE_TEXT, NEUTRAL_TEXT, POSITIVE_TEXT
 
@@ -7,27 +7,24 @@ from app.core.common.text import SAMPLE_TEXT, NEGATIVE_TEXT, NEUTRAL_TEXT, POSIT
 # Define sentiment class constant
 SENTIMENT_CLASSES = {'neg': 'negative', 'neu': 'neutral', 'pos': 'positive'}
 
-# Get module level variables
-sentiment_model = get_sentiment_model()
-doc_model = get_document_model()
 
-
-def score_sentiment(content: str) -> dict[str, float]:
+def score_sentiment(content: str, context: AnalysisContext=None) -> dict[str, float]:
     """Compute bart and vader sentiment scores for the supplied string"""
-    doc = doc_model(content)
-    scores = sentiment_model(doc.text)
+    context = context if context else AnalysisContext(content)
+    scores = get_sentiment_model()(content, vader_scores=context.vader_scores)
     return {SENTIMENT_CLASSES[k]: round(float(v), 4) for k, v in scores.items()}
 
 
-def sentence_sentiment(content: str) -> dict[str, list]:
+def sentence_sentiment(content: str, context: AnalysisContext=None) -> dict[str, list]:
     """Compute bart and vader sentiment scores for each sentence in the supplied string"""
-    doc = doc_model(content)
+    context = context if context else AnalysisContext(content)
+    sentiment_model = get_sentiment_model()
 
     sentence_list, score_list = [], []
-    for sentence in doc.sents:
+    for sentence_text in context.sentences:
         # Get bart and vader scores in an equivalent format (including precision)
-        sentence_list.append(sentence.text)
-        scores = sentiment_model(sentence.text)
+        sentence_list.append(sentence_text)
+        scores = sentiment_model(sentence_text)
         score_list.append({SENTIMENT_CLASSES[k]: round(float(v), 4) for k, v in scores.items()})
 
     return dict(sentences=sentence_list, scores=score_list)
@@ -1,28 +1,34 @@
 import numpy
 
+from app.core.common.context import AnalysisContext
 from app.models.sentiment import get_spam_model, get_toxicity_model
 
 from app.core.common.text import SPAM_TEXT, HAM_TEXT, NEGATIVE_TEXT, NEUTRAL_TEXT, POSITIVE_TEXT, SAMPLE_TEXT
 
 
-# Get pre-trained toxicity and spam detection models
-spam_classifier = get_spam_model()
-toxicity_classifier = get_toxicity_model()
-
-
-def score_spam(content: str) -> dict:
+def score_spam(content: str, context: AnalysisContext=None) -> dict:
     """Compute spam scores for the supplied text content"""
-    score = round(float(spam_classifier(content)['score']), 4)
+    score = round(float(get_spam_model()(content)['score']), 4)
     return dict(spam=score)
 
 
-def score_toxicity(content: str) -> dict:
+def score_toxicity(content: str, context: AnalysisContext=None) -> dict:
     """Compute toxicity scores for the supplied text content"""
     # Simply apply the toxicity classifier to the input
-    score = round(float(toxicity_classifier(content)['score']), 4)
+    score = round(float(get_toxicity_model()(content)['score']), 4)
     return dict(toxicity=score)
 
 
+def score_spam_batch(contents: list[str]) -> list[dict]:
+    """Compute spam scores for each supplied content in batches"""
+    return [dict(spam=round(float(result['score']), 4)) for result in get_spam_model()(contents)]
+
+
+def score_toxicity_batch(contents: list[str]) -> list[dict]:
+    """Compute toxicity scores for each supplied content in batches"""
+    return [dict(toxicity=round(float(result['score']), 4)) for result in get_toxicity_model()(contents)]
+
+
 # Example usage and testing function
 def demo_spam():
     """Test the spam scoring functions with different parameters"""
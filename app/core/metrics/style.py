@@ -1,7 +1,6 @@
 import numpy
 
-from textblob import TextBlob
-
+from app.core.common.context import AnalysisContext
 from app.models.general import get_classifier_model
 
 from app.core.common.text import NEGATIVE_TEXT, NEUTRAL_TEXT, POSITIVE_TEXT, SAMPLE_TEXT
@@ -14,20 +13,77 @@ GENRE_LABELS = ['romance', 'drama', 'suspense', 'historical', 'non-fiction', 'ad
 MODE_LABELS = ['expository', 'descriptive', 'persuasive', 'narrative', 'creative', 'experimental']
 TONE_LABELS = ['dogmatic', 'subjective', 'neutral', 'objective', 'impartial']
 
-# Define module-level variables
-classifier = get_classifier_model()
+# Map each style metric to its zero-shot label set
+STYLE_LABELS = {
+    "diction": DICTION_LABELS,
+    "genre": GENRE_LABELS,
+    "mode": MODE_LABELS,
+    "tone": TONE_LABELS,
+}
 
 
 def classify_content(content: str, labels: list, multi_label=False) -> dict[str, float]:
     """Return the zero-shot classification scores in the order of the supplied labels"""
     # NOTE: If more than one label can be correct, set multi_label=True
-    result = classifier(content, candidate_labels=labels, multi_label=multi_label)
+    result = get_classifier_model()(content, candidate_labels=labels, multi_label=multi_label)
     scores = dict(zip(labels, [round(float(v), 4) for v in result]))
 
     # Return scores in the order the labels were provided
     return scores
 
 
+def tone_distribution(content: str, context: AnalysisContext=None) -> numpy.ndarray:
+    """Return the textblob subjectivity as a distribution over the tone labels"""
+    # Textblob subjectvitiy scores range [0.0, 1.0] with 1.0 being highly subjective
+    context = context if context else AnalysisContext(content)
+    blob_score = context.blob_sentiment.subjectivity
+
+    # Find distances from value to each label 'bucket'
+    buckets = numpy.linspace(0, 1, len(TONE_LABELS))
+    distances = numpy.abs(numpy.array(buckets) - blob_score)
+    
+    # Calculate gaussian kernel weights and normalize to sum to 1
+    weights = numpy.exp(-1 * (distances**2) / 0.1)
+    return weights / numpy.sum(weights)
+
+
+def score_style(content: str, metrics: list=None, context: AnalysisContext=None) -> dict[str, dict]:
+    """Return the zero-shot classification scores for each requested style metric"""
+    # Default to all style metrics and score every label set in one classifier call
+    metrics = [m for m in (STYLE_LABELS if metrics is None else metrics) if m in STYLE_LABELS]
+    if not metrics:
+        return {}
+
+    label_sets = {metric: STYLE_LABELS[metric] for metric in metrics}
+    results = get_classifier_model()(content, candidate_labels=label_sets)
+    return style_scores(content, results, context)
+
+
+def score_styles(contents: list[str], metrics: list=None, contexts: list[AnalysisContext]=None) -> list[dict[str, dict]]:
+    """Return the style scores of each content, with the pairs of all contents scored in shared batches"""
+    metrics = [m for m in (STYLE_LABELS if metrics is None else metrics) if m in STYLE_LABELS]
+    if not metrics or not contents:
+        return [{} for _ in contents]
+
+    label_sets = {metric: STYLE_LABELS[metric] for metric in metrics}
+    results = get_classifier_model()(contents, candidate_labels=label_sets)
+    contexts = contexts if contexts else [None] * len(contents)
+    return [style_scores(c, r, context) for c, r, context in zip(contents, results, contexts)]
+
+
+def style_scores(content: str, results: dict[str, list], context: AnalysisContext=None) -> dict[str, dict]:
+    """Return the rounded label scores of each style metric from the raw classifier scores"""
+    scores = {}
+    for metric, result in results.items():
+        if metric == "tone":
+            # Combine the zero-shot and textblob subjectivity scores and re-normalize
+            result = numpy.array(result) + tone_distribution(content, context)
+            result = result / numpy.sum(result)
+        scores[metric] = dict(zip(STYLE_LABELS[metric], [round(float(v), 4) for v in result]))
+
+    return scores
+
+
 def score_diction(content: str) -> dict[str, float]:
     """Return the zero-shot classification scores for diction"""
     # Zero-shot diction score (ideally this uses a fine-tuned a model)
@@ -46,27 +102,10 @@ def score_mode(content: str) -> dict[str, float]:
     return classify_content(content, MODE_LABELS)
 
 
-def score_tone(content: str) -> dict[str, float]:
+def score_tone(content: str, context: AnalysisContext=None) -> dict[str, float]:
     """Return the zero-shot classification and textblob scores for subjectivity (tone)"""
-    # Textblob subjectvitiy scores range [0.0, 1.0] with 1.0 being highly subjective
-    blob_score = TextBlob(content).sentiment.subjectivity
-
-    # Find distances from value to each label 'bucket'
-    buckets = numpy.linspace(0, 1, len(TONE_LABELS))
-    distances = numpy.abs(numpy.array(buckets) - blob_score)
-    
-    # Calculate gaussian kernel weights and normalize to sum to 1
-    weights = numpy.exp(-1 * (distances**2) / 0.1)
-    distribution = weights / numpy.sum(weights)
-
     # Zero-shot subjectivity score (ideally this uses a fine-tuned a model)
-    result = classifier(content, TONE_LABELS)
-
-    # Combine scores and re-normalize
-    result = (result + distribution) / numpy.sum(result + distribution)
-    scores = dict(zip(TONE_LABELS, [round(float(v), 4) for v in result]))
-
-    return scores
+    return score_style(content, ["tone"], context)["tone"]
 
 
 # Example usage and testing function
@@ -95,6 +134,10 @@ def demo_style():
         scores = score_tone(content)
         print("Tone scores:", scores)
 
+        # All style scores from a single batched classifier call
+        scores = score_style(content)
+        print("Style scores:", scores)
+
 
 if __name__ == "__main__":
     demo_style()
@@ -1,5 +1,10 @@
+from functools import partial
+from typing import Any, Iterator
+
+from app.core.common.context import AnalysisContext
 from app.core.metrics import polarity, sentiment, spam, style
 from app.core.common.headings import get_title, get_subtitle, get_description, get_outline
+from app.core.common.headings import stream_headings, stream_outline
 from app.core.common.extract import extract_entities, extract_keywords, extract_related
 from app.core.metrics.sentiment import SENTIMENT_CLASSES
 from app.core.metrics.style import DICTION_LABELS, GENRE_LABELS, MODE_LABELS, TONE_LABELS
@@ -12,6 +17,12 @@ STYLE_METRICS = set(DICTION_LABELS + GENRE_LABELS + MODE_LABELS + TONE_LABELS)
 METRIC_KEYS = SENTIMENT_KEYS.union(STYLE_METRICS).union(SPAM_METRICS)
 
 
+# Metrics scored across many contents with batched model calls
+BATCH_METRIC_TYPES = {
+    "toxicity": spam.score_toxicity_batch,
+    "spam": spam.score_spam_batch,
+}
+
 METRIC_TYPES = {
     "diction": style.score_diction,         # Vocabulary, formality and complexity of text
     "genre": style.score_genre,             # The assessed literary category
@@ -30,6 +41,13 @@ SUMMARY_TYPES = {
     "outline": get_outline                  # A list of content section key points or themes
 }
 
+SUMMARY_STREAMS = {
+    "title": partial(stream_headings, heading="title"),
+    "subtitle": partial(stream_headings, heading="subtitle"),
+    "description": partial(stream_headings, heading="description"),
+    "outline": stream_outline
+}
+
 TAG_TYPES = {
     "entities": extract_entities,           # Named entities such as people, organizations, locations, etc.
     "keywords": extract_keywords,           # Important keywords and phrases that capture the main topics
@@ -37,35 +55,125 @@ TAG_TYPES = {
 }
 
 
-def compute_metrics(content: str, metrics: list=None) -> dict:
+def compute_metrics(content: str, metrics: list=None, context: AnalysisContext=None) -> dict:
     """Return a dictionary of the requested metrics for the supplied content"""
     results = {}
     # Default to all metrics if none are specified
     metrics = metrics if metrics else list(METRIC_TYPES.keys())
+
+    # Share intermediate results (parses, sentiment, embeddings) across all metrics
+    context = context if context else AnalysisContext(content)
+
+    # Score all requested style metrics with a single batched classifier call
+    style_scores = style.score_style(content, [m for m in metrics if m in style.STYLE_LABELS], context)
     for metric in metrics:
-        if metric in METRIC_TYPES:
-            results[metric] = METRIC_TYPES[metric](content)
+        if metric in style_scores:
+            results[metric] = style_scores[metric]
+        elif metric in METRIC_TYPES:
+            results[metric] = METRIC_TYPES[metric](content, context=context)
     # Return a dict of all requested metrics
     return results
 
 
-def get_summary(content: str, summary: str='description', **kwargs) -> tuple:
+def compute_metrics_batch(contents: list[str], metrics: list[list]=None) -> list[dict | Exception]:
+    """Return the requested metrics of each content, or the exception that content raised
+
+    Each metric is computed for every content requesting it with batched model calls. If a batched
+    call fails, its contents are retried one at a time so a single bad input only fails itself.
+    """
+    # Default to all metrics for every content without a metrics list
+    metrics = metrics if metrics else [None] * len(contents)
+    metrics = [m if m else list(METRIC_TYPES.keys()) for m in metrics]
+    results: list[dict | Exception] = [{} for _ in contents]
+
+    # Share intermediate results of each content across its metrics
+    contexts = AnalysisContext.batch(contents)
+
+    def attempt(function, i: int) -> dict | Exception:
+        """Return the result of a single content or the exception it raised"""
+        try:
+            return function(i)
+        except Exception as e:
+            return e
+
+    def apply(indices: list[int], batch_function, single_function) -> None:
+        """Merge batched results into each content's results, isolating failures per content"""
+        indices = [i for i in indices if not isinstance(results[i], Exception)]
+        if not indices:
+            return
+        try:
+            batch_results = batch_function(indices)
+        except Exception:
+            batch_results = [attempt(single_function, i) for i in indices]
+        for i, result in zip(indices, batch_results):
+            if isinstance(result, Exception):
+                results[i] = result
+            elif not isinstance(results[i], Exception):
+                results[i].update(result)
+
+    # Score contents requesting the same style metrics with a shared classifier call
+    style_groups: dict[tuple, list[int]] = {}
+    for i, content_metrics in enumerate(metrics):
+        style_metrics = tuple(m for m in content_metrics if m in style.STYLE_LABELS)
+        if style_metrics:
+            style_groups.setdefault(style_metrics, []).append(i)
+    for style_metrics, indices in style_groups.items():
+        apply(
+            indices,
+            lambda idx: style.score_styles([contents[i] for i in idx], list(style_metrics), [contexts[i] for i in idx]),
+            lambda i: style.score_style(contents[i], list(style_metrics), contexts[i]),
+        )
+
+    # Score the remaining metrics in batches where supported, otherwise per content
+    for metric in METRIC_TYPES:
+        if metric in style.STYLE_LABELS:
+            continue
+        indices = [i for i, content_metrics in enumerate(metrics) if metric in content_metrics]
+        single = lambda i, metric=metric: {metric: METRIC_TYPES[metric](contents[i], context=contexts[i])}
+        if metric in BATCH_METRIC_TYPES:
+            batch = lambda idx, metric=metric: [{metric: r} for r in BATCH_METRIC_TYPES[metric]([contents[i] for i in idx])]
+        else:
+            batch = lambda idx, single=single: [attempt(single, i) for i in idx]
+        apply(indices, batch, single)
+
+    return results
+
+
+def get_summary(content: str, summary: str='description', context: AnalysisContext=None, **kwargs) -> tuple:
     """Return a dictionary of entities, keywords, and related topic tags"""
     summaries, scores = [], []
     # Get requested summary type
     if summary in SUMMARY_TYPES:
         summary_function = SUMMARY_TYPES[summary]
-        summaries, scores = summary_function(content, **kwargs)
+        context = context if context else AnalysisContext(content)
+        summaries, scores = summary_function(content, context=context, **kwargs)
     # Return a dict of lists (summaries, scores)
     return dict(summaries=summaries, scores=scores)
 
 
-def get_tags(content: str, min_length: int=1, max_length: int=3, top_n: int=10) -> dict:
+def get_summary_stream(content: str, summary: str='description', context: AnalysisContext=None, **kwargs) -> Iterator[tuple[str, Any]]:
+    """Yield ("candidate", text) events as summaries are generated and a final ("result", dict) event"""
+    if summary not in SUMMARY_STREAMS:
+        yield "result", dict(summaries=[], scores=[])
+        return
+
+    context = context if context else AnalysisContext(content)
+    for event, data in SUMMARY_STREAMS[summary](content, context=context, **kwargs):
+        if event == "result":
+            summaries, scores = data
+            data = dict(summaries=summaries, scores=scores)
+        yield event, data
+
+
+def get_tags(content: str, min_length: int=1, max_length: int=3, top_n: int=10, context: AnalysisContext=None) -> dict:
     """Return a dictionary of entities, keywords, and related topic tags"""
+    # Share the parsed document and content embedding across all extractors
+    context = context if context else AnalysisContext(content)
+
     # Extract entities, keywords, and related tags with similarity scores
-    entities, entity_scores = extract_entities(content, top_n)
-    keywords, keyword_scores = extract_keywords(content, top_n)
-    related, related_scores = extract_related(content, min_length, max_length, top_n)
+    entities, entity_scores = extract_entities(content, top_n, context=context)
+    keywords, keyword_scores = extract_keywords(content, top_n, context=context)
+    related, related_scores = extract_related(content, min_length, max_length, top_n, context=context)
     # Return a pair of dictionaries for tags and scores
     tags = dict(entities=entities, keywords=keywords, related=related)
     scores = dict(entities=entity_scores, keywords=keyword_scores, related=related_scores)
@@ -1,3 +1,6 @@
+from functools import lru_cache
+
+from sqlalchemy import event, inspect, text
 from sqlmodel import create_engine, Session, SQLModel
 
 from app.settings import get_settings
@@ -8,9 +11,70 @@ settings = get_settings().database
 engine = create_engine(settings.url, connect_args=settings.connect_args)
 
 
+def configure_connection(dbapi_connection, connection_record):
+    """Apply the journaling, sync, lock timeout and mmap pragmas to each new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.mmap_size)}")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", configure_connection)
+
+
+@lru_cache()
+def get_async_engine():
+    """Return the async engine, created on first use so the async driver stays optional"""
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine
+    except ImportError as e:
+        raise ImportError("The async database engine requires the greenlet and aiosqlite packages.") from e
+
+    async_engine = create_async_engine(settings.async_url, connect_args=settings.connect_args)
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", configure_connection)
+    return async_engine
+
+
 def init_database():
     SQLModel.metadata.create_all(engine)
+    migrate_database(engine)
+
+
+def migrate_database(bind) -> list[str]:
+    """Add the nullable columns and indexes introduced after a table was created.
+
+    create_all only creates missing tables, so columns and indexes added to existing tables are
+    applied here. Returns the names of the added columns.
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    added = []
+    with bind.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Column '{table.name}.{column.name}' must be nullable to be added to an existing table.")
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    return added
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    async with AsyncSession(get_async_engine()) as session:
+        yield session
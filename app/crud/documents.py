@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlmodel import Session, delete, select
+
+from app.core.common.markdown import ParsedSection, content_hash
+from app.crud.tables import Document, Metric, Section, SectionTag
+
+
+def get_document(session: Session, slug: str) -> Optional[Document]:
+    """Return a Document by slug, or None if not found."""
+    statement = select(Document).where(Document.slug == slug)
+    return session.exec(statement).first()
+
+
+def list_document_sections(session: Session, document_id) -> List[Section]:
+    """Return all Section records of a document in position order."""
+    statement = select(Section).where(Section.document_id == document_id).order_by(Section.position)
+    return session.exec(statement).all()
+
+
+def diff_sections(existing: List[Section], parsed: List[ParsedSection]) -> Tuple[list, list, list, list]:
+    """Match parsed sections against the stored sections of a document.
+
+    Returns (unchanged, changed, added, removed): unchanged and changed are (Section, ParsedSection)
+    pairs, added are ParsedSections without a stored match and removed are unmatched Sections.
+    Sections match by content hash first, then a section whose content changed keeps the record
+    stored at the same position (if that record's content is no longer present).
+    """
+    # Hash sections stored before content hashes were recorded (they are saved with the new hash)
+    by_hash: Dict[str, List[Section]] = {}
+    for section in existing:
+        by_hash.setdefault(section.content_hash or content_hash(section.content), []).append(section)
+
+    # Match identical content wherever it moved
+    unchanged, unmatched = [], []
+    for item in parsed:
+        candidates = by_hash.get(item.content_hash)
+        if candidates:
+            unchanged.append((candidates.pop(0), item))
+        else:
+            unmatched.append(item)
+
+    # Treat remaining sections at a stored section's position as edits of that section
+    matched_ids = {section.id for section, _ in unchanged}
+    by_position = {s.position: s for s in existing if s.id not in matched_ids}
+    changed, added = [], []
+    for item in unmatched:
+        section = by_position.pop(item.position, None)
+        if section is not None:
+            changed.append((section, item))
+        else:
+            added.append(item)
+
+    removed = list(by_position.values())
+    return unchanged, changed, added, removed
+
+
+def ingest_document(session: Session, slug: str, markdown: str, frontmatter: Optional[dict],
+        parsed: List[ParsedSection]) -> Tuple[Dict, List[Tuple[UUID, ParsedSection]]]:
+    """Create or update a document and its sections in a single transaction.
+
+    Returns the response dict and the (section_id, ParsedSection) pairs of the added or changed
+    sections that need analysis. Both are collected before committing (ids are assigned on
+    construction), so no expired record is refreshed afterwards.
+    """
+    document = get_document(session, slug)
+    status = "created" if document is None else "updated"
+    if document is None:
+        document = Document(slug=slug, markdown=markdown, content_hash=content_hash(markdown), frontmatter=frontmatter)
+        existing = []
+    else:
+        document.markdown = markdown
+        document.content_hash = content_hash(markdown)
+        document.frontmatter = frontmatter
+        document.updated_at = datetime.now()
+        existing = list_document_sections(session, document.id)
+    session.add(document)
+
+    unchanged, changed, added, removed = diff_sections(existing, parsed)
+
+    # Move unchanged sections and overwrite the content of changed sections in place
+    for section, item in unchanged + changed:
+        section.content = item.content
+        section.content_hash = item.content_hash
+        section.type = item.type
+        section.level = item.level
+        section.position = item.position
+        session.add(section)
+
+    # Insert new sections together
+    new_sections = [
+        Section(
+            document_id=document.id,
+            content=item.content,
+            content_hash=item.content_hash,
+            type=item.type,
+            level=item.level,
+            position=item.position,
+        )
+        for item in added
+    ]
+    session.add_all(new_sections)
+
+    # Delete removed sections along with their metrics and tag links
+    removed_ids = [section.id for section in removed]
+    if removed_ids:
+        session.exec(delete(Metric).where(Metric.section_id.in_(removed_ids)))
+        session.exec(delete(SectionTag).where(SectionTag.section_id.in_(removed_ids)))
+        session.exec(delete(Section).where(Section.id.in_(removed_ids)))
+
+    results = dict(
+        sections=len(parsed),
+        added=[section.id for section in new_sections],
+        changed=[section.id for section, _ in changed],
+        unchanged=len(unchanged),
+        removed=len(removed_ids),
+    )
+    response = dict(id=str(document.id), results=results, status=status)
+    pending = [(section.id, item) for section, item in zip(new_sections, added)]
+    pending += [(section.id, item) for section, item in changed]
+
+    session.commit()
+    return response, pending
@@ -0,0 +1,87 @@
+"""Persisted result memo: reuse the results of identical requests across restarts and workers."""
+
+import hashlib
+import json
+import logging
+
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlmodel import Session, delete
+
+from app.core.common.markdown import content_hash
+from app.crud.database import engine
+from app.crud.metrics import UPSERT_INSERTS
+from app.crud.tables import ResultMemo
+from app.settings import get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Fingerprint the model settings, memoized results of any other fingerprint are stale
+FINGERPRINT = get_settings().model.fingerprint()
+
+# Define the request fields that identify the section rather than the computation
+UNKEYED_FIELDS = {"content", "section_id"}
+
+
+class MemoKey(NamedTuple):
+    content_hash: str
+    operation: str
+    params_hash: str
+
+
+def memo_key(operation: str, request: Any) -> MemoKey:
+    """Return the memo key of a request: its normalized content hash, operation and parameters hash"""
+    params = request.model_dump(mode="json", exclude=UNKEYED_FIELDS)
+    params_hash = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    return MemoKey(content_hash(request.content), operation, params_hash)
+
+
+def get_memo(session: Session, key: MemoKey, fingerprint: str=FINGERPRINT) -> Optional[Dict]:
+    """Return the memoized results of a key computed with the fingerprinted models, or None"""
+    memo = session.get(ResultMemo, tuple(key))
+    if memo is None or memo.fingerprint != fingerprint:
+        return None
+    return memo.results
+
+
+def put_memo(session: Session, key: MemoKey, results: Dict, fingerprint: str=FINGERPRINT) -> None:
+    """Insert or overwrite the memoized results of a key"""
+    # Convert numpy scalars (and anything else JSON cannot encode) to plain values
+    results = json.loads(json.dumps(results, default=lambda o: o.item() if hasattr(o, "item") else str(o)))
+    values = dict(key._asdict(), fingerprint=fingerprint, results=results, recorded_at=datetime.now())
+    statement = UPSERT_INSERTS[session.get_bind().dialect.name](ResultMemo).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(MemoKey._fields),
+        set_=dict(fingerprint=statement.excluded.fingerprint, results=statement.excluded.results,
+            recorded_at=statement.excluded.recorded_at),
+    )
+    session.exec(statement)
+    session.commit()
+
+
+def prune_memos(session: Session, fingerprint: str=FINGERPRINT) -> int:
+    """Delete memoized results computed with other model settings and return the number deleted"""
+    result = session.exec(delete(ResultMemo).where(ResultMemo.fingerprint != fingerprint))
+    session.commit()
+    return result.rowcount
+
+
+def read_memo(key: MemoKey) -> Optional[Dict]:
+    """Return the memoized results of a key using a dedicated session (a failed lookup is a miss)"""
+    try:
+        with Session(engine) as session:
+            return get_memo(session, key)
+    except Exception:
+        LOGGER.exception(f"Memo lookup of '{key.operation}' failed.")
+        return None
+
+
+def write_memo(key: MemoKey, results: Dict) -> None:
+    """Store the results of a key using a dedicated session (a failed write is only logged)"""
+    try:
+        with Session(engine) as session:
+            put_memo(session, key, results)
+    except Exception:
+        LOGGER.exception(f"Memo write of '{key.operation}' failed.")
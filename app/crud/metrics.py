@@ -1,12 +1,24 @@
 from datetime import datetime
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from uuid import UUID
 
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import Session, select
 
 from app.core.operations import compute_metrics
 from app.crud.tables import Metric
-from app.schemas.metrics import MetricsRequest
+from app.crud.writer import register_queue
+from app.schemas.metrics import MetricsBatchRequest, MetricsRequest
+
+if TYPE_CHECKING:
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+# Map each supported database dialect to its INSERT ... ON CONFLICT construct
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Define the maximum rows per upsert statement (keeps SQLite below its bound parameter limit)
+UPSERT_CHUNK_SIZE = 500
 
 
 def get_metric(session: Session, section_id: UUID, name: str) -> Metric:
@@ -37,6 +49,49 @@ def add_metric(session: Session, section_id: UUID, name: str, value: float) -> M
     return metric
 
 
+def upsert_metrics(session: Session, rows: List[Dict], commit: bool=True) -> int:
+    """Insert or overwrite many metric rows (section_id, name, value) in a single transaction.
+
+    Rows are written with INSERT ... ON CONFLICT (section_id, name) DO UPDATE statements and no
+    per-row SELECT or refresh. Returns the number of rows written.
+    """
+    statements, count = upsert_statements(session.get_bind().dialect.name, rows)
+    for statement in statements:
+        session.exec(statement)
+
+    if commit and count:
+        session.commit()
+    return count
+
+
+def upsert_statements(dialect: str, rows: List[Dict]) -> Tuple[list, int]:
+    """Return the chunked INSERT ... ON CONFLICT DO UPDATE statements of metric rows and the row count"""
+    # Keep the last value of any (section_id, name) repeated within the rows
+    recorded_at = datetime.now()
+    values = {
+        (row["section_id"], row["name"]): dict(
+            section_id=row["section_id"], name=row["name"], value=float(row["value"]), recorded_at=recorded_at
+        )
+        for row in rows
+    }
+    values = list(values.values())
+    if not values:
+        return [], 0
+
+    if dialect not in UPSERT_INSERTS:
+        raise NotImplementedError(f"Bulk metric upserts are not supported for the '{dialect}' dialect.")
+
+    statements = []
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        statement = UPSERT_INSERTS[dialect](Metric).values(values[start:start + UPSERT_CHUNK_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=["section_id", "name"],
+            set_=dict(value=statement.excluded.value, recorded_at=statement.excluded.recorded_at),
+        )
+        statements.append(statement)
+    return statements, len(values)
+
+
 def delete_metric(session: Session, section_id: UUID, name: str) -> bool:
     """Delete a metric by section and name. Returns True if deleted."""
     existing = get_metric(session, section_id, name)
@@ -61,11 +116,128 @@ def handle_metrics_request(session: Session, request: MetricsRequest, configs: d
     Returns the list of Metric records objects.
     """
     results = compute_metrics(request.content, request.metrics)
-    metrics: Dict[str, float] = {}
-    
-    for metric_dict in results.values():
-        for name, value in metric_dict.items():
-            metric = add_metric(session, request.section_id, name, value)
-            metrics[name] = metric.value
-    
-    return dict(id=str(request.section_id), results=metrics, status="created")
+    return persist_metrics(session, request, results)
+
+
+def persist_metrics(session: Session, request: MetricsRequest, results: Dict[str, dict]) -> Dict[str, float]:
+    """Upsert precomputed metrics (keyed by metric type) for the request's section.
+
+    Returns the response dict of the persisted metric values.
+    """
+    response, rows = metrics_rows(request, results)
+    write_metrics(session, rows)
+    return response
+
+
+def metrics_rows(request: MetricsRequest, results: Dict[str, dict]) -> Tuple[Dict, List[Dict]]:
+    """Return the response dict and the metric rows of a request's computed metrics"""
+    metrics = {name: float(value) for metric_dict in results.values() for name, value in metric_dict.items()}
+    rows = [dict(section_id=request.section_id, name=name, value=value) for name, value in metrics.items()]
+    return dict(id=str(request.section_id), results=metrics, status="created"), rows
+
+
+def persist_metrics_batch(session: Session, request: MetricsBatchRequest, 
+        results: List[Tuple[Optional[Dict[str, dict]], Optional[str]]]) -> Dict[str, list]:
+    """Upsert the precomputed metrics of every successful item in a single transaction.
+
+    Each result is a (metrics keyed by metric type, error) pair in request order. Failed items
+    are reported with their error and nothing is written for them.
+    """
+    response, rows = metrics_batch_rows(request, results)
+
+    # Write every item's metrics with bulk upserts in a single transaction
+    write_metrics(session, rows)
+    return response
+
+
+def metrics_batch_rows(request: MetricsBatchRequest, results: List[Tuple]) -> Tuple[Dict, List[Dict]]:
+    """Return the response dict of every item and the metric rows of the successful items"""
+    items, rows = [], []
+    for item, (item_results, error) in zip(request.items, results):
+        if error is not None:
+            items.append(dict(id=str(item.section_id), results={}, status="failed", error=error))
+            continue
+
+        item_response, item_rows = metrics_rows(item, item_results)
+        items.append(item_response)
+        rows += item_rows
+    return dict(results=items), rows
+
+
+def write_metrics(session: Session, rows: List[Dict]) -> None:
+    """Queue metric rows for a background flush in write-behind mode, otherwise upsert them now"""
+    if not METRICS_QUEUE.put(rows):
+        upsert_metrics(session, rows)
+
+
+async def get_metric_async(session: "AsyncSession", section_id: UUID, name: str) -> Metric:
+    """Return a single Metric by section and name, or None if not found (async)."""
+    statement = select(Metric).where(Metric.section_id == section_id, Metric.name == name)
+    return (await session.exec(statement)).first()
+
+
+async def add_metric_async(session: "AsyncSession", section_id: UUID, name: str, value: float) -> Metric:
+    """Create a new Metric or overwrite an existing one (section_id + name key) (async)."""
+    metric = await get_metric_async(session, section_id, name)
+    if metric:
+        metric.value = float(value)
+        metric.recorded_at = datetime.now()
+    else:
+        metric = Metric(section_id=section_id, name=name, value=float(value))
+
+    session.add(metric)
+    await session.commit()
+    await session.refresh(metric)
+    return metric
+
+
+async def delete_metric_async(session: "AsyncSession", section_id: UUID, name: str) -> bool:
+    """Delete a metric by section and name. Returns True if deleted (async)."""
+    existing = await get_metric_async(session, section_id, name)
+    if not existing:
+        return False
+
+    await session.delete(existing)
+    await session.commit()
+    return True
+
+
+async def list_section_metrics_async(session: "AsyncSession", section_id: UUID) -> List[Metric]:
+    """Return all Metric records for a given section (async)."""
+    statement = select(Metric).where(Metric.section_id == section_id)
+    return (await session.exec(statement)).all()
+
+
+async def upsert_metrics_async(session: "AsyncSession", rows: List[Dict], commit: bool=True) -> int:
+    """Insert or overwrite many metric rows in a single transaction (async)."""
+    statements, count = upsert_statements(session.bind.dialect.name, rows)
+    for statement in statements:
+        await session.exec(statement)
+
+    if commit and count:
+        await session.commit()
+    return count
+
+
+async def persist_metrics_async(session: "AsyncSession", request: MetricsRequest, results: Dict[str, dict]) -> Dict:
+    """Upsert precomputed metrics (keyed by metric type) for the request's section (async)."""
+    response, rows = metrics_rows(request, results)
+    await write_metrics_async(session, rows)
+    return response
+
+
+async def persist_metrics_batch_async(session: "AsyncSession", request: MetricsBatchRequest, results: List[Tuple]) -> Dict:
+    """Upsert the precomputed metrics of every successful item in a single transaction (async)."""
+    response, rows = metrics_batch_rows(request, results)
+    await write_metrics_async(session, rows)
+    return response
+
+
+async def write_metrics_async(session: "AsyncSession", rows: List[Dict]) -> None:
+    """Queue metric rows for a background flush in write-behind mode, otherwise upsert them now (async)"""
+    if not METRICS_QUEUE.put(rows):
+        await upsert_metrics_async(session, rows)
+
+
+# Define the write-behind queue of metric rows
+METRICS_QUEUE = register_queue("metrics", upsert_metrics)
@@ -4,7 +4,7 @@ from typing import Optional, List, Dict, Any
 from uuid import UUID, uuid4
 
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, DateTime, Text, String
+from sqlalchemy import JSON, Column, DateTime, Text, String
 from sqlalchemy.orm import Mapped
 
 from datetime import datetime
@@ -27,7 +27,7 @@ class Document(SQLModel, table=True):
     slug: str = Field(..., index=True, unique=True, nullable=False)
     markdown: str = Field(..., sa_column=Column(Text, nullable=False))
     content_hash: str = Field(..., sa_column=Column(String(64), nullable=False))
-    frontmatter: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(Text, nullable=True))
+    frontmatter: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON, nullable=True))
     created_at: datetime = Field(default_factory=datetime.now, sa_column=Column(DateTime(timezone=False), nullable=False))
     updated_at: datetime = Field(default_factory=datetime.now, sa_column=Column(DateTime(timezone=False), nullable=False))
     sections: Mapped[List["Section"]] = Relationship(back_populates="document")
@@ -45,7 +45,7 @@ class Metric(SQLModel, table=True):
 class SectionTag(SQLModel, table=True):
     __tablename__ = "section_tags"
     section_id: UUID = Field(foreign_key="sections.id", primary_key=True)
-    tag_name: str = Field(foreign_key="tags.name", primary_key=True)
+    tag_name: str = Field(foreign_key="tags.name", primary_key=True, index=True)
     relevance: float = Field(..., nullable=False)
     position: Optional[int] = Field(default=None, nullable=False)
 
@@ -55,6 +55,7 @@ class Section(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     document_id: UUID = Field(foreign_key="documents.id", index=True, nullable=False)
     content: str = Field(..., sa_column=Column(Text, nullable=False))
+    content_hash: Optional[str] = Field(default=None, sa_column=Column(String(64), index=True, nullable=True))
     type: str = Field(..., nullable=False)
     hidden: bool = Field(default=False, nullable=False)
     level: Optional[int] = Field(default=None, description="Heading level for section type 'heading'")
@@ -67,5 +68,15 @@ class Section(SQLModel, table=True):
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
     name: str = Field(primary_key=True)
-    category: TagsEnum = Field(..., sa_column=Column(String(64), nullable=False))
+    category: TagsEnum = Field(..., sa_column=Column(String(64), index=True, nullable=False))
     sections: Mapped[List[Section]] = Relationship(back_populates="tags", link_model=SectionTag)
+
+
+class ResultMemo(SQLModel, table=True):
+    __tablename__ = "result_memos"
+    content_hash: str = Field(..., primary_key=True, max_length=64)
+    operation: str = Field(..., primary_key=True)
+    params_hash: str = Field(..., primary_key=True, max_length=64)
+    fingerprint: str = Field(..., index=True, max_length=64, description="Hash of the model settings that computed the results")
+    results: Dict[str, Any] = Field(..., sa_column=Column(JSON, nullable=False))
+    recorded_at: datetime = Field(default_factory=datetime.now, sa_column=Column(DateTime(timezone=False), nullable=False))
@@ -0,0 +1,129 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, or_
+from sqlmodel import Session, delete, select
+
+from app.crud.metrics import UPSERT_CHUNK_SIZE, UPSERT_INSERTS
+from app.crud.tables import SectionTag, Tag
+from app.schemas.tags import TagsRequest
+
+if TYPE_CHECKING:
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+def list_section_tags(session: Session, section_id: UUID) -> List[SectionTag]:
+    """Return all SectionTag links of a section ordered by relevance."""
+    statement = select(SectionTag).where(SectionTag.section_id == section_id).order_by(SectionTag.relevance.desc())
+    return session.exec(statement).all()
+
+
+def list_tag_sections(session: Session, tag_name: str) -> List[SectionTag]:
+    """Return all SectionTag links of a tag ordered by relevance."""
+    statement = select(SectionTag).where(SectionTag.tag_name == tag_name).order_by(SectionTag.relevance.desc())
+    return session.exec(statement).all()
+
+
+def list_top_tags(session: Session, category: str, limit: int=10) -> List[Tuple[str, int]]:
+    """Return the (name, section count) of the most linked tags of a category."""
+    count = func.count(SectionTag.section_id)
+    statement = (
+        select(Tag.name, count)
+        .join(SectionTag, SectionTag.tag_name == Tag.name)
+        .where(Tag.category == category)
+        .group_by(Tag.name)
+        .order_by(count.desc())
+        .limit(limit)
+    )
+    return session.exec(statement).all()
+
+
+def replace_section_tags(session: Session, section_id: UUID, results: Dict[str, dict], commit: bool=True) -> int:
+    """Upsert tags and replace the section's links of the extracted categories in a single transaction.
+
+    Links of categories missing from the results (not requested) are kept. Tags are upserted with
+    INSERT ... ON CONFLICT (name) DO UPDATE, so a tag takes the category it was last extracted under.
+    Returns the number of links written.
+    """
+    statements, count = tag_statements(session.get_bind().dialect.name, section_id, results)
+    for statement in statements:
+        session.exec(statement)
+
+    if commit:
+        session.commit()
+    return count
+
+
+def tag_statements(dialect: str, section_id: UUID, results: Dict[str, dict]) -> Tuple[list, int]:
+    """Return the link delete, tag upsert and link insert statements of a section's tags and the link count"""
+    if dialect not in UPSERT_INSERTS:
+        raise NotImplementedError(f"Bulk tag upserts are not supported for the '{dialect}' dialect.")
+
+    # Delete the links of the extracted categories and any link rewritten below
+    tags, links = tag_rows(section_id, results)
+    replaced = select(Tag.name).where(Tag.category.in_(list(results["tags"])))
+    statements = [
+        delete(SectionTag).where(
+            SectionTag.section_id == section_id,
+            or_(SectionTag.tag_name.in_(replaced), SectionTag.tag_name.in_([tag["name"] for tag in tags])),
+        )
+    ]
+    for start in range(0, len(tags), UPSERT_CHUNK_SIZE):
+        statement = UPSERT_INSERTS[dialect](Tag).values(tags[start:start + UPSERT_CHUNK_SIZE])
+        statements.append(statement.on_conflict_do_update(
+            index_elements=["name"], set_=dict(category=statement.excluded.category)
+        ))
+    for start in range(0, len(links), UPSERT_CHUNK_SIZE):
+        statements.append(UPSERT_INSERTS[dialect](SectionTag).values(links[start:start + UPSERT_CHUNK_SIZE]))
+    return statements, len(links)
+
+
+def tag_rows(section_id: UUID, results: Dict[str, dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Return the tag rows and the section link rows of extracted tags (keyed by category)"""
+    # Keep the most relevant occurrence of a tag extracted under several categories
+    links: Dict[str, Dict] = {}
+    for category, names in results["tags"].items():
+        for position, (name, score) in enumerate(zip(names, results["scores"][category])):
+            link = dict(category=category, relevance=float(score), position=position)
+            if name not in links or link["relevance"] > links[name]["relevance"]:
+                links[name] = link
+
+    tags = [dict(name=name, category=link["category"]) for name, link in links.items()]
+    links = [
+        dict(section_id=section_id, tag_name=name, relevance=link["relevance"], position=link["position"])
+        for name, link in links.items()
+    ]
+    return tags, links
+
+
+def persist_tags(session: Session, request: TagsRequest, results: Dict[str, dict]) -> Dict:
+    """Replace the tags of the request's section with the extracted tags.
+
+    Requests without a section_id are returned without being persisted.
+    """
+    if request.section_id is None:
+        return dict(results=results, status="created")
+
+    replace_section_tags(session, request.section_id, results)
+    return dict(id=str(request.section_id), results=results, status="created")
+
+
+async def replace_section_tags_async(session: "AsyncSession", section_id: UUID, results: Dict[str, dict],
+        commit: bool=True) -> int:
+    """Upsert tags and replace the section's links of the extracted categories in a single transaction (async)."""
+    statements, count = tag_statements(session.bind.dialect.name, section_id, results)
+    for statement in statements:
+        await session.exec(statement)
+
+    if commit:
+        await session.commit()
+    return count
+
+
+async def persist_tags_async(session: "AsyncSession", request: TagsRequest, results: Dict[str, dict]) -> Dict:
+    """Replace the tags of the request's section with the extracted tags (async)."""
+    if request.section_id is None:
+        return dict(results=results, status="created")
+
+    await replace_section_tags_async(session, request.section_id, results)
+    return dict(id=str(request.section_id), results=results, status="created")
@@ -0,0 +1,157 @@
+"""Write-behind persistence: queue rows in memory and flush them in batched background transactions."""
+
+import asyncio
+import logging
+import threading
+
+from collections import deque
+from typing import Callable
+
+from sqlmodel import Session
+
+from app.crud.database import engine
+from app.settings import get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Extract constants from settings
+settings = get_settings().database
+WRITE_BEHIND = settings.write_behind
+BATCH_SIZE = settings.write_behind_batch_size
+INTERVAL = settings.write_behind_interval
+MAX_ATTEMPTS = settings.write_behind_max_attempts
+
+# Define the number of dead-lettered rows kept for inspection
+DEAD_LETTER_SIZE = 1000
+
+
+class WriteBehindQueue:
+    """Buffer rows and flush them with a single write function per batch from a background task
+
+    A flush is triggered when batch_size rows are queued or interval seconds have passed. Rows are
+    only queued while the background task is running, callers write directly otherwise. If a batch
+    fails its rows are retried one at a time, a row failing max_attempts flushes is dead-lettered.
+    """
+
+    def __init__(self, name: str, write_function: Callable[[Session, list], int], batch_size: int=BATCH_SIZE,
+            interval: float=INTERVAL, max_attempts: int=MAX_ATTEMPTS):
+        self.name = name
+        self.write_function = write_function
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.dead_letters: deque = deque(maxlen=DEAD_LETTER_SIZE)
+        self._rows: list[tuple] = []
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop = None
+        self._wake: asyncio.Event = None
+        self._task: asyncio.Task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def put(self, rows: list) -> bool:
+        """Queue rows for the next flush. Returns False if the queue is not running."""
+        if not self.running:
+            return False
+
+        with self._lock:
+            self._rows.extend((row, 0) for row in rows)
+            is_full = len(self._rows) >= self.batch_size
+
+        # Wake the flush task early once a full batch is queued (put is called from worker threads)
+        if is_full:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run(), name=f"write-behind-{self.name}")
+
+    async def drain(self) -> None:
+        """Stop the background task and flush every queued row"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def flush(self) -> int:
+        """Write all queued rows in a single transaction and return the number written
+
+        If the transaction fails, each row is written on its own so a bad row (e.g. of a deleted
+        section) only fails itself. Failed rows are requeued until they reach max_attempts.
+        """
+        with self._lock:
+            entries, self._rows = self._rows, []
+        if not entries:
+            return 0
+
+        try:
+            count = self._write([row for row, _ in entries])
+            LOGGER.debug(f"Write-behind flushed {count} '{self.name}' rows.")
+            return count
+        except Exception:
+            LOGGER.exception(f"Write-behind flush of {len(entries)} '{self.name}' rows failed, retrying row by row.")
+
+        count, failed = 0, []
+        for row, attempts in entries:
+            try:
+                count += self._write([row])
+            except Exception as e:
+                if attempts + 1 < self.max_attempts:
+                    failed.append((row, attempts + 1))
+                else:
+                    LOGGER.error(f"Dead-lettered '{self.name}' row after {attempts + 1} failed writes: {type(e).__name__} - {e}")
+                    self.dead_letters.append(row)
+
+        # Requeue the failed rows ahead of newer ones so the next flush retries them
+        with self._lock:
+            self._rows = failed + self._rows
+        return count
+
+    def _write(self, rows: list) -> int:
+        with Session(engine) as session:
+            return self.write_function(session, rows)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await asyncio.to_thread(self.flush)
+
+
+def register_queue(name: str, write_function: Callable[[Session, list], int]) -> WriteBehindQueue:
+    """Create and register the write-behind queue of a table"""
+    queue = WriteBehindQueue(name, write_function)
+    WRITE_QUEUES[name] = queue
+    return queue
+
+
+def start_queues() -> None:
+    """Start every registered write-behind queue if write-behind persistence is enabled"""
+    if WRITE_BEHIND:
+        for queue in WRITE_QUEUES.values():
+            queue.start()
+
+
+async def drain_queues() -> None:
+    """Flush and stop every registered write-behind queue"""
+    for queue in WRITE_QUEUES.values():
+        await queue.drain()
+
+
+# Define the write-behind queue of each table
+WRITE_QUEUES: dict[str, WriteBehindQueue] = {}
@@ -1,14 +1,23 @@
+import asyncio
 import logging
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 
-from app.crud.database import init_database, get_session
-from app.schemas.metrics import MetricsRequest, MetricsResponse
+from app.crud.database import engine, init_database, get_async_session, get_session
+from app.crud.memo import prune_memos
+from app.crud.writer import drain_queues, start_queues
+from app.models.batching import batcher_stats
+from app.models.registry import MODEL_REGISTRY
+from app.schemas.documents import DocumentResponse
+from app.schemas.metrics import MetricsBatchRequest, MetricsBatchResponse, MetricsRequest, MetricsResponse
 from app.schemas.summary import SummaryRequest, SummaryResponse
 from app.schemas.tags import TagsRequest, TagsResponse
-from app.services.orchestration import handle_request
+from app.services.executors import EXECUTORS, get_executor, shutdown_executors
+from app.services.ingestion import handle_document
+from app.services.orchestration import handle_request, stream_summary_request
 from app.settings import get_settings
 
 
@@ -17,9 +26,19 @@ USER_SETTINGS = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize the database before starting the app"""
+    """Initialize the database, preload configured models and run write-behind queues for the app lifetime"""
     init_database()
+    with Session(engine) as session:
+        prune_memos(session)
+    MODEL_REGISTRY.preload()
+    start_queues()
     yield
+    # Flush queued writes, then wait for running operations without blocking the event loop
+    await drain_queues()
+    await asyncio.to_thread(shutdown_executors)
+
+# Serve route database work through the async engine if configured
+get_route_session = get_async_session if USER_SETTINGS.database.use_async else get_session
 
 # Return user settings for now, override this as needed
 def get_route_configs() -> dict:
@@ -34,29 +53,64 @@ app = FastAPI(
     version=USER_SETTINGS.version, 
 )
 
+@app.post("/documents/{slug}", response_model=DocumentResponse)
+async def post_document(
+        slug: str,
+        request: Request,
+        session: Session = Depends(get_session),
+    ):
+    """Ingest a raw markdown document body, storing its sections and reanalyzing added or changed ones"""
+    return await handle_document(slug, request.stream(), session)
+
 @app.post(f"/metrics/", response_model=MetricsResponse)
 async def post_metrics(
         request: MetricsRequest,
         configs: dict = Depends(get_route_configs),
-        session: Session = Depends(get_session),
+        session: Session = Depends(get_route_session),
     ):
     """Return a response including the metrics of the specified request types"""
-    return handle_request('metrics', request, configs, session)
+    return await handle_request('metrics', request, configs, session)
+
+@app.post(f"/metrics/batch", response_model=MetricsBatchResponse)
+async def post_metrics_batch(
+        request: MetricsBatchRequest,
+        configs: dict = Depends(get_route_configs),
+        session: Session = Depends(get_route_session),
+    ):
+    """Return the metrics of each section in a batch, reporting failed items without failing the batch"""
+    return await handle_request('metrics_batch', request, configs, session)
 
 @app.post(f"/summary/", response_model=SummaryResponse)
 async def post_summary(
         request: SummaryRequest,
         configs: dict = Depends(get_route_configs),
-        session: Session = Depends(get_session),
+        session: Session = Depends(get_route_session),
     ):
     """Return a response including the summary of the specified content"""
-    return handle_request('summary', request, configs, session)
+    return await handle_request('summary', request, configs, session)
+
+@app.post(f"/summary/stream")
+async def post_summary_stream(request: SummaryRequest):
+    """Stream summary candidates as server-sent events as they are generated, then the ranked results"""
+    # Generate on the summary executor, holding one of its concurrency slots for the whole stream
+    events = get_executor("summary").stream(stream_summary_request, request)
+    return StreamingResponse(events, media_type="text/event-stream")
 
 @app.post(f"/tags/", response_model=TagsResponse)
 async def post_tags(
         request: TagsRequest,
         configs: dict = Depends(get_route_configs),
-        session: Session = Depends(get_session),
+        session: Session = Depends(get_route_session),
     ):
     """Return a response including the tags extracted from the specified content"""
-    return handle_request('tags', request, configs, session)
+    return await handle_request('tags', request, configs, session)
+
+@app.get(f"/executors/")
+async def get_executors():
+    """Return the concurrency, queue time and run time metrics of each operation executor"""
+    return {name: executor.stats() for name, executor in EXECUTORS.items()}
+
+@app.get(f"/batchers/")
+async def get_batchers():
+    """Return the batch counters and fill ratio of each model micro-batcher"""
+    return batcher_stats()
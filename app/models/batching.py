@@ -0,0 +1,167 @@
+"""Dynamic micro-batching: merge concurrent single-input model calls into padded batch forwards."""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from app.models.registry import MODEL_REGISTRY
+from app.settings import get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Extract constants from settings
+settings = get_settings().model.inference
+MICRO_BATCHING = settings.micro_batching
+MAX_BATCH_SIZE = settings.micro_batch_size
+MAX_WAIT_MS = settings.micro_batch_wait_ms
+
+# Define the queue item that stops a batching thread
+STOP = object()
+
+
+class MicroBatcher:
+    """Collect submitted inputs into batches of up to max_batch_size or max_wait_ms and run them together
+
+    The batch function receives a list of inputs and must return one result per input, in order.
+    A single background thread runs the batches, callers block on (or await) a future per input.
+    """
+
+    def __init__(self, name: str, batch_function: Callable[[list], list], max_batch_size: int=32, max_wait_ms: float=5.0):
+        self.name = name
+        self.batch_function = batch_function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread = None
+        self._pid: int = None
+        self._counters = dict(batches=0, items=0, failed=0)
+
+    def submit(self, item: Any) -> Future:
+        """Queue a single input and return the future of its result"""
+        future = Future()
+        with self._lock:
+            self._ensure_worker()
+            self._queue.put((item, future))
+        return future
+
+    def map(self, items: list) -> list:
+        """Queue several inputs and return their results in order"""
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def __call__(self, item: Any) -> Any:
+        """Queue a single input and wait for its result"""
+        return self.submit(item).result()
+
+    def stats(self) -> dict:
+        """Return the batch counters and the mean batch fill ratio"""
+        with self._lock:
+            batches, items = self._counters["batches"], self._counters["items"]
+            fill_ratio = items / (batches * self.max_batch_size) if batches else 0.0
+            return dict(
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait * 1000,
+                **self._counters,
+                mean_batch_size=round(items / batches, 3) if batches else 0.0,
+                fill_ratio=round(fill_ratio, 4),
+            )
+
+    def stop(self) -> None:
+        """Stop the batching thread once it has run the inputs already queued
+
+        Inputs submitted afterwards are queued for a new thread, started on demand.
+        """
+        with self._lock:
+            if self._worker is None:
+                return
+            self._queue.put(STOP)
+            self._queue, self._worker = queue.Queue(), None
+
+    def _ensure_worker(self) -> None:
+        """Start the batching thread on first use (and again in forked worker processes or after a stop)"""
+        if self._worker is not None and self._worker.is_alive() and self._pid == os.getpid():
+            return
+        # Threads do not survive a fork, so pending inputs from the parent are discarded
+        if self._pid is not None and self._pid != os.getpid():
+            self._queue = queue.Queue()
+        self._pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, args=(self._queue,), name=f"batcher-{self.name}", daemon=True)
+        self._worker.start()
+
+    def _collect(self, inputs: queue.Queue) -> tuple[list[tuple[Any, Future]], bool]:
+        """Block for the first input, then gather more until the batch is full, the wait expires or a stop"""
+        batch, deadline = [], None
+        while len(batch) < self.max_batch_size:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = inputs.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is STOP:
+                return batch, True
+            batch.append(item)
+            deadline = deadline or time.monotonic() + self.max_wait
+        return batch, False
+
+    def _run(self, inputs: queue.Queue) -> None:
+        stopped = False
+        while not stopped:
+            batch, stopped = self._collect(inputs)
+            # Skip inputs whose callers have cancelled their futures
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = list(self.batch_function([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} inputs.")
+            except Exception as e:
+                LOGGER.exception(f"Batch of {len(batch)} '{self.name}' inputs failed.")
+                with self._lock:
+                    self._counters["failed"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            # Scatter each result back to the future of its input
+            with self._lock:
+                self._counters["batches"] += 1
+                self._counters["items"] += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+def micro_batcher(name: str, batch_function: Callable[[list], list]) -> MicroBatcher | None:
+    """Return a registered micro-batcher for the named model, or None if micro-batching is disabled"""
+    if not MICRO_BATCHING:
+        return None
+    batcher = MicroBatcher(name, batch_function, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
+    BATCHERS[name] = batcher
+    return batcher
+
+
+def stop_batcher(key: str) -> None:
+    """Stop the micro-batcher of an evicted model so its thread no longer holds the model"""
+    batcher = BATCHERS.pop(key.split(":")[0], None)
+    if batcher is not None:
+        batcher.stop()
+
+
+def batcher_stats() -> dict[str, dict]:
+    """Return the stats of each registered micro-batcher"""
+    return {name: batcher.stats() for name, batcher in BATCHERS.items()}
+
+
+# Define the micro-batchers of all loaded models, stopped when their model is evicted
+BATCHERS: dict[str, MicroBatcher] = {}
+MODEL_REGISTRY.add_eviction_hook(stop_batcher)
@@ -0,0 +1,229 @@
+"""Content-addressed inference result caches for model wrapper functions."""
+
+import copy
+import hashlib
+import json
+import numpy
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable
+
+from app.settings import get_settings
+
+
+class InferenceCache:
+    """A thread-safe, bounded LRU cache of model results with hit, miss and eviction counters
+
+    Each result is stored with the id of the model that computed it, so an eviction is counted
+    against the model whose result was evicted rather than the model inserting a new one. Results
+    are copied on the way in and out, so callers mutating a result cannot corrupt later hits.
+    """
+
+    def __init__(self, max_size: int=4096):
+        self.max_size = max_size
+        self._results: OrderedDict[str, tuple[str, Any]] = OrderedDict()
+        self._counters: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_id: str, key: str) -> tuple[bool, Any]:
+        """Return a (found, result) pair for the supplied key"""
+        with self._lock:
+            found = key in self._results
+            if found:
+                self._results.move_to_end(key)
+            self._count(model_id, "hits" if found else "misses")
+            result = self._results[key][1] if found else None
+        return found, copy.deepcopy(result)
+
+    def put(self, model_id: str, key: str, result: Any) -> None:
+        """Store a result, evicting the least recently used results when full"""
+        if self.max_size <= 0:
+            return
+
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._results[key] = (model_id, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                _, (owner_id, _) = self._results.popitem(last=False)
+                self._count(owner_id, "evictions")
+
+    def clear(self) -> None:
+        """Remove all cached results and reset the counters"""
+        with self._lock:
+            self._results.clear()
+            self._counters.clear()
+
+    def stats(self) -> dict:
+        """Return the cache size and the hit, miss and eviction counters of each model"""
+        with self._lock:
+            return dict(size=len(self._results), max_size=self.max_size, models=dict(self._counters))
+
+    def _count(self, model_id: str, counter: str) -> None:
+        counters = self._counters.setdefault(model_id, dict(hits=0, misses=0, evictions=0))
+        counters[counter] += 1
+
+
+class GenerationCache:
+    """A bounded, least-recently-used SQLite cache of generated sequences shared across processes
+
+    A connection is opened per operation so the cache is safe to use from threads and forked
+    workers alike. WAL journaling lets readers proceed while another worker writes.
+    """
+
+    def __init__(self, path: str, max_size: int=10000, timeout: float=30.0):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._initialized = False
+
+    def get(self, key: str) -> list[str] | None:
+        """Return the cached sequences of the supplied key, or None on a miss"""
+        if self.max_size <= 0:
+            return None
+
+        with self._connect() as connection:
+            row = connection.execute("SELECT sequences FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE generations SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, model_id: str, key: str, sequences: list[str]) -> None:
+        """Store generated sequences, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO generations (key, model_id, sequences, last_used) VALUES (?, ?, ?, ?)",
+                (key, model_id, json.dumps(sequences), time.time()),
+            )
+            connection.execute(
+                "DELETE FROM generations WHERE key IN "
+                "(SELECT key FROM generations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    def clear(self) -> None:
+        """Remove all cached generations"""
+        if self.max_size > 0:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM generations")
+
+    def stats(self) -> dict:
+        """Return the number of cached generations"""
+        if self.max_size <= 0:
+            return dict(size=0, max_size=0)
+        with self._connect() as connection:
+            size = connection.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        return dict(size=size, max_size=self.max_size)
+
+    def _connect(self) -> "_ClosingConnection":
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+
+        # Create the table on first use rather than when the module is imported
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS generations "
+                "(key TEXT PRIMARY KEY, model_id TEXT, sequences TEXT, last_used REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_generations_last_used ON generations (last_used)")
+            connection.commit()
+            self._initialized = True
+        return _ClosingConnection(connection)
+
+
+class _ClosingConnection:
+    """Commit (or roll back) and close a sqlite connection on exit, unlike sqlite3's own context manager"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        try:
+            if exc_type is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        finally:
+            self.connection.close()
+
+
+def generation_seed(key: str) -> int:
+    """Return a 32-bit random seed derived from a generation cache key"""
+    return int(key[:8], 16)
+
+
+def normalize_content(content: str) -> str:
+    """Return the content with whitespace collapsed so trivially re-saved text shares a key"""
+    return " ".join(content.split())
+
+
+def cache_key(model_id: str, content: str, *args, **kwargs) -> str:
+    """Return the sha256 key of the normalized content, model id and call arguments
+
+    Arguments must be JSON serializable, anything else (e.g. arrays whose str() is truncated)
+    could share a key with different values and is rejected.
+    """
+    try:
+        params = json.dumps([args, kwargs], sort_keys=True)
+    except TypeError as e:
+        raise TypeError(f"Cached calls of '{model_id}' require JSON serializable arguments: {e}") from e
+    digest = hashlib.sha256()
+    for part in (model_id, params, normalize_content(content)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cached_inference(model_id: str) -> Callable:
+    """Decorate a model wrapper to serve repeated content from the inference cache
+
+    Wrappers that accept a list of strings are cached per item, only uncached items are
+    passed on to the model (as a single list) and the results are returned in input order.
+    """
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(content: str | list[str], *args, **kwargs):
+            if isinstance(content, str):
+                key = cache_key(model_id, content, *args, **kwargs)
+                found, result = INFERENCE_CACHE.get(model_id, key)
+                if not found:
+                    result = function(content, *args, **kwargs)
+                    INFERENCE_CACHE.put(model_id, key, result)
+                return result
+
+            # Look up each item and run the model once on all cache misses
+            keys = [cache_key(model_id, item, *args, **kwargs) for item in content]
+            results = [INFERENCE_CACHE.get(model_id, key) for key in keys]
+            missing = [i for i, (found, _) in enumerate(results) if not found]
+            results = [result for _, result in results]
+            if missing:
+                computed = function([content[i] for i in missing], *args, **kwargs)
+                for i, result in zip(missing, computed):
+                    results[i] = result
+                    INFERENCE_CACHE.put(model_id, keys[i], result)
+
+            # Preserve array outputs (e.g. embeddings) for list inputs
+            if len(results) and isinstance(results[0], numpy.ndarray):
+                return numpy.stack(results)
+            return results
+
+        return wrapper
+
+    return decorator
+
+
+# Define the shared inference and generation caches
+settings = get_settings().model.inference
+INFERENCE_CACHE = InferenceCache(max_size=settings.cache_size)
+GENERATION_CACHE = GenerationCache(settings.generation_cache_path, max_size=settings.generation_cache_size)
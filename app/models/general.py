@@ -1,34 +1,198 @@
+import numpy
 import spacy
 
 from functools import lru_cache
+from typing import Iterable, Iterator
 
 from sentence_transformers import SentenceTransformer
-from transformers import pipeline
+from spacy.tokens import Doc
 
+from app.models.batching import MAX_BATCH_SIZE, micro_batcher
+from app.models.cache import cached_inference
+from app.models.registry import register_model
+from app.models.runtime import load_classifier, softmax
+from app.settings import get_settings
 
-@lru_cache(maxsize=1)
+
+# Extract constants from settings
+settings = get_settings()
+BATCH_SIZE = settings.model.inference.batch_size
+DOCUMENT_BATCH_SIZE = settings.model.inference.document_batch_size
+DOCUMENT_N_PROCESS = settings.model.inference.document_n_process
+
+# Define the zero-shot NLI model and the hypothesis template applied to each label
+CLASSIFIER_MODEL = 'facebook/bart-large-mnli'
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+# Define the spacy components each task requires, None runs the full default pipeline
+DOCUMENT_TASKS = {
+    "full": None,
+    "sentences": ["senter"],
+    "entities": ["ner"],
+    "text": [],
+}
+
+
+@register_model("classifier")
 def get_classifier_model():
-    """Return the zero-shot classification pipeline or a mock function in debug mode"""
-    pipe = pipeline(model='facebook/bart-large-mnli')
+    """Return the batched zero-shot classification function or a mock function in debug mode"""
+    classifier = load_classifier("classifier", CLASSIFIER_MODEL)
+    tokenizer = classifier.tokenizer
+
+    # Locate the entailment and contradiction logits in the model output
+    label_ids = {label.lower(): i for label, i in classifier.config.label2id.items()}
+    entailment_id, contradiction_id = label_ids['entailment'], label_ids['contradiction']
+    n_special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+
+    @lru_cache(maxsize=512)
+    def encode_hypothesis(label: str) -> tuple:
+        """Return the cached token ids of the templated hypothesis for a label"""
+        hypothesis = HYPOTHESIS_TEMPLATE.format(label)
+        return tuple(tokenizer.encode(hypothesis, add_special_tokens=False))
+
+    def encode_pairs(content: str, label_sets: dict) -> tuple[list, dict]:
+        """Return the (premise, hypothesis) features of every label and the span of each label set"""
+        # Tokenize the premise once and pair it with every cached hypothesis
+        premise_ids = tokenizer.encode(content, add_special_tokens=False)
+        features, spans = [], {}
+        for name, labels in label_sets.items():
+            start = len(features)
+            for label in labels:
+                hypothesis_ids = list(encode_hypothesis(label))
+                max_premise = tokenizer.model_max_length - len(hypothesis_ids) - n_special_tokens
+                input_ids = tokenizer.build_inputs_with_special_tokens(premise_ids[:max_premise], hypothesis_ids)
+                features.append({'input_ids': input_ids})
+            spans[name] = (start, len(features))
+        return features, spans
+
+    def split_scores(logits: numpy.ndarray, spans: dict, multi_label: bool=False) -> dict:
+        """Split the entailment logits of a content's pairs back into their label sets"""
+        scores = {}
+        for name, (start, end) in spans.items():
+            set_logits = logits[start:end]
+            if multi_label:
+                # Score each label independently (entailment vs. contradiction)
+                pair_logits = set_logits[:, [contradiction_id, entailment_id]]
+                set_scores = softmax(pair_logits, axis=-1)[:, 1]
+            else:
+                # Normalize the entailment scores across all labels in the set
+                set_scores = softmax(set_logits[:, entailment_id], axis=0)
+            scores[name] = set_scores.tolist()
+        return scores
+
+    @cached_inference(CLASSIFIER_MODEL)
+    def score_labels(content: str | list[str], candidate_labels: list | dict, multi_label: bool=False, 
+            batch_size: int=BATCH_SIZE) -> list | dict:
+        """Return the classification scores for a list or a dict of named label sets
+
+        A list of contents returns the scores of each content, with the pairs of several contents
+        run together in length-sorted batches of up to batch_size pairs (at least one content each).
+        """
+        # Treat a plain list of labels as a single unnamed label set
+        is_named = isinstance(candidate_labels, dict)
+        label_sets = candidate_labels if is_named else {None: candidate_labels}
+        contents = [content] if isinstance(content, str) else content
+
+        encoded = [encode_pairs(c, label_sets) for c in contents]
+        n_pairs = len(encoded[0][0]) if encoded else 0
+        if not n_pairs:
+            empty = [{} if is_named else [] for _ in contents]
+            return empty[0] if isinstance(content, str) else empty
 
-    def score_labels(content: str, candidate_labels: list, **kwargs) -> list:
-        """Return the classification scores for the candidate labels"""
-        result = pipe(content, candidate_labels=candidate_labels, **kwargs)
-        scores = {label: score for label, score in zip(result['labels'], result['scores'])} 
+        # Sort contents by length so each batch is padded to a similar length
+        order = sorted(range(len(contents)), key=lambda i: len(encoded[i][0][-1]['input_ids']))
+        contents_per_batch = max(batch_size // n_pairs, 1)
+        results = [None] * len(contents)
+        for start in range(0, len(order), contents_per_batch):
+            batch_indices = order[start:start + contents_per_batch]
+            features = [feature for i in batch_indices for feature in encoded[i][0]]
+            logits = classifier.forward(classifier.pad(features))
+            for j, i in enumerate(batch_indices):
+                scores = split_scores(logits[j * n_pairs:(j + 1) * n_pairs], encoded[i][1], multi_label)
+                # Return scores in the order the labels were provided
+                results[i] = scores if is_named else scores[None]
 
-        # Return scores in the order the labels were provided
-        return [scores[k] for k in candidate_labels]
+        return results[0] if isinstance(content, str) else results
     
     return score_labels
 
 
-@lru_cache(maxsize=1)
+@register_model("sentence")
+def get_sentence_model():
+    """Return the shared sentence transformer instance"""
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+@register_model("embedding")
 def get_embedding_model():
     """Return the language embedding model or a mock function in debug mode"""
-    return SentenceTransformer('all-MiniLM-L6-v2').encode
+    sentence_model = get_sentence_model()
+
+    # Merge the few-string inputs of concurrent requests into shared batches if enabled
+    batcher = micro_batcher("embedding", lambda content: list(sentence_model.encode(content)))
+
+    def encode(content: str | list[str], **kwargs) -> numpy.ndarray:
+        """Return the embedding of a string or the (n, dim) embeddings of a list of strings"""
+        if batcher is None or kwargs:
+            return sentence_model.encode(content, **kwargs)
+        if isinstance(content, str):
+            return batcher(content)
+        # Large lists already fill a batch on their own
+        if len(content) >= MAX_BATCH_SIZE:
+            return sentence_model.encode(content)
+        return numpy.stack(batcher.map(content)) if content else sentence_model.encode(content)
+
+    # Cache embeddings per input string, only new strings are encoded
+    return cached_inference(EMBEDDING_MODEL)(encode)
+
+
+class DocumentModel:
+    """A spacy pipeline with task-scoped views that disable all unneeded components"""
+
+    def __init__(self, nlp: spacy.Language):
+        # The statistical sentence segmenter is disabled by default, only sentence tasks use it
+        self.nlp = nlp
+        self.defaults = list(nlp.pipe_names)
+        tasks = dict(DOCUMENT_TASKS)
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+        elif "senter" not in nlp.pipe_names:
+            # Fall back to the dependency parser for sentence boundaries
+            tasks["sentences"] = ["parser"]
+        self.disabled = {task: self.disabled_components(components) for task, components in tasks.items()}
+
+    def disabled_components(self, components: list=None) -> list[str]:
+        """Return the components to disable to run only the supplied components"""
+        if components is None:
+            return [name for name in self.nlp.pipe_names if name not in self.defaults]
+
+        # Keep any shared embedding layers the required components listen to
+        required = set(components)
+        for name, component in self.nlp.pipeline:
+            listeners = getattr(component, "listening_components", [])
+            if required.intersection(listeners):
+                required.add(name)
+        return [name for name in self.nlp.pipe_names if name not in required]
+
+    def __call__(self, content: str, task: str="full") -> Doc:
+        """Return the spacy Doc of the supplied content processed for the given task"""
+        if task == "text":
+            # Only tokenize the content when no components are needed
+            return self.nlp.make_doc(content)
+        return self.nlp(content, disable=self.disabled[task])
+
+    def pipe(self, contents: Iterable[str], task: str="full", batch_size: int=None, n_process: int=None) -> Iterator[Doc]:
+        """Yield the spacy Doc of each supplied content processed in batches for the given task"""
+        return self.nlp.pipe(
+            contents, 
+            disable=self.disabled[task], 
+            batch_size=batch_size or DOCUMENT_BATCH_SIZE, 
+            n_process=n_process or DOCUMENT_N_PROCESS,
+        )
 
 
-@lru_cache(maxsize=1)
+@register_model("document")
 def get_document_model():
     """Return the spacy NLP model or a blank model in debug mode"""
-    return spacy.load("en_core_web_lg")
+    return DocumentModel(spacy.load("en_core_web_lg"))
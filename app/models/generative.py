@@ -1,9 +1,17 @@
+import copy
+import hashlib
+import re
+import threading
 import torch
-import transformers
 
-from functools import lru_cache
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from collections import OrderedDict
+from typing import Iterator
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
+from transformers import LogitsProcessor, LogitsProcessorList, StoppingCriteria, StoppingCriteriaList
+from transformers import TemperatureLogitsWarper, TopKLogitsWarper, TopPLogitsWarper
 
+from app.models.cache import GENERATION_CACHE, cache_key, generation_seed
+from app.models.registry import register_model
 from app.settings import get_settings
 
 
@@ -11,27 +19,262 @@ from app.settings import get_settings
 settings = get_settings()
 DEFAULT_MODEL = settings.model.language_model
 DEFAULT_KWARGS = settings.model.transformers.model_dump()
+BATCH_SIZE = settings.model.inference.batch_size
+PREFIX_CACHE_SIZE = settings.model.inference.prefix_cache_size
+DETERMINISTIC = settings.model.inference.deterministic
 
+# Define the number of words after which an unterminated list item is treated as prose
+MAX_ITEM_WORDS = 24
 
-@lru_cache(maxsize=1)
+
+class ListStoppingCriteria(StoppingCriteria):
+    """Stop each sequence once it completes max_items list items or stops looking like a list"""
+
+    def __init__(self, tokenizer, prompt_length: int, max_items: int, item_pattern: str, max_item_words: int=MAX_ITEM_WORDS):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.max_items = max_items
+        self.item_pattern = re.compile(item_pattern)
+        self.max_item_words = max_item_words
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        texts = self.tokenizer.batch_decode(input_ids[:, self.prompt_length:], skip_special_tokens=True)
+        is_done = []
+        for text in texts:
+            # Every substring followed by a delimiter is a complete item, the last may still be growing
+            substrings = self.item_pattern.split(text)
+            n_items = sum(1 for s in substrings[:-1] if re.search(r'[a-zA-Z]', s))
+            is_prose = len(substrings[-1].split()) > self.max_item_words
+            is_done.append(n_items >= self.max_items or is_prose)
+        return torch.tensor(is_done, dtype=torch.bool, device=input_ids.device)
+
+
+class SeededSampling(LogitsProcessor):
+    """Sample the next token of each sequence from a private seeded generator and mask every other token
+
+    Generate samples from the global random number generators that concurrent calls share. This
+    applies the temperature, top-k and top-p warpers itself (generate's own are disabled), draws
+    from its own generator and leaves generate a single possible token, so no lock is needed.
+    """
+
+    def __init__(self, seed: int, temperature: float=None, top_k: int=None, top_p: float=None):
+        self.seed = seed
+        self.generator = None
+        self.warpers = LogitsProcessorList()
+        if temperature is not None and temperature != 1.0:
+            self.warpers.append(TemperatureLogitsWarper(temperature))
+        if top_k:
+            self.warpers.append(TopKLogitsWarper(top_k))
+        if top_p is not None and top_p < 1.0:
+            self.warpers.append(TopPLogitsWarper(top_p))
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        # Create the generator on the device of the scores (the last device of a dispatched model)
+        if self.generator is None:
+            self.generator = torch.Generator(device=scores.device).manual_seed(self.seed)
+        probs = torch.softmax(self.warpers(input_ids, scores).float(), dim=-1)
+        tokens = torch.multinomial(probs, num_samples=1, generator=self.generator)
+        return torch.full_like(scores, -float("inf")).scatter_(1, tokens, 0.0)
+
+
+def stream_generation(streamer, target: callable, *args, **kwargs) -> Iterator[str]:
+    """Run a generate call in a background thread and yield the text of its streamer
+
+    If generation fails the streamer is ended so iteration stops, and the error is re-raised in
+    the consuming thread instead of leaving it blocked on a streamer that never finishes.
+    """
+    errors = []
+
+    def run():
+        try:
+            target(*args, **kwargs)
+        except BaseException as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    yield from streamer
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+@register_model("generative")
 def get_generative_model():
-    """Return the text generation pipeline or a mock function in debug mode"""
+    """Return the text generation function or a mock function in debug mode"""
     # Initialize the content generation model and tokenizer
     tokenizer = AutoTokenizer.from_pretrained(DEFAULT_MODEL)
     model = AutoModelForCausalLM.from_pretrained(DEFAULT_MODEL, torch_dtype=torch.bfloat16, device_map="auto")
-    generator = transformers.pipeline("text-generation", model=model, tokenizer=tokenizer)
     default_kwargs = DEFAULT_KWARGS.copy()
 
-    def get_model_inference(content: str, **kwargs) -> list:
-        """Return generated text from the model"""
+    # Left-pad batched prompts so every sequence continues from its last prompt token
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    def add_stopping_criteria(model_kwargs: dict, prompt_length: int) -> dict:
+        """Replace the list stopping arguments with a list-aware stopping criterion"""
+        model_kwargs = dict(model_kwargs)
+        max_items = model_kwargs.pop("max_items", None)
+        item_pattern = model_kwargs.pop("item_pattern", None)
+        if max_items and item_pattern:
+            criteria = ListStoppingCriteria(tokenizer, prompt_length, max_items, item_pattern)
+            model_kwargs["stopping_criteria"] = StoppingCriteriaList([criteria])
+        return model_kwargs
+
+    def add_seeded_sampling(model_kwargs: dict, seed: int) -> dict:
+        """Sample with a private generator seeded with the supplied seed instead of the global generators"""
+        model_kwargs = dict(model_kwargs)
+        config = model.generation_config
+        sampling = SeededSampling(
+            seed,
+            temperature=model_kwargs.pop("temperature", config.temperature),
+            top_k=model_kwargs.pop("top_k", config.top_k),
+            top_p=model_kwargs.pop("top_p", config.top_p),
+        )
+        model_kwargs["logits_processor"] = LogitsProcessorList([*model_kwargs.get("logits_processor", []), sampling])
+        return dict(model_kwargs, temperature=1.0, top_k=0, top_p=1.0)
+
+    def generate_batch(prompts: list[str], **model_kwargs) -> list[list[str]]:
+        """Return the generated sequences of each prompt from a single generate call"""
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+        model_kwargs = add_stopping_criteria(model_kwargs, inputs["input_ids"].shape[1])
+        with torch.no_grad():
+            outputs = model.generate(**inputs, do_sample=True, pad_token_id=tokenizer.pad_token_id, **model_kwargs)
+
+        # Decode only the generated tokens and group the returned sequences by prompt
+        texts = tokenizer.batch_decode(outputs[:, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+        n_sequences = model_kwargs.get("num_return_sequences", 1)
+        return [texts[i:i + n_sequences] for i in range(0, len(texts), n_sequences)]
+
+    # Keep the prefilled key/values of recent shared prompt prefixes (keyed by content hash)
+    prefix_caches = OrderedDict()
+    prefix_lock = threading.Lock()
+
+    def prefill(prefix: str) -> tuple:
+        """Return the token ids and cached key/values of a prompt prefix, prefilling on a miss"""
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with prefix_lock:
+            if key in prefix_caches:
+                prefix_caches.move_to_end(key)
+                return prefix_caches[key]
+
+        prefix_ids = tokenizer(prefix, return_tensors="pt").input_ids.to(model.device)
+        with torch.no_grad():
+            past_key_values = model(input_ids=prefix_ids, use_cache=True).past_key_values
+
+        with prefix_lock:
+            prefix_caches[key] = (prefix_ids, past_key_values)
+            while len(prefix_caches) > PREFIX_CACHE_SIZE:
+                prefix_caches.popitem(last=False)
+        return prefix_ids, past_key_values
+
+    def generate_with_prefix(prefix: str, suffixes: list[str], **model_kwargs) -> list[list[str]]:
+        """Return the generated sequences of each suffix from a single generate call over the prefilled prefix
+
+        The prefix key/values are copied and expanded to one row per returned sequence, the suffixes
+        are left-padded after the prefix (padding is masked out) so only their tokens are prefilled.
+        """
+        prefix_ids, prefix_cache = prefill(prefix)
+        n_sequences = model_kwargs.get("num_return_sequences", 1)
+
+        # Only the suffix tokens are processed before decoding starts
+        suffix_inputs = tokenizer(suffixes, add_special_tokens=False, padding=True, return_tensors="pt").to(model.device)
+        n_suffixes = suffix_inputs["input_ids"].shape[0]
+        input_ids = torch.cat([prefix_ids.expand(n_suffixes, -1), suffix_inputs["input_ids"]], dim=-1)
+        attention_mask = torch.cat([torch.ones_like(prefix_ids).expand(n_suffixes, -1), suffix_inputs["attention_mask"]], dim=-1)
+
+        # Generate expands the inputs (not the cache) by num_return_sequences, so expand the cache rows here
+        past_key_values = copy.deepcopy(prefix_cache)
+        past_key_values.batch_repeat_interleave(n_suffixes * n_sequences)
+
+        # The explicit cache replaces the one the generation config would build (e.g. "hybrid")
+        model_kwargs = add_stopping_criteria(model_kwargs, input_ids.shape[1])
+        with torch.no_grad():
+            outputs = model.generate(
+                input_ids=input_ids, 
+                attention_mask=attention_mask, 
+                past_key_values=past_key_values, 
+                cache_implementation=None,
+                do_sample=True, 
+                pad_token_id=tokenizer.pad_token_id, 
+                **model_kwargs
+            )
+
+        # Decode only the generated tokens and group the returned sequences by suffix
+        texts = tokenizer.batch_decode(outputs[:, input_ids.shape[1]:], skip_special_tokens=True)
+        return [texts[i:i + n_sequences] for i in range(0, len(texts), n_sequences)]
+
+    def generate_deterministic(prompts: list[str], prefix: str=None, **model_kwargs) -> list[list[str]]:
+        """Return seeded sequences of each prompt, serving repeated requests from the generation cache"""
+        keys = [cache_key(DEFAULT_MODEL, (prefix or "") + prompt, **model_kwargs) for prompt in prompts]
+        sequences = [GENERATION_CACHE.get(key) for key in keys]
+
+        # Generate each miss on its own so its output only depends on its own seed
+        for i, key in enumerate(keys):
+            if sequences[i] is not None:
+                continue
+            seeded_kwargs = add_seeded_sampling(model_kwargs, generation_seed(key))
+            if prefix is not None:
+                sequences[i] = generate_with_prefix(prefix, [prompts[i]], **seeded_kwargs)[0]
+            else:
+                sequences[i] = generate_batch([prompts[i]], **seeded_kwargs)[0]
+            GENERATION_CACHE.put(DEFAULT_MODEL, key, sequences[i])
+
+        return sequences
+
+    def stream_inference(content: str, prefix: str=None, **model_kwargs) -> Iterator[str]:
+        """Yield the generated text of a single prompt as it is decoded"""
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        model_kwargs = dict(model_kwargs, num_return_sequences=1, streamer=streamer)
+
+        # Generate in a background thread while the streamer yields decoded text
+        if prefix is not None:
+            yield from stream_generation(streamer, generate_with_prefix, prefix, [content], **model_kwargs)
+        else:
+            yield from stream_generation(streamer, generate_batch, [content], **model_kwargs)
+
+    def get_model_inference(content: str | list[str], prefix: str=None, stream: bool=False, 
+            deterministic: bool=DETERMINISTIC, **kwargs) -> list:
+        """Return generated text from the model for a prompt or a list of prompts
+
+        If a prefix is supplied, each prompt is treated as a suffix of the shared prefix and the
+        prefix is only prefilled once (then reused from an LRU cache of recent prefixes). If stream
+        is set, an iterator of text chunks of a single prompt is returned instead. If max_items and
+        an item_pattern (list delimiter regex) are supplied, each sequence stops decoding once it
+        has completed max_items list items or an item grows into prose. If deterministic is set,
+        each prompt is sampled with a seed derived from its inputs and the model id, and the output
+        is stored in (and served from) the on-disk generation cache shared by all workers.
+        """
         if len(kwargs):
             model_kwargs = default_kwargs.copy()
             model_kwargs.update(kwargs)
         else:
             model_kwargs = default_kwargs
 
-        # For each returned text sequence extract the generated content
-        sequences = generator(content, do_sample=True, return_full_text=False, **model_kwargs)
-        return [sequence["generated_text"] for sequence in sequences]
+        if stream:
+            return stream_inference(content, prefix=prefix, **model_kwargs)
+
+        if deterministic:
+            prompts = [content] if isinstance(content, str) else content
+            sequences = generate_deterministic(prompts, prefix=prefix, **model_kwargs)
+            return sequences[0] if isinstance(content, str) else sequences
+
+        if prefix is not None:
+            suffixes = [content] if isinstance(content, str) else content
+            sequences = []
+            for start in range(0, len(suffixes), BATCH_SIZE):
+                sequences += generate_with_prefix(prefix, suffixes[start:start + BATCH_SIZE], **model_kwargs)
+            return sequences[0] if isinstance(content, str) else sequences
+
+        if isinstance(content, str):
+            return generate_batch([content], **model_kwargs)[0]
+
+        # Generate the sequences of all prompts in left-padded batches
+        sequences = []
+        for start in range(0, len(content), BATCH_SIZE):
+            sequences += generate_batch(content[start:start + BATCH_SIZE], **model_kwargs)
+        return sequences
 
     return get_model_inference
@@ -1,13 +1,26 @@
 import keybert
+import numpy
 import yake
 
-from functools import lru_cache
+from sklearn.feature_extraction.text import CountVectorizer
 
+from app.models.general import get_embedding_model, get_sentence_model
+from app.models.registry import register_model
 
-@lru_cache(maxsize=1)
-def get_keyword_model(top_n: int=10):
+
+# Define the KeyBERT candidate vectorizer arguments
+NGRAM_RANGE = (1, 1)
+STOP_WORDS = 'english'
+
+# Define the number of keyword candidates extracted per request (and preloaded)
+TOP_N = 10
+
+
+@register_model("keyword", top_n=TOP_N)
+def get_keyword_model(top_n: int=TOP_N):
     """Return the keyword extraction model or a mock function in debug mode"""
-    key_bert = keybert.KeyBERT('all-MiniLM-L6-v2')
+    # Share the sentence transformer instance held by the embedding model
+    key_bert = keybert.KeyBERT(get_sentence_model())
     yake_extractor = yake.KeywordExtractor(
             lan="en", 
             n=1, 
@@ -17,21 +30,49 @@ def get_keyword_model(top_n: int=10):
             features=None
         )
     
-    def extract_keywords(content: str) -> list:
-        """Extract bert and yake keywords"""
-        bert_keywords = key_bert.extract_keywords(
-            content, 
-            keyphrase_ngram_range=(1, 1), 
-            stop_words='english', 
-            top_n=top_n // 2, 
-            use_mmr=False
-        )
+    def extract_keywords(content: str, doc_embedding: numpy.ndarray=None) -> tuple[list, numpy.ndarray]:
+        """Extract bert and yake keywords and return them with their embeddings"""
+        embedding_model = get_embedding_model()
+        if doc_embedding is None:
+            doc_embedding = embedding_model([content])
+
+        # Embed the same candidate words KeyBERT extracts so it never re-embeds them
+        try:
+            vectorizer = CountVectorizer(ngram_range=NGRAM_RANGE, stop_words=STOP_WORDS).fit([content])
+            words = list(vectorizer.get_feature_names_out())
+        except ValueError:
+            # The content only contains stop words
+            words = []
+        word_embeddings = embedding_model(words) if words else None
+
+        bert_keywords = []
+        if words:
+            bert_keywords = key_bert.extract_keywords(
+                content, 
+                keyphrase_ngram_range=NGRAM_RANGE, 
+                stop_words=STOP_WORDS, 
+                top_n=top_n // 2, 
+                use_mmr=False,
+                doc_embeddings=doc_embedding,
+                word_embeddings=word_embeddings,
+            )
         bert_keywords = [phrase for phrase, score in bert_keywords]
         yake_keywords = yake_extractor.extract_keywords(content)
         yake_keywords = [phrase for phrase, score in yake_keywords]
 
         # Get unique combined keywords
-        keywords = bert_keywords + yake_keywords
-        return list({k.lower() for k in keywords})
+        keywords = list({k.lower() for k in bert_keywords + yake_keywords})
+        if not keywords:
+            return [], None
+
+        # Reuse the KeyBERT candidate embeddings, only embedding keywords outside its vocabulary
+        word_index = {word: i for i, word in enumerate(words)}
+        missing = [k for k in keywords if k not in word_index]
+        missing_embeddings = dict(zip(missing, embedding_model(missing))) if missing else {}
+        embeddings = [
+            word_embeddings[word_index[k]] if k in word_index else missing_embeddings[k] 
+            for k in keywords
+        ]
+        return keywords, numpy.stack(embeddings)
     
     return extract_keywords
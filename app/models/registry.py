@@ -0,0 +1,263 @@
+"""Central model registry: lazy loading, resident size tracking and least-recently-used eviction."""
+
+import gc
+import logging
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable
+
+import psutil
+
+from app.settings import get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelEntry:
+    """A loaded model instance and its bookkeeping"""
+    key: str
+    model: Any
+    size: int = 0
+    loaded_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    dependencies: set[str] = field(default_factory=set)
+
+
+class ModelRegistry:
+    """Load models on first use and evict idle models when the memory budget is exceeded"""
+
+    def __init__(self, memory_budget: int=0, idle_seconds: float=0.0, preload: list=None):
+        self.memory_budget = memory_budget
+        self.idle_seconds = idle_seconds
+        self.pinned = set(preload or [])
+        self._loaders: dict[str, Callable] = {}
+        self._preload_kwargs: dict[str, dict] = {}
+        self._entries: OrderedDict[str, ModelEntry] = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: dict[str, threading.RLock] = {}
+        self._loading = threading.local()
+        self._eviction_hooks: list[Callable[[str], None]] = []
+
+    def register(self, name: str, loader: Callable, **preload_kwargs) -> None:
+        """Register a loader function under the supplied model name
+
+        Preload kwargs are the loader arguments request paths use, so preloading a model loads the
+        instance (and registry key) those requests resolve to.
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            self._preload_kwargs[name] = preload_kwargs
+
+    def add_eviction_hook(self, hook: Callable[[str], None]) -> None:
+        """Call the supplied function with the key of every evicted model (e.g. to stop its threads)"""
+        with self._lock:
+            self._eviction_hooks.append(hook)
+
+    def get(self, name: str, *args, **kwargs) -> Any:
+        """Return the named model, loading it (with the supplied arguments) on first use
+
+        Only loads of the same key wait for each other, lookups of loaded models never wait on a load.
+        """
+        key = model_key(name, *args, **kwargs)
+
+        # Record the model as a dependency of any model whose loader is running in this thread
+        stack = self._loading_stack()
+        if stack:
+            stack[-1]["dependencies"].add(key)
+
+        entry = self._touch(key)
+        if entry is not None:
+            return entry.model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.RLock())
+        evicted = []
+        with load_lock:
+            # Another thread may have finished loading the model while this one waited
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key, name, *args, **kwargs)
+                with self._lock:
+                    self._entries[key] = entry
+                    evicted = self._enforce_budget(exclude=key)
+
+        # Run eviction hooks and the collection without blocking lookups of other models
+        self._release(evicted)
+        self._touch(key)
+        return entry.model
+
+    def evict(self, key: str) -> bool:
+        """Drop a loaded model from the registry. Returns True if it was resident."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            evicted = [self._entries.pop(key)]
+
+        self._release(evicted)
+        return True
+
+    def preload(self, names: list=None) -> None:
+        """Load and pin the supplied (or configured) models ahead of the first request"""
+        names = list(self.pinned if names is None else names)
+        with self._lock:
+            self.pinned.update(names)
+        for name in names:
+            self.get(name, **self._preload_kwargs.get(name, {}))
+
+    def registered(self) -> list[str]:
+        """Return the names of all registered models"""
+        with self._lock:
+            return list(self._loaders.keys())
+
+    def resident_size(self) -> int:
+        """Return the tracked resident size of all loaded models in bytes"""
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+    def stats(self) -> dict[str, dict]:
+        """Return the size, idle time and dependencies of each loaded model"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: dict(
+                    size=entry.size,
+                    idle_seconds=round(now - entry.last_used, 3),
+                    dependencies=sorted(entry.dependencies),
+                )
+                for key, entry in self._entries.items()
+            }
+
+    def _touch(self, key: str) -> ModelEntry | None:
+        """Mark a loaded model as most recently used and return its entry, or None if not loaded"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                self._entries.move_to_end(key)
+            return entry
+
+    def _loading_stack(self) -> list[dict]:
+        """Return the stack of loads running in the current thread (outermost first)"""
+        if not hasattr(self._loading, "stack"):
+            self._loading.stack = []
+        return self._loading.stack
+
+    def _load(self, key: str, name: str, *args, **kwargs) -> ModelEntry:
+        """Call the registered loader and record the resident memory it added"""
+        if name not in self._loaders:
+            raise KeyError(f"Model '{name}' is not registered.")
+
+        # NOTE: Size is measured as the process RSS delta, minus the deltas of models loaded by the
+        # loader itself (they are tracked as dependencies with their own entries). Concurrent loads
+        # of other models in other threads can still inflate the measurement.
+        stack = self._loading_stack()
+        frame = dict(nested=0, dependencies=set())
+        stack.append(frame)
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        try:
+            model = self._loaders[name](*args, **kwargs)
+        finally:
+            stack.pop()
+        delta = max(process.memory_info().rss - rss_before, 0)
+
+        # Exclude this load (including its own dependencies) from the size of an enclosing load
+        if stack:
+            stack[-1]["nested"] += delta
+        size = max(delta - frame["nested"], 0)
+
+        entry = ModelEntry(key=key, model=model, size=size, dependencies=frame["dependencies"])
+        LOGGER.info(f"Loaded model '{key}' ({size / 2**20:.0f} MiB).")
+        return entry
+
+    def _is_evictable(self, key: str, entry: ModelEntry) -> bool:
+        """Return True if evicting a model would free its memory
+
+        Models used by another loaded model, or referenced outside the registry (by a caller, a
+        closure or a thread), stay resident after eviction, so they are not evicted.
+        """
+        if any(key in other.dependencies for other in self._entries.values()):
+            return False
+        # One reference is held by the entry and one by the getrefcount argument
+        return sys.getrefcount(entry.model) <= 2
+
+    def _enforce_budget(self, exclude: str=None) -> list[ModelEntry]:
+        """Remove least-recently-used idle models until the budget is satisfied and return their entries
+
+        The caller holds the registry lock and releases the returned entries after releasing it.
+        """
+        if not self.memory_budget:
+            return []
+
+        now = time.monotonic()
+        evicted = []
+        for key in list(self._entries.keys()):
+            if self.resident_size() <= self.memory_budget:
+                break
+
+            # Only idle, unpinned models that nothing else holds are eligible for eviction
+            entry = self._entries.get(key)
+            if entry is None or key == exclude or key.split(":")[0] in self.pinned:
+                continue
+            if now - entry.last_used < self.idle_seconds or not self._is_evictable(key, entry):
+                continue
+            evicted.append(self._entries.pop(key))
+
+        if self.resident_size() > self.memory_budget:
+            LOGGER.warning("Model memory budget exceeded with no idle models left to evict.")
+        return evicted
+
+    def _release(self, entries: list[ModelEntry]) -> None:
+        """Run the eviction hooks of removed entries and collect their models (without the registry lock)"""
+        if not entries:
+            return
+
+        with self._lock:
+            hooks = list(self._eviction_hooks)
+        for entry in entries:
+            for hook in hooks:
+                hook(entry.key)
+            LOGGER.info(f"Evicted model '{entry.key}' ({entry.size / 2**20:.0f} MiB).")
+        entries.clear()
+        gc.collect()
+
+
+def model_key(name: str, *args, **kwargs) -> str:
+    """Return the registry key of a model and its loader arguments"""
+    params = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in sorted(kwargs.items())]
+    return f"{name}:{','.join(params)}" if params else name
+
+
+def register_model(name: str, **preload_kwargs) -> Callable:
+    """Decorate a loader function, replacing it with a getter backed by the registry
+
+    Preload kwargs are passed to the loader when the model is preloaded, they must match the
+    arguments the model is requested with.
+    """
+    def decorator(loader: Callable) -> Callable:
+        MODEL_REGISTRY.register(name, loader, **preload_kwargs)
+
+        @wraps(loader)
+        def getter(*args, **kwargs):
+            return MODEL_REGISTRY.get(name, *args, **kwargs)
+
+        return getter
+
+    return decorator
+
+
+# Define the shared registry from the deployment settings
+settings = get_settings().model.registry
+MODEL_REGISTRY = ModelRegistry(
+    memory_budget=settings.memory_budget_mb * 2**20,
+    idle_seconds=settings.idle_seconds,
+    preload=settings.preload,
+)
@@ -0,0 +1,217 @@
+"""Sequence classifier runtime: serve encoder classifiers through eager PyTorch or ONNX Runtime."""
+
+import logging
+import numpy
+import torch
+
+from pathlib import Path
+from typing import Callable
+
+from filelock import FileLock
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+from app.settings import EncoderSettings, get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Extract constants from settings
+settings = get_settings()
+ENCODER_SETTINGS = settings.model.encoders
+ONNX_CACHE_DIR = Path(settings.model.inference.onnx_cache_dir)
+BATCH_SIZE = settings.model.inference.batch_size
+
+# Define the window size of tokenizers without a usable model maximum length
+DEFAULT_WINDOW_SIZE = 512
+
+
+class SequenceClassifier:
+    """A tokenizer and sequence classification model returning numpy logits"""
+
+    def __init__(self, model_id: str, tokenizer, config, model=None, session=None, settings: EncoderSettings=None):
+        self.model_id = model_id
+        self.tokenizer = tokenizer
+        self.config = config
+        self.model = model
+        self.session = session
+        self.settings = settings if settings is not None else EncoderSettings()
+
+        # Keep the window overlap below half a window so every window advances through the input
+        max_length = tokenizer.model_max_length if tokenizer.model_max_length < 1e6 else DEFAULT_WINDOW_SIZE
+        self.window_size = min(self.settings.window_size or max_length, max_length)
+        self.window_stride = min(self.settings.window_stride, self.window_size // 2)
+
+        # Tensors are returned in the format expected by the active backend
+        self.return_tensors = "np" if session is not None else "pt"
+        if session is not None:
+            self.input_names = [i.name for i in session.get_inputs()]
+
+    def encode(self, content: str | list[str], **kwargs):
+        """Tokenize the supplied content for the active backend"""
+        kwargs = dict(padding=True, truncation=True) | kwargs
+        return self.tokenizer(content, return_tensors=self.return_tensors, **kwargs)
+
+    def pad(self, features: list[dict]):
+        """Pad pre-tokenized features into a batch for the active backend"""
+        return self.tokenizer.pad(features, return_tensors=self.return_tensors)
+
+    def forward(self, inputs) -> numpy.ndarray:
+        """Return the classification logits for a tokenized batch"""
+        if self.session is not None:
+            feed = {name: numpy.asarray(inputs[name], dtype=numpy.int64) for name in self.input_names}
+            return self.session.run(["logits"], feed)[0]
+
+        with torch.no_grad():
+            return self.model(**inputs).logits.float().numpy()
+
+    def __call__(self, content: str | list[str], **kwargs) -> numpy.ndarray:
+        """Tokenize the supplied content and return the classification logits"""
+        return self.forward(self.encode(content, **kwargs))
+
+    def encode_windows(self, content: list[str]):
+        """Tokenize content into overlapping windows, returning the batch, each window's content index and token count"""
+        inputs = self.encode(
+            content, max_length=self.window_size, stride=self.window_stride, return_overflowing_tokens=True
+        )
+        mapping = numpy.asarray(inputs.pop("overflow_to_sample_mapping"))
+        lengths = numpy.asarray(inputs["attention_mask"]).sum(axis=-1)
+        return inputs, mapping, lengths
+
+    def windows(self, content: list[str], batch_size: int=BATCH_SIZE) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Return the logits, content index and token count of every window of the supplied content
+
+        All windows are forwarded together, in chunks of batch_size windows for very long inputs.
+        """
+        inputs, mapping, lengths = self.encode_windows(content)
+        logits = [
+            self.forward({name: values[start:start + batch_size] for name, values in inputs.items()})
+            for start in range(0, len(mapping), batch_size)
+        ]
+        return numpy.concatenate(logits), mapping, lengths
+
+    def score(self, content: str | list[str], score_function: Callable[[numpy.ndarray], numpy.ndarray]) -> numpy.ndarray:
+        """Return one score per content, scoring every window of long inputs if windowing is enabled
+
+        The score function maps a batch of logits to a score per row, window scores are then
+        aggregated per content with the configured reducer.
+        """
+        content = [content] if isinstance(content, str) else content
+        if not content:
+            return numpy.zeros(0)
+        if self.settings.long_inputs == "truncate":
+            return score_function(self(content))
+        logits, mapping, lengths = self.windows(content)
+        return reduce_windows(score_function(logits), mapping, lengths, len(content), self.settings.window_reducer)
+
+
+class LogitsModule(torch.nn.Module):
+    """Wrap a sequence classification model to export positional inputs and logits only"""
+
+    def __init__(self, model, input_names: list[str]):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *args):
+        return self.model(**dict(zip(self.input_names, args))).logits
+
+
+def load_classifier(name: str, model_id: str) -> SequenceClassifier:
+    """Load a sequence classifier with the backend configured for the named model"""
+    encoder_settings = ENCODER_SETTINGS.get(name, EncoderSettings())
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    config = AutoConfig.from_pretrained(model_id)
+
+    if encoder_settings.backend == "onnx":
+        session = load_onnx_session(model_id, tokenizer, encoder_settings.quantize)
+        return SequenceClassifier(model_id, tokenizer, config, session=session, settings=encoder_settings)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_id)
+    model.eval()
+    return SequenceClassifier(model_id, tokenizer, config, model=model, settings=encoder_settings)
+
+
+def load_onnx_session(model_id: str, tokenizer, quantize: bool=False):
+    """Return an onnxruntime session, exporting (and quantizing) the model on first use"""
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("The 'onnx' encoder backend requires the onnxruntime package.") from e
+
+    model_dir = ONNX_CACHE_DIR / model_id.replace("/", "--")
+    model_path = model_dir / ("model.int8.onnx" if quantize else "model.onnx")
+
+    # Serialize exports across workers sharing the same cache directory
+    model_dir.mkdir(parents=True, exist_ok=True)
+    with FileLock(str(model_dir / "export.lock")):
+        if not (model_dir / "model.onnx").exists():
+            export_onnx(model_id, tokenizer, model_dir / "model.onnx")
+        if quantize and not model_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(str(model_dir / "model.onnx"), str(model_path), weight_type=QuantType.QInt8)
+
+    return onnxruntime.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+
+
+def export_onnx(model_id: str, tokenizer, path: Path) -> None:
+    """Export a sequence classification model to an ONNX graph with dynamic batch and sequence axes"""
+    LOGGER.info(f"Exporting '{model_id}' to ONNX at {path}.")
+    model = AutoModelForSequenceClassification.from_pretrained(model_id)
+    model.eval()
+
+    # Trace the model with a small sample batch of the tokenizer's model inputs
+    sample = tokenizer(["sample text", "another sample text"], padding=True, return_tensors="pt")
+    input_names = [name for name in tokenizer.model_input_names if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    # Write to a temporary file first so a failed export never leaves a partial graph
+    temp_path = path.with_suffix(".tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsModule(model, input_names),
+            tuple(sample[name] for name in input_names),
+            str(temp_path),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    temp_path.replace(path)
+
+
+def softmax(logits: numpy.ndarray, axis: int=-1) -> numpy.ndarray:
+    """Return the numerically stable softmax of the supplied logits"""
+    exp = numpy.exp(logits - numpy.max(logits, axis=axis, keepdims=True))
+    return exp / numpy.sum(exp, axis=axis, keepdims=True)
+
+
+def sigmoid(logits: numpy.ndarray) -> numpy.ndarray:
+    """Return the element-wise sigmoid of the supplied logits"""
+    return 1.0 / (1.0 + numpy.exp(-logits))
+
+
+def top_label_scores(logits: numpy.ndarray, config) -> numpy.ndarray:
+    """Return the top label score of each row, matching the text-classification pipeline"""
+    # Multi-label and single-output models are scored with a sigmoid, all others with a softmax
+    if config.problem_type == "multi_label_classification" or config.num_labels == 1:
+        scores = sigmoid(logits)
+    else:
+        scores = softmax(logits)
+    return scores.max(axis=-1)
+
+
+def reduce_windows(scores: numpy.ndarray, mapping: numpy.ndarray, lengths: numpy.ndarray, n_content: int,
+        reducer: str="max") -> numpy.ndarray:
+    """Aggregate the scores of each content's windows by max, mean or token-weighted mean"""
+    scores = numpy.asarray(scores, dtype=numpy.float64)
+    if reducer == "max":
+        reduced = numpy.full(n_content, -numpy.inf)
+        numpy.maximum.at(reduced, mapping, scores)
+        return reduced
+
+    # Weight each window equally (mean) or by its number of tokens (weighted)
+    weights = numpy.asarray(lengths, dtype=numpy.float64) if reducer == "weighted" else numpy.ones_like(scores)
+    totals = numpy.bincount(mapping, weights=scores * weights, minlength=n_content)
+    return totals / numpy.bincount(mapping, weights=weights, minlength=n_content)
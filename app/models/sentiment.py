@@ -1,88 +1,131 @@
-import torch
-
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from textblob import TextBlob
 
-from functools import lru_cache
+from app.models.batching import micro_batcher
+from app.models.cache import cached_inference
+from app.models.registry import register_model
+from app.models.runtime import load_classifier, softmax, top_label_scores
+from app.settings import get_settings
+
+
+# Extract constants from settings
+settings = get_settings()
+BATCH_SIZE = settings.model.inference.batch_size
 
-from transformers import pipeline
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
+def score_sorted_batches(content: list[str], score_batch, batch_size: int=BATCH_SIZE) -> list:
+    """Score a list of strings in length-sorted batches and return the scores in input order"""
+    # Sort inputs by length so each batch is padded to a similar length
+    order = sorted(range(len(content)), key=lambda i: len(content[i]))
+    scores = [None] * len(content)
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        for i, score in zip(batch_indices, score_batch([content[i] for i in batch_indices])):
+            scores[i] = score
+    return scores
 
-@lru_cache(maxsize=1)
+
+@register_model("acceptability")
 def get_acceptability_model():
     """Return the acceptability classifier pipeline or a mock function in debug mode"""
-    pipe = pipeline("text-classification", model="textattack/roberta-base-CoLA")
-
-    def score_acceptability(content: str) -> float:
-        """Compute acceptability score for the supplied string"""
-        result = pipe(content)
-        return {'score': result[0]['score']}
+    classifier = load_classifier("acceptability", "textattack/roberta-base-CoLA")
+
+    def score_batch(content: list[str]) -> list[dict]:
+        """Compute acceptability scores for a list of strings in a single padded batch of windows"""
+        scores = classifier.score(content, lambda logits: top_label_scores(logits, classifier.config))
+        return [{'score': float(score)} for score in scores]
+
+    # Merge single inputs of concurrent requests into shared batches if enabled
+    batcher = micro_batcher("acceptability", score_batch)
+
+    @cached_inference("textattack/roberta-base-CoLA")
+    def score_acceptability(content: str | list[str], batch_size: int=BATCH_SIZE) -> dict | list[dict]:
+        """Compute acceptability scores for the supplied string or list of strings"""
+        if isinstance(content, str):
+            return batcher(content) if batcher else score_batch([content])[0]
+        return score_sorted_batches(content, score_batch, batch_size=batch_size)
     
     return score_acceptability
 
 
-@lru_cache(maxsize=1)
+@register_model("vader")
+def get_vader_model():
+    """Return the vader sentiment intensity scoring function"""
+    return SentimentIntensityAnalyzer().polarity_scores
+
+
+@register_model("polarity")
 def get_polarity_model():
     """Return the TextBlob polarity model or a mock function in debug mode"""
     # For both sets of scores: -1 most extreme negative, +1 most extreme positive
-    analyzer = SentimentIntensityAnalyzer()
+    vader_model = get_vader_model()
     
-    def score_polarity(content: str) -> dict:
-        """Compute blob and vader polarity for the supplied string"""
-        blob_score = TextBlob(content).sentiment.polarity
-        vader_score = analyzer.polarity_scores(content)['compound']
-        return {'score': (blob_score + vader_score) / 2}
+    def score_polarity(content: str, blob_sentiment=None, vader_scores: dict=None) -> dict:
+        """Compute blob and vader polarity for the supplied string (or precomputed scores)"""
+        blob_sentiment = blob_sentiment if blob_sentiment is not None else TextBlob(content).sentiment
+        vader_scores = vader_scores if vader_scores is not None else vader_model(content)
+        return {'score': (blob_sentiment.polarity + vader_scores['compound']) / 2}
 
     return score_polarity
 
 
-@lru_cache(maxsize=1)
+@register_model("sentiment")
 def get_sentiment_model():
     """Return the vader sentiment model or a mock function in debug mode"""
-    analyzer = SentimentIntensityAnalyzer()
+    vader_model = get_vader_model()
 
-    def score_sentiment(content: str) -> dict:
-        """Compute bart and vader sentiment scores for the supplied string"""
+    def score_sentiment(content: str, vader_scores: dict=None) -> dict:
+        """Compute bart and vader sentiment scores for the supplied string (or precomputed scores)"""
         # TODO: Add BART sentiment model and combine here
-        sentiment_scores = analyzer.polarity_scores(content)
+        sentiment_scores = vader_scores if vader_scores is not None else vader_model(content)
         sentiment_scores = {k: sentiment_scores[k] for k in ('neg', 'neu', 'pos')}
         return sentiment_scores
     
     return score_sentiment
 
 
-@lru_cache(maxsize=1)
+@register_model("spam")
 def get_spam_model():
     """Return the spam classifier tokenizer and model or a mock function in debug mode"""
-    spam_tokenizer = AutoTokenizer.from_pretrained("AntiSpamInstitute/spam-detector-bert-MoE-v2.2")
-    spam_classifier = AutoModelForSequenceClassification.from_pretrained("AntiSpamInstitute/spam-detector-bert-MoE-v2.2")
-    
-    def score_spam(content: str) -> float:
-        """Compute spam scores for the supplied text content"""
-        # Tokenize the input
-        inputs = spam_tokenizer(content, return_tensors="pt")
+    spam_classifier = load_classifier("spam", "AntiSpamInstitute/spam-detector-bert-MoE-v2.2")
 
-        # Get model predictions
-        with torch.no_grad():
-            outputs = spam_classifier(**inputs)
-            logits = outputs.logits
+    def score_batch(content: list[str]) -> list[dict]:
+        """Compute spam scores for a list of strings in a single padded batch of windows"""
+        # Tokenize the inputs, get model predictions and apply softmax to get spam probabilities
+        probabilities = spam_classifier.score(content, lambda logits: softmax(logits, axis=1)[:, 1])
+        return [{'score': float(p)} for p in probabilities]
 
-        # Apply softmax to get probabilities
-        probabilities = torch.softmax(logits, dim=1)
-        return {'score': probabilities.flatten()[1].item()}
+    # Merge single inputs of concurrent requests into shared batches if enabled
+    batcher = micro_batcher("spam", score_batch)
+    
+    @cached_inference("AntiSpamInstitute/spam-detector-bert-MoE-v2.2")
+    def score_spam(content: str | list[str], batch_size: int=BATCH_SIZE) -> dict | list[dict]:
+        """Compute spam scores for the supplied text content or list of strings"""
+        if not isinstance(content, str):
+            return score_sorted_batches(content, score_batch, batch_size=batch_size)
+        return batcher(content) if batcher else score_batch([content])[0]
 
     return score_spam
 
 
-@lru_cache(maxsize=1)
+@register_model("toxicity")
 def get_toxicity_model():
     """Return the toxicity classifier pipeline or a mock function in debug mode"""
-    pipe = pipeline("text-classification", model="unitary/toxic-bert")
-
-    def score_toxicity(content: str) -> float:
-        """Compute toxicity score for the supplied string"""
-        result = pipe(content)
-        return {'score': result[0]['score']}
+    classifier = load_classifier("toxicity", "unitary/toxic-bert")
+
+    def score_batch(content: list[str]) -> list[dict]:
+        """Compute toxicity scores for a list of strings in a single padded batch of windows"""
+        scores = classifier.score(content, lambda logits: top_label_scores(logits, classifier.config))
+        return [{'score': float(score)} for score in scores]
+
+    # Merge single inputs of concurrent requests into shared batches if enabled
+    batcher = micro_batcher("toxicity", score_batch)
+
+    @cached_inference("unitary/toxic-bert")
+    def score_toxicity(content: str | list[str], batch_size: int=BATCH_SIZE) -> dict | list[dict]:
+        """Compute toxicity score for the supplied string or list of strings"""
+        if not isinstance(content, str):
+            return score_sorted_batches(content, score_batch, batch_size=batch_size)
+        return batcher(content) if batcher else score_batch([content])[0]
 
     return score_toxicity
@@ -1,3 +1,4 @@
-from .metrics import MetricsRequest, MetricsResponse
+from .documents import DocumentResponse
+from .metrics import MetricsBatchRequest, MetricsBatchResponse, MetricsRequest, MetricsResponse
 from .summary import SummaryRequest, SummaryResponse
 from .tags import TagsRequest, TagsResponse
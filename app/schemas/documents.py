@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List
+from uuid import UUID
+
+from app.schemas.response import BaseResponse
+
+
+class DocumentResults(BaseModel):
+    sections: int = Field(..., description="The number of sections parsed from the document")
+    added: List[UUID] = Field(default_factory=list, description="The ids of new sections queued for analysis")
+    changed: List[UUID] = Field(default_factory=list, description="The ids of edited sections queued for reanalysis")
+    unchanged: int = Field(default=0, description="The number of sections whose content did not change")
+    removed: int = Field(default=0, description="The number of deleted sections")
+
+
+class DocumentResponse(BaseResponse):
+    results: DocumentResults = Field(..., description="The section changes of the ingested document")
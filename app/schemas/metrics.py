@@ -1,6 +1,6 @@
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from app.schemas.response import BaseResponse
@@ -25,3 +25,16 @@ class MetricsRequest(BaseModel):
 
 class MetricsResponse(BaseResponse):
     results: Dict[str, float] = Field(..., description="The result of the metrics operation")
+
+
+class MetricsBatchRequest(BaseModel):
+    items: List[MetricsRequest] = Field(..., min_length=1, description="The sections and content to compute metrics for")
+
+
+class MetricsBatchResult(MetricsResponse):
+    results: Dict[str, float] = Field(default_factory=dict, description="The result of the metrics operation")
+    error: Optional[str] = Field(default=None, description="The error of a failed item")
+
+
+class MetricsBatchResponse(BaseModel):
+    results: List[MetricsBatchResult] = Field(..., description="The result of each item in request order")
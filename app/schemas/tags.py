@@ -1,6 +1,7 @@
 from enum import Enum
 from pydantic import BaseModel, Field
 from typing import Dict, List
+from uuid import UUID
 
 from app.schemas.response import BaseResponse
 
@@ -11,8 +12,9 @@ class TagsEnum(str, Enum):
     related = "related"
 
 class TagsRequest(BaseModel):
+    section_id: UUID | None = Field(default=None, description="The section id to associate the extracted tags with")
     content: str = Field(..., description="The text content to summarize")
-    tags: List[TagsEnum] | None = Field(default_factory=List, description="The type of tags to extract")
+    tags: List[TagsEnum] | None = Field(default=None, description="The type of tags to extract")
     min_length: int | None = Field(default=1, description="The minimum length of related tags to extract")
     max_length: int | None = Field(default=3, description="The maximum length of related tags to extract")
     top_n: int | None = Field(default=10, description="The maximum number of strings to extract")
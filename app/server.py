@@ -0,0 +1,165 @@
+"""Preforked server: load models once in a master process, then fork workers that share them copy-on-write.
+
+Run with `python -m app.server`. Each worker serves the FastAPI app with uvicorn on a socket bound
+by the master, so model weights loaded before the fork are shared read-only between all workers.
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from app.settings import ServerSettings, get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Define the minimum seconds between restarts of a crashed worker
+RESTART_DELAY = 1.0
+
+# Define the models whose state does not survive a fork (the generative model may initialize CUDA)
+FORK_UNSAFE_MODELS = {"generative"}
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Return a listening socket inherited by every forked worker"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_count(settings: ServerSettings) -> int:
+    """Return the configured number of workers, defaulting to the CPU count"""
+    return settings.workers or os.cpu_count() or 1
+
+
+def torch_thread_count(settings: ServerSettings, workers: int) -> int:
+    """Return the torch threads of each worker, defaulting to an even split of the CPUs"""
+    return settings.torch_threads or max((os.cpu_count() or 1) // workers, 1)
+
+
+def fork_safe(name: str) -> bool:
+    """Return whether a model can be loaded before forking (CUDA contexts and ONNX sessions cannot)"""
+    encoder = get_settings().model.encoders.get(name)
+    return name not in FORK_UNSAFE_MODELS and not (encoder and encoder.backend == "onnx")
+
+
+def preload_models(settings: ServerSettings) -> None:
+    """Load (and pin) the configured models, or every registered model, in the master process
+
+    Models that are not fork safe are skipped, configured ones are preloaded by each worker instead.
+    """
+    from app.models.registry import MODEL_REGISTRY
+
+    names = get_settings().model.registry.preload
+    if not names and settings.preload_all:
+        names = MODEL_REGISTRY.registered()
+    skipped = [name for name in names if not fork_safe(name)]
+    names = [name for name in names if fork_safe(name)]
+    if skipped:
+        LOGGER.info(f"Skipping fork unsafe models in the master: {', '.join(skipped)}.")
+    LOGGER.info(f"Preloading models: {', '.join(names) or 'none'}.")
+    MODEL_REGISTRY.preload(names)
+
+
+def run_worker(app, sock: socket.socket, settings: ServerSettings, torch_threads: int) -> None:
+    """Configure a forked worker process and serve the app on the shared socket until shutdown"""
+    import torch
+    from app.crud.database import engine
+
+    # Limit intra-op threads so workers do not oversubscribe the CPUs
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # The inter-op pool can only be sized before its first use
+        pass
+
+    # Never reuse database connections opened by the master
+    engine.dispose(close=False)
+
+    config = uvicorn.Config(app, log_level=settings.log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket, settings: ServerSettings, torch_threads: int) -> int:
+    """Fork a worker process and return its pid"""
+    pid = os.fork()
+    if pid == 0:
+        # Restore default signal handling in the worker, uvicorn installs its own handlers
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            run_worker(app, sock, settings, torch_threads)
+        except BaseException:
+            LOGGER.exception(f"Worker {os.getpid()} failed.")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def main() -> None:
+    """Preload models, freeze the heap and supervise the forked workers"""
+    logging.basicConfig(level=logging.INFO)
+    settings = get_settings().server
+    workers = worker_count(settings)
+    torch_threads = torch_thread_count(settings, workers)
+
+    # Import the app (registering every model) and load the models before forking
+    from app.main import app
+    preload_models(settings)
+
+    # Move all loaded objects to the permanent generation so collections never touch their pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(settings.host, settings.port)
+    pids = {spawn_worker(app, sock, settings, torch_threads) for _ in range(workers)}
+    LOGGER.info(f"Serving on {settings.host}:{settings.port} with {workers} workers ({torch_threads} torch threads each).")
+
+    # Forward shutdown signals to the workers
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Replace workers that exit unexpectedly until shutdown is requested
+    while pids:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        pids.discard(pid)
+        if stopping:
+            continue
+
+        LOGGER.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting.")
+        time.sleep(RESTART_DELAY)
+        if not stopping:
+            pids.add(spawn_worker(app, sock, settings, torch_threads))
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Operation executors: run blocking core operations off the event loop with per-pool limits and metrics."""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from app.settings import ExecutorSettings, get_settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Define the value returned by next() once a streamed iterator is exhausted
+EXHAUSTED = object()
+
+
+class OperationExecutor:
+    """A thread or process pool for one class of operations with a concurrency limit and queue metrics"""
+
+    def __init__(self, name: str, settings: ExecutorSettings):
+        self.name = name
+        self.settings = settings
+        self.max_concurrency = settings.max_concurrency or settings.max_workers
+        self._executor: Executor = None
+        self._semaphore: asyncio.Semaphore = None
+        self._lock = threading.Lock()
+        self._counters = dict(submitted=0, completed=0, failed=0, in_flight=0)
+        self._seconds = dict(queue_total=0.0, queue_max=0.0, run_total=0.0)
+
+    @property
+    def executor(self) -> Executor:
+        """Return the underlying pool, creating it on first use"""
+        with self._lock:
+            if self._executor is None:
+                if self.settings.kind == "process":
+                    context = multiprocessing.get_context(self.settings.start_method)
+                    self._executor = ProcessPoolExecutor(self.settings.max_workers, mp_context=context)
+                else:
+                    self._executor = ThreadPoolExecutor(self.settings.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    async def run(self, function: Callable, *args, **kwargs) -> Any:
+        """Run a function on the pool once a concurrency slot is free and return its result"""
+        # NOTE: The semaphore is created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        submitted_at = time.time()
+        self._count(submitted=1, in_flight=1)
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                call = functools.partial(timed_call, function, *args, **kwargs)
+                started_at, finished_at, result = await loop.run_in_executor(self.executor, call)
+        except BaseException:
+            self._count(in_flight=-1, failed=1)
+            raise
+
+        # Queue time covers waiting for a concurrency slot and for a free pool worker
+        self._record(started_at - submitted_at, finished_at - started_at)
+        return result
+
+    async def stream(self, function: Callable[..., Iterator], *args, **kwargs) -> AsyncIterator:
+        """Yield the items of a generator function stepped on the pool, holding a concurrency slot until it ends
+
+        Generators cannot be sent to worker processes, so process pools step them on the event
+        loop's default thread pool (still within this executor's concurrency limit and metrics).
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        submitted_at = time.time()
+        self._count(submitted=1, in_flight=1)
+        executor = self.executor if self.settings.kind == "thread" else None
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                started_at = time.time()
+                iterator = function(*args, **kwargs)
+                try:
+                    while (item := await loop.run_in_executor(executor, next, iterator, EXHAUSTED)) is not EXHAUSTED:
+                        yield item
+                finally:
+                    iterator.close()
+        except BaseException:
+            self._count(in_flight=-1, failed=1)
+            raise
+
+        # Run time covers the whole stream, including time the consumer spent between items
+        self._record(started_at - submitted_at, time.time() - started_at)
+
+    def shutdown(self, wait: bool=True) -> None:
+        """Shut down the underlying pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        """Return the pool configuration, request counters and queue and run times in seconds"""
+        with self._lock:
+            completed = self._counters["completed"]
+            return dict(
+                kind=self.settings.kind,
+                max_workers=self.settings.max_workers,
+                max_concurrency=self.max_concurrency,
+                **self._counters,
+                queue_seconds_mean=round(self._seconds["queue_total"] / completed, 6) if completed else 0.0,
+                queue_seconds_max=round(self._seconds["queue_max"], 6),
+                run_seconds_mean=round(self._seconds["run_total"] / completed, 6) if completed else 0.0,
+            )
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for counter, delta in deltas.items():
+                self._counters[counter] += delta
+
+    def _record(self, queue_seconds: float, run_seconds: float) -> None:
+        queue_seconds = max(queue_seconds, 0.0)
+        with self._lock:
+            self._counters["in_flight"] -= 1
+            self._counters["completed"] += 1
+            self._seconds["queue_total"] += queue_seconds
+            self._seconds["queue_max"] = max(self._seconds["queue_max"], queue_seconds)
+            self._seconds["run_total"] += run_seconds
+        LOGGER.debug(f"Operation {self.name} queued {queue_seconds:.3f}s and ran {run_seconds:.3f}s.")
+
+
+def timed_call(function: Callable, *args, **kwargs) -> tuple[float, float, Any]:
+    """Call a function and return its (start, finish) wall clock times and result"""
+    # NOTE: Wall clock times are used as they are comparable across worker processes
+    started_at = time.time()
+    result = function(*args, **kwargs)
+    return started_at, time.time(), result
+
+
+def get_executor(operation: str) -> OperationExecutor:
+    """Return the executor of an operation class, falling back to the default pool"""
+    return EXECUTORS.get(operation, EXECUTORS["default"])
+
+
+def shutdown_executors(wait: bool=True) -> None:
+    """Shut down every operation executor"""
+    for executor in EXECUTORS.values():
+        executor.shutdown(wait=wait)
+
+
+# Define one executor per configured operation class
+settings = get_settings()
+EXECUTORS: dict[str, OperationExecutor] = {
+    name: OperationExecutor(name, executor_settings)
+    for name, executor_settings in ({"default": ExecutorSettings()} | settings.executors).items()
+}
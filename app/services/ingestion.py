@@ -0,0 +1,104 @@
+"""Document ingestion: parse streamed markdown into sections, diff them against storage and reanalyze only what changed."""
+
+import asyncio
+import codecs
+import json
+import logging
+
+from typing import AsyncIterator
+from sqlmodel import Session
+
+from app.core.common.markdown import SectionParser
+from app.crud.database import engine
+from app.crud.documents import ingest_document
+from app.crud.metrics import persist_metrics_batch
+from app.schemas.metrics import MetricsBatchRequest, MetricsRequest
+from app.services.executors import get_executor
+from app.services.orchestration import close_session, run_metrics_batch
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Define the section types analyzed after ingestion (figures have no text to score)
+ANALYZED_TYPES = {"heading", "paragraph", "list", "table"}
+
+# Hold strong references to running analysis tasks so they are not garbage collected
+ANALYSIS_TASKS: set[asyncio.Task] = set()
+
+
+async def parse_stream(chunks: AsyncIterator[bytes]) -> tuple[str, SectionParser, list]:
+    """Decode and parse a markdown body as its chunks arrive, returning the text, parser and sections
+
+    Sections are parsed while the body is received, but the full text and every section are kept
+    since the document is stored whole and diffed against all of its stored sections.
+    """
+    parser, decoder = SectionParser(), codecs.getincrementaldecoder("utf-8")()
+    parts, sections = [], []
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        parts.append(text)
+        sections += parser.feed(text)
+
+    text = decoder.decode(b"", final=True)
+    parts.append(text)
+    sections += parser.feed(text) + parser.close()
+    return "".join(parts), parser, sections
+
+
+async def handle_document(slug: str, chunks: AsyncIterator[bytes], session: Session) -> dict:
+    """Ingest a streamed markdown document and queue analysis of its added and changed sections.
+
+    Unchanged sections (matched by content hash) keep their id and stored metrics, so editing a
+    document only reanalyzes the sections that were edited or added.
+
+    Args:
+        slug: unique document slug
+        chunks: async iterator over the raw markdown body
+        session: active SQLModel Session for the DB transaction
+
+    Returns:
+        response dict with the section changes
+    """
+    response = {}
+
+    try:
+        markdown, parser, sections = await parse_stream(chunks)
+        # Normalize YAML values (e.g. dates) to JSON compatible types
+        frontmatter = json.loads(json.dumps(parser.frontmatter, default=str))
+        response, pending = await asyncio.to_thread(ingest_document, session, slug, markdown, frontmatter, sections)
+        schedule_analysis([(id, section.content) for id, section in pending if section.type in ANALYZED_TYPES])
+        LOGGER.info(f"Document '{slug}' ingested: {len(sections)} sections, {len(pending)} to analyze.")
+
+    except Exception as e:
+        LOGGER.exception(f"Document '{slug}' ingestion failed: {type(e).__name__} - {str(e)}")
+        await close_session(session, rollback=True)
+        return response
+
+    await close_session(session)
+    return response
+
+
+def schedule_analysis(items: list[tuple]) -> asyncio.Task | None:
+    """Start a background task computing and persisting the metrics of (section_id, content) items"""
+    if not items:
+        return None
+    task = asyncio.get_running_loop().create_task(analyze_sections(items))
+    ANALYSIS_TASKS.add(task)
+    task.add_done_callback(ANALYSIS_TASKS.discard)
+    return task
+
+
+async def analyze_sections(items: list[tuple]) -> None:
+    """Compute the default metrics of sections on the batch executor and persist them in a new session"""
+    request = MetricsBatchRequest(items=[MetricsRequest(section_id=id, content=content) for id, content in items])
+    try:
+        results = await get_executor("metrics_batch").run(run_metrics_batch, request)
+        await asyncio.to_thread(persist_analysis, request, results)
+    except Exception as e:
+        LOGGER.exception(f"Analysis of {len(items)} sections failed: {type(e).__name__} - {str(e)}")
+
+
+def persist_analysis(request: MetricsBatchRequest, results: list) -> None:
+    """Persist batch metrics results with a dedicated session"""
+    with Session(engine) as session:
+        persist_metrics_batch(session, request, results)
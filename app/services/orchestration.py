@@ -1,31 +1,91 @@
 """Orchestrator for handling API requests: call core operations, dispatch to CRUD handlers, manage transactions."""
 
+import asyncio
+import inspect
+import json
 import logging
 
-from typing import Any
+from typing import Any, Iterator
 from sqlmodel import Session
 
-from app.crud.metrics import handle_metrics_request
+from app.core.operations import compute_metrics, compute_metrics_batch, get_summary, get_summary_stream, get_tags
+from app.crud.memo import memo_key, read_memo, write_memo
+from app.crud.metrics import persist_metrics, persist_metrics_batch, persist_metrics_async, persist_metrics_batch_async
+from app.crud.tags import persist_tags, persist_tags_async
+from app.schemas.metrics import MetricsBatchRequest, MetricsRequest
+from app.schemas.summary import SummaryRequest, SummaryResults
+from app.schemas.tags import TagsRequest
+from app.services.executors import get_executor
+from app.settings import get_settings
 
 
 LOGGER = logging.getLogger(__name__)
 
+# Extract constants from settings
+USE_ASYNC = get_settings().database.use_async
+MEMO_OPERATIONS = set(get_settings().database.memo_operations)
+
+
+def run_metrics(request: MetricsRequest) -> dict:
+    """Compute the requested metrics of the request content"""
+    return compute_metrics(request.content, request.metrics)
+
+
+def run_metrics_batch(request: MetricsBatchRequest) -> list[tuple[dict | None, str | None]]:
+    """Compute the requested metrics of every item, returning a (results, error) pair per item"""
+    results = compute_metrics_batch([item.content for item in request.items], [item.metrics for item in request.items])
+    return [
+        (None, f"{type(result).__name__}: {str(result)}") if isinstance(result, Exception) else (result, None)
+        for result in results
+    ]
+
+
+def run_summary(request: SummaryRequest) -> dict:
+    """Generate and rank the requested summary of the request content"""
+    return get_summary(request.content, request.summary, **summary_kwargs(request))
+
+
+def run_tags(request: TagsRequest) -> dict:
+    """Extract the requested tags of the request content"""
+    results = get_tags(request.content, request.min_length, request.max_length, request.top_n)
+    if request.tags:
+        # Only return the requested tag types
+        for key in ("tags", "scores"):
+            results[key] = {k: v for k, v in results[key].items() if k in request.tags}
+    return results
+
+
+def summary_kwargs(request: SummaryRequest) -> dict:
+    """Return the summary function kwargs of a request"""
+    # Headings are limited to top_n candidates, outlines to n_sections sections
+    if request.summary == "outline":
+        return dict(n_sections=request.n_sections)
+    return dict(top_n=request.top_n)
+
+
 # Registry mapping operation name to (core handler, crud handler)
-REGISTRY: dict[str, callable] = {
-    "metrics": handle_metrics_request,
-    "summary": None,
-    "tags": None,
+# NOTE: Core handlers must be module-level functions so they can run on process pools
+# NOTE: Async CRUD handlers (awaited on the event loop) are used with the async database engine
+REGISTRY: dict[str, tuple[callable, callable]] = {
+    "metrics": (run_metrics, persist_metrics_async if USE_ASYNC else persist_metrics),
+    "metrics_batch": (run_metrics_batch, persist_metrics_batch_async if USE_ASYNC else persist_metrics_batch),
+    "summary": (run_summary, None),
+    "tags": (run_tags, persist_tags_async if USE_ASYNC else persist_tags),
 }
 
 
-def handle_request(operation: str, request: Any, configs: dict, session: Session) -> dict:
-    """Orchestrate a request: call handler and manage the transaction.
+async def handle_request(operation: str, request: Any, configs: dict, session: Session) -> dict:
+    """Orchestrate a request: run the core handler on its executor and manage the transaction.
+
+    The core operation runs on the operation's thread or process pool so the event loop keeps
+    serving other requests, the CRUD handler then persists the results with the async session
+    (or in a worker thread for a synchronous session).
     
     Args:
-        operation: operation name ("metrics", "summary", "tags")
+        operation: operation name ("metrics", "metrics_batch", "summary", "tags")
         request: Pydantic request model instance
         configs: app configs from settings
-        session: active SQLModel Session for DB transaction
+        session: active SQLModel Session (or AsyncSession) for DB transaction
     
     Returns:
         response dict with operation results
@@ -36,14 +96,78 @@ def handle_request(operation: str, request: Any, configs: dict, session: Session
     response = {}
 
     try:
-        # Dispatch to registered handler and optionally persist to DB
-        request_handler = REGISTRY.get(operation)
-        response = request_handler(session, request, configs)
+        # Dispatch to the registered core handler and optionally persist to DB
+        core_handler, crud_handler = REGISTRY[operation]
+        results = await run_operation(operation, core_handler, request)
+        if crud_handler and inspect.iscoroutinefunction(crud_handler):
+            response = await crud_handler(session, request, results)
+        elif crud_handler:
+            response = await asyncio.to_thread(crud_handler, session, request, results)
+        else:
+            response = dict(results=results, status="created")
         LOGGER.info(f"Operation {operation} completed successfully.")
 
     except Exception as e:
         LOGGER.exception(f"Operation '{operation}' failed: {type(e).__name__} - {str(e)}")
-        session.rollback()
+        await close_session(session, rollback=True)
+        return response
 
-    session.close()
+    await close_session(session)
     return response
+
+
+async def run_operation(operation: str, core_handler: callable, request: Any) -> Any:
+    """Run a core handler on its executor, serving memoized operations from the persisted memo.
+
+    Memoized results are keyed by the normalized content hash, operation and request parameters,
+    and only served while the model settings fingerprint matches the one that computed them.
+    """
+    if operation not in MEMO_OPERATIONS:
+        return await get_executor(operation).run(core_handler, request)
+
+    try:
+        key = memo_key(operation, request)
+    except Exception:
+        LOGGER.exception(f"Memo key of '{operation}' failed, running uncached.")
+        return await get_executor(operation).run(core_handler, request)
+
+    results = await asyncio.to_thread(read_memo, key)
+    if results is not None:
+        LOGGER.debug(f"Operation {operation} served from memo.")
+        return results
+
+    results = await get_executor(operation).run(core_handler, request)
+    await asyncio.to_thread(write_memo, key, results)
+    return results
+
+
+async def close_session(session: Any, rollback: bool=False) -> None:
+    """Roll back (optionally) and close a synchronous or async session"""
+    for method in (["rollback"] if rollback else []) + ["close"]:
+        result = getattr(session, method)()
+        if inspect.isawaitable(result):
+            await result
+
+
+def stream_summary_request(request: SummaryRequest) -> Iterator[str]:
+    """Yield server-sent events for each generated summary candidate and the final ranked results.
+
+    Emits a "candidate" event ({"text": ...}) as soon as each candidate is parsed, then a single
+    "result" event with the ranked SummaryResults (or an "error" event if generation fails).
+    """
+    try:
+        for event, data in get_summary_stream(request.content, request.summary, **summary_kwargs(request)):
+            if event == "result":
+                yield format_event("result", SummaryResults(**data).model_dump_json())
+            else:
+                yield format_event(event, json.dumps(dict(text=data)))
+        LOGGER.info("Operation summary stream completed successfully.")
+
+    except Exception as e:
+        LOGGER.exception(f"Operation 'summary' stream failed: {type(e).__name__} - {str(e)}")
+        yield format_event("error", json.dumps(dict(detail=f"{type(e).__name__}: {str(e)}")))
+
+
+def format_event(event: str, data: str) -> str:
+    """Return a single server-sent event message"""
+    return f"event: {event}\ndata: {data}\n\n"
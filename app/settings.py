@@ -1,7 +1,9 @@
+import hashlib
 import yaml
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -44,12 +46,43 @@ class DatabaseSettings(BaseSettings):
     """Define database connection settings"""
     file: str = "sql_app.db"
     url: str = "sqlite:///./sql_app.db"
+    async_url: str = Field(default="sqlite+aiosqlite:///./sql_app.db", description="Async driver URL of the same database")
+    use_async: bool = Field(default=False, description="Serve route database work through the async engine")
     connect_args: dict = {"check_same_thread": False}
+    journal_mode: Literal["wal", "delete", "truncate", "persist", "memory", "off"] = Field(default="wal", description="SQLite journal mode, WAL lets readers run during writes")
+    synchronous: Literal["off", "normal", "full", "extra"] = Field(default="normal", description="SQLite sync level, NORMAL only fsyncs the WAL at checkpoints")
+    busy_timeout_ms: int = Field(default=5000, ge=0, description="SQLite wait on a locked database before failing")
+    mmap_size: int = Field(default=268435456, ge=0, description="SQLite memory-mapped I/O size in bytes")
+    write_behind: bool = Field(default=False, description="Queue writes in memory and flush them in the background")
+    write_behind_batch_size: int = Field(default=1000, gt=0, description="Queued rows that trigger a flush")
+    write_behind_interval: float = Field(default=1.0, gt=0, description="Maximum seconds between flushes")
+    write_behind_max_attempts: int = Field(default=5, gt=0, description="Failed flushes of a row before it is dead-lettered")
+    memo_operations: list[Literal["metrics", "tags"]] = Field(default=["metrics"], description="Deterministic single-content operations served from persisted results of identical requests")
+
+# Define operation executor settings
+class ExecutorSettings(BaseSettings):
+    """Define the worker pool that runs one class of blocking core operations"""
+    kind: Literal["thread", "process"] = "thread"
+    max_workers: int = Field(default=1, gt=0, description="Number of pool threads or processes")
+    max_concurrency: int = Field(default=0, ge=0, description="Maximum in-flight operations, 0 matches max_workers")
+    start_method: Literal["spawn", "forkserver", "fork"] = Field(default="spawn", description="Process pool start method")
+
+# Define preforked server settings
+class ServerSettings(BaseSettings):
+    """Define the preforked server socket, worker count and per-worker torch threads"""
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = Field(default=0, ge=0, description="Number of forked workers, 0 matches the CPU count")
+    torch_threads: int = Field(default=0, ge=0, description="Torch threads per worker, 0 splits the CPUs evenly")
+    preload_all: bool = Field(default=False, description="Load every registered (fork safe) model before forking")
+    log_level: str = "info"
 
 # Define Transformers generation settings 
 class PromptSettings(BaseSettings):
     """Define default keyword arguments for Transformers generation"""
     template: str = Field(default="{prompt}:\n\nText: {content}\n\n{delimiter}") 
+    prefix_template: str = Field(default="Text: {content}\n\n", description="Content-first shared prompt prefix")
+    suffix_template: str = Field(default="{prompt}:\n\n{delimiter}", description="Per-prompt suffix after the prefix")
     title: list[str] = Field(default=HEADING_PROMPTS["title"], min_length=4)
     subtitle: list[str] = Field(default=HEADING_PROMPTS["subtitle"], min_length=4)
     description: list[str] = Field(default=HEADING_PROMPTS["description"], min_length=4)
@@ -65,14 +98,55 @@ class TransformersSettings(BaseSettings):
     top_p: float = 0.9
     top_k: int = 50
 
+# Define model inference settings
+class InferenceSettings(BaseSettings):
+    """Define default batching arguments for model inference"""
+    batch_size: int = Field(default=16, gt=0)
+    onnx_cache_dir: str = Field(default=".onnx_cache", description="Directory of exported ONNX graphs")
+    document_batch_size: int = Field(default=64, gt=0, description="Number of texts per spacy nlp.pipe batch")
+    document_n_process: int = Field(default=1, gt=0, description="Number of spacy nlp.pipe processes")
+    cache_size: int = Field(default=4096, ge=0, description="Maximum cached inference results, 0 disables")
+    prefix_cache: bool = Field(default=False, description="Prefill shared content prefixes once per generation")
+    prefix_cache_size: int = Field(default=8, gt=0, description="Maximum cached content prefix key/values")
+    deterministic: bool = Field(default=False, description="Seed generation from its inputs and cache the outputs")
+    generation_cache_path: str = Field(default=".generation_cache.db", description="SQLite file of cached generations")
+    generation_cache_size: int = Field(default=10000, ge=0, description="Maximum cached generations, 0 disables")
+    micro_batching: bool = Field(default=False, description="Merge concurrent single-input encoder calls into batches")
+    micro_batch_size: int = Field(default=32, gt=0, description="Maximum inputs per micro-batch")
+    micro_batch_wait_ms: float = Field(default=5.0, ge=0, description="Maximum wait for a micro-batch to fill")
+
+# Define per-model encoder classifier settings
+class EncoderSettings(BaseSettings):
+    """Define the inference backend and long input handling of an encoder classifier"""
+    backend: Literal["torch", "onnx"] = "torch"
+    quantize: bool = Field(default=False, description="Apply int8 dynamic quantization to ONNX graphs")
+    long_inputs: Literal["truncate", "window"] = Field(default="window", description="Score only the first window or every window of long inputs")
+    window_size: int = Field(default=0, ge=0, description="Tokens per window, 0 uses the model maximum")
+    window_stride: int = Field(default=128, ge=0, description="Tokens shared by consecutive windows")
+    window_reducer: Literal["max", "mean", "weighted"] = Field(default="max", description="Aggregate window scores by max, mean or token-weighted mean")
+
+# Define model registry settings
+class RegistrySettings(BaseSettings):
+    """Define the model memory budget, eviction and preload settings"""
+    memory_budget_mb: int = Field(default=0, ge=0, description="Resident model memory budget, 0 is unlimited")
+    idle_seconds: float = Field(default=60.0, ge=0, description="Minimum idle time before a model can be evicted")
+    preload: list[str] = Field(default_factory=list, description="Models loaded at startup and never evicted")
+
 # Define function default argument settings yaml class
 class ModelSettings(BaseSettings):
     """Define default keyword argument for core functions"""
     # Also tested with "microsoft/Phi-4-mini-instruct" 
     language_model: str = "google/gemma-3-1b-it"
     transformers: TransformersSettings = Field(default_factory=TransformersSettings)
+    inference: InferenceSettings = Field(default_factory=InferenceSettings)
+    registry: RegistrySettings = Field(default_factory=RegistrySettings)
+    encoders: dict[str, EncoderSettings] = Field(default_factory=dict)
     prompts: PromptSettings = Field(default_factory=PromptSettings)
 
+    def fingerprint(self) -> str:
+        """Return a hash of all model settings, changing whenever a model or its configuration changes"""
+        return hashlib.sha256(self.model_dump_json().encode("utf-8")).hexdigest()
+
     @classmethod
     def from_yaml(cls, path: str):
         with open(path, "r") as f:
@@ -89,6 +163,17 @@ class ApplicationSettings(BaseSettings):
     
     # Get database settings
     database: DatabaseSettings = Field(default_factory=DatabaseSettings)
+
+    # Get the preforked server settings
+    server: ServerSettings = Field(default_factory=ServerSettings)
+
+    # Get the executor of each operation class (metrics are short, generation is long-running)
+    executors: dict[str, ExecutorSettings] = Field(default_factory=lambda: {
+        "metrics": ExecutorSettings(max_workers=4),
+        "metrics_batch": ExecutorSettings(max_workers=1),
+        "summary": ExecutorSettings(max_workers=1),
+        "tags": ExecutorSettings(max_workers=2),
+    })
     
     # Load user transformers configurations if they exist
     if TRANSFORMERS_PATH.exists():
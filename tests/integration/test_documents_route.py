@@ -0,0 +1,33 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+DOCUMENT = "---\ntitle: Example\n---\n# Title\n\nFirst paragraph.\n\n- one\n- two\n"
+
+
+def test_documents_route_registered():
+    """Verify the document route is registered with its path parameter"""
+    assert "/documents/{slug}" in {route.path for route in app.routes}
+
+
+def test_documents_route(test_client: TestClient):
+    """Verify a document is created, then only its edited sections are returned for analysis"""
+    with patch("app.services.ingestion.schedule_analysis") as schedule:
+        response = test_client.post("/documents/example", content=DOCUMENT.encode("utf-8"))
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["status"] == "created"
+        assert data["results"]["sections"] == 3
+        assert len(data["results"]["added"]) == 3
+        assert len(schedule.call_args.args[0]) == 3
+
+        response = test_client.post("/documents/example", content=DOCUMENT.replace("First", "Edited").encode("utf-8"))
+        data = response.json()
+        assert data["status"] == "updated"
+        assert data["results"]["unchanged"] == 2
+        assert len(data["results"]["changed"]) == 1
+        assert [content for _, content in schedule.call_args.args[0]] == ["Edited paragraph."]
@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -56,6 +57,23 @@ def test_summary_route_top_n(top_n):
     assert len(data["result"]["summaries"]) <= top_n
 
 
+def test_summary_route_stream():
+    """Candidates are streamed as events before the final ranked result"""
+    payload = {"content": "Test content for summary.", "summary": "title", "top_n": 3}
+    with client.stream("POST", "/summary/stream", json=payload) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [block.split("\n")[0].removeprefix("event: ") for block in body.strip().split("\n\n")]
+    assert events[-1] == "result"
+    assert all(event == "candidate" for event in events[:-1])
+
+    result = json.loads(body.strip().split("\n\n")[-1].split("data: ", 1)[1])
+    assert len(result["summaries"]) <= 3
+    assert len(result["summaries"]) == len(result["scores"])
+
+
 if __name__ == "__main__":
     test_summary_route()
     test_summary_route_type("outline")
@@ -0,0 +1,78 @@
+"""Unit tests for the streaming markdown section parser."""
+
+import pytest
+
+from app.core.common.markdown import SectionParser, content_hash, parse_sections
+
+
+DOCUMENT = """---
+title: Example
+tags: [a, b]
+---
+# Title
+
+First paragraph
+continues here.
+
+- one
+- two
+
+- three
+
+```python
+x = 1
+
+y = 2
+```
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+![figure](image.png)
+
+## Closing
+"""
+
+
+def parse(chunks):
+    parser, sections = parse_sections(chunks)
+    return parser, list(sections)
+
+
+class TestSectionParser:
+    """Tests for the incremental SectionParser"""
+
+    def test_section_types(self):
+        """Test each top-level block is returned as a typed section in order"""
+        parser, sections = parse([DOCUMENT])
+
+        assert parser.frontmatter == {"title": "Example", "tags": ["a", "b"]}
+        assert [s.type for s in sections] == ["heading", "paragraph", "list", "paragraph", "table", "figure", "heading"]
+        assert [s.position for s in sections] == list(range(7))
+        assert [s.level for s in sections if s.type == "heading"] == [1, 2]
+        assert sections[2].content == "- one\n- two\n\n- three"
+        assert "y = 2" in sections[3].content
+
+    @pytest.mark.parametrize("size", [1, 3, 17])
+    def test_chunking_is_transparent(self, size):
+        """Test the sections do not depend on how the document is split into chunks"""
+        _, expected = parse([DOCUMENT])
+        chunks = [DOCUMENT[i:i + size] for i in range(0, len(DOCUMENT), size)]
+        parser, sections = parse(chunks)
+
+        assert sections == expected
+        assert parser.frontmatter["title"] == "Example"
+
+    def test_feed_returns_completed_sections(self):
+        """Test sections are emitted as soon as a following block starts"""
+        parser = SectionParser()
+
+        assert parser.feed("# Title\n\nSome text") == []
+        assert [s.type for s in parser.feed("\n\nMore\n")] == ["heading", "paragraph"]
+        assert [s.content for s in parser.close()] == ["More"]
+
+    def test_content_hash_ignores_whitespace(self):
+        """Test the content hash is stable across whitespace-only edits"""
+        assert content_hash("a  b\nc") == content_hash(" a b c ")
+        assert content_hash("a b c") != content_hash("a b d")
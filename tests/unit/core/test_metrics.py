@@ -1,6 +1,7 @@
 import pytest
 
-from app.core.operations import get_metrics, METRIC_TYPES
+from app.core.metrics.style import STYLE_LABELS, score_style
+from app.core.operations import compute_metrics, compute_metrics_batch, METRIC_TYPES
 
 
 def test_metrics():
@@ -34,3 +35,21 @@ def test_metrics_multiple_types(metric_types: list):
         assert metric in results
         assert isinstance(results[metric], dict)
         assert len(results[metric]) > 0
+
+
+def test_metrics_style_batched():
+    """Verify the batched style scores match the per-metric label sets"""
+    results = score_style(content="Test content for metrics.")
+    assert set(results.keys()) == set(STYLE_LABELS.keys())
+    for metric, labels in STYLE_LABELS.items():
+        assert list(results[metric].keys()) == labels
+        assert sum(results[metric].values()) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_metrics_batch():
+    """Verify batched metrics match the requested metrics of each content"""
+    contents = ["Test content for metrics.", "Another test content for metrics."]
+    results = compute_metrics_batch(contents, [["diction", "toxicity"], None])
+    assert set(results[0].keys()) == {"diction", "toxicity"}
+    assert set(results[1].keys()) == set(METRIC_TYPES.keys())
+    assert results[0]["diction"] == compute_metrics(contents[0], ["diction"])["diction"]
@@ -0,0 +1,53 @@
+import numpy
+import pytest
+
+from unittest.mock import patch
+
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.core.common.relevance import maximal_marginal_relevance
+
+
+def reference_mmr(content_embedding, candidates, candidate_embeddings, sim_lambda, top_n):
+    """Return the loop-based maximal marginal relevance selection"""
+    similarities = cosine_similarity(content_embedding, candidate_embeddings).flatten()
+    available = list(range(len(candidates)))
+    selected = [available.pop(int(numpy.argmax(similarities)))]
+    scores = [float(similarities[selected[0]])]
+
+    for _ in range(top_n):
+        if not available: break
+        mmr_scores = [
+            sim_lambda * similarities[i] - (1 - sim_lambda) * max(
+                cosine_similarity(candidate_embeddings[[i]], candidate_embeddings[[j]])[0, 0] for j in selected
+            )
+            for i in available
+        ]
+        index = int(numpy.argmax(mmr_scores))
+        scores.append(float(mmr_scores[index]))
+        selected.append(available.pop(index))
+
+    return [candidates[i] for i in selected], scores
+
+
+@pytest.mark.parametrize("sim_lambda, top_n", [(0.5, 10), (0.2, 3), (0.9, 5)])
+def test_maximal_marginal_relevance(sim_lambda: float, top_n: int):
+    """Verify the vectorized selection matches the loop-based reference"""
+    rng = numpy.random.default_rng(0)
+    content_embedding = rng.normal(size=(1, 16))
+    candidate_embeddings = rng.normal(size=(12, 16))
+    candidates = [f"tag {i}" for i in range(12)]
+
+    with patch("app.core.common.relevance.get_embedding_model", return_value=lambda _: candidate_embeddings):
+        tags, scores = maximal_marginal_relevance(
+            "content", candidates, sim_lambda=sim_lambda, top_n=top_n, content_embedding=content_embedding
+        )
+
+    expected_tags, expected_scores = reference_mmr(content_embedding, candidates, candidate_embeddings, sim_lambda, top_n)
+    assert tags == expected_tags
+    assert scores == pytest.approx(expected_scores, abs=1e-5)
+
+
+def test_maximal_marginal_relevance_empty():
+    """Verify no candidates returns empty results"""
+    assert maximal_marginal_relevance("content", []) == ([], [])
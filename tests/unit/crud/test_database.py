@@ -0,0 +1,55 @@
+"""Unit tests for app.crud.database schema migration."""
+
+import pytest
+
+from sqlalchemy import inspect, text
+from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.pool import StaticPool
+
+from app.core.common.markdown import parse_sections
+from app.crud.database import migrate_database
+from app.crud.documents import ingest_document
+
+
+@pytest.fixture
+def legacy_engine():
+    """Create an in-memory SQLite database with a sections table created before content hashes"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE sections (id CHAR(32) PRIMARY KEY, document_id CHAR(32) NOT NULL, content TEXT NOT NULL, "
+            "type VARCHAR NOT NULL, hidden BOOLEAN NOT NULL, level INTEGER, position INTEGER)"
+        ))
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_migrate_database_adds_columns_and_indexes(legacy_engine):
+    """Test missing columns and indexes are added to existing tables once"""
+    assert migrate_database(legacy_engine) == ["sections.content_hash"]
+    assert migrate_database(legacy_engine) == []
+
+    inspector = inspect(legacy_engine)
+    assert "content_hash" in {column["name"] for column in inspector.get_columns("sections")}
+    assert "ix_sections_content_hash" in {index["name"] for index in inspector.get_indexes("sections")}
+
+
+def test_ingest_backfills_content_hashes(legacy_engine):
+    """Test sections stored without a content hash still match unchanged content on re-ingestion"""
+    migrate_database(legacy_engine)
+    with Session(legacy_engine) as session:
+        parser, sections = parse_sections(["# Title\n\nText.\n"])
+        _, pending = ingest_document(session, "doc", "# Title\n\nText.\n", None, list(sections))
+        session.execute(text("UPDATE sections SET content_hash = NULL"))
+        session.commit()
+
+        parser, sections = parse_sections(["# Title\n\nText.\n"])
+        response, pending = ingest_document(session, "doc", "# Title\n\nText.\n", None, list(sections))
+
+        assert response["results"]["unchanged"] == 2
+        assert pending == []
+        assert session.execute(text("SELECT COUNT(*) FROM sections WHERE content_hash IS NULL")).scalar() == 0
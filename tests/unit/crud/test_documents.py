@@ -0,0 +1,73 @@
+"""Unit tests for app.crud.documents ingestion."""
+
+import pytest
+
+from sqlmodel import Session, create_engine, select, SQLModel
+from sqlmodel.pool import StaticPool
+
+from app.core.common.markdown import parse_sections
+from app.crud.documents import get_document, ingest_document, list_document_sections
+from app.crud.tables import Metric, Section
+
+
+@pytest.fixture
+def test_db_session():
+    """Create an in-memory SQLite database for testing"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def ingest(session: Session, markdown: str):
+    """Parse and ingest a markdown document under a fixed slug"""
+    parser, sections = parse_sections([markdown])
+    sections = list(sections)
+    return ingest_document(session, "doc", markdown, parser.frontmatter, sections)
+
+
+class TestIngestDocument:
+    """Tests for ingest_document"""
+
+    def test_ingest_new_document(self, test_db_session: Session):
+        """Test a new document stores every section and returns them all for analysis"""
+        response, pending = ingest(test_db_session, "---\ntitle: Doc\n---\n# Title\n\nFirst.\n\nSecond.\n")
+
+        assert response["status"] == "created"
+        assert response["results"]["sections"] == 3
+        assert len(pending) == 3
+        document = get_document(test_db_session, "doc")
+        assert document.frontmatter == {"title": "Doc"}
+        assert [s.type for s in list_document_sections(test_db_session, document.id)] == ["heading", "paragraph", "paragraph"]
+        assert [id for id, _ in pending] == response["results"]["added"]
+
+    def test_reingest_only_returns_edited_sections(self, test_db_session: Session):
+        """Test unchanged sections keep their ids and metrics and only edits are reanalyzed"""
+        _, pending = ingest(test_db_session, "# Title\n\nFirst.\n\nSecond.\n\nThird.\n")
+        ids = {s.content: id for id, s in pending}
+        test_db_session.add(Metric(section_id=ids["Third."], name="spam", value=0.1))
+        test_db_session.add(Metric(section_id=ids["First."], name="spam", value=0.2))
+        test_db_session.commit()
+
+        # Insert a section, edit one in place, drop one and move the rest
+        response, pending = ingest(test_db_session, "# Title\n\nIntro.\n\nSecond edited.\n\nThird.\n\nFourth.\n")
+        results = response["results"]
+
+        assert response["status"] == "updated"
+        assert results["unchanged"] == 2
+        assert results["removed"] == 0
+        assert sorted(s.content for _, s in pending) == ["Fourth.", "Intro.", "Second edited."]
+        sections = list_document_sections(test_db_session, get_document(test_db_session, "doc").id)
+        assert [s.content for s in sections] == ["# Title", "Intro.", "Second edited.", "Third.", "Fourth."]
+        assert next(s for s in sections if s.content == "Third.").id == ids["Third."]
+
+        # Removing sections deletes their metrics
+        response, pending = ingest(test_db_session, "# Title\n")
+        assert response["results"]["removed"] == 4
+        assert pending == []
+        assert test_db_session.exec(select(Metric)).all() == []
+        assert len(test_db_session.exec(select(Section)).all()) == 1
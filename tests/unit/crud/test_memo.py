@@ -0,0 +1,80 @@
+"""Unit tests for app.crud.memo persisted results."""
+
+import numpy
+import pytest
+
+from uuid import uuid4
+
+from pydantic import ValidationError
+from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.pool import StaticPool
+
+from app.crud.memo import get_memo, memo_key, prune_memos, put_memo
+from app.schemas.metrics import MetricsRequest
+from app.settings import DatabaseSettings
+
+
+@pytest.fixture
+def test_db_session():
+    """Create an in-memory SQLite database for testing"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+class TestMemoKey:
+    """Tests for memo_key"""
+
+    def test_key_ignores_section_and_whitespace(self):
+        """Test identical content of different sections shares a key"""
+        first = MetricsRequest(section_id=uuid4(), content="Some  text.\n", metrics=["spam"])
+        second = MetricsRequest(section_id=uuid4(), content="Some text.", metrics=["spam"])
+        assert memo_key("metrics", first) == memo_key("metrics", second)
+
+    def test_key_includes_params(self):
+        """Test requests for different metrics do not share a key"""
+        first = MetricsRequest(section_id=uuid4(), content="Some text.", metrics=["spam"])
+        second = MetricsRequest(section_id=uuid4(), content="Some text.", metrics=["toxicity"])
+        assert memo_key("metrics", first) != memo_key("metrics", second)
+
+    @pytest.mark.parametrize("operation", ["metrics_batch", "summary"])
+    def test_unmemoizable_operations_rejected(self, operation: str):
+        """Test batch and sampled operations cannot be configured as memoized"""
+        with pytest.raises(ValidationError):
+            DatabaseSettings(memo_operations=["metrics", operation])
+
+
+class TestMemo:
+    """Tests for get_memo, put_memo and prune_memos"""
+
+    def test_put_and_get(self, test_db_session: Session):
+        """Test stored results are returned (as plain JSON values) for the same fingerprint only"""
+        key = memo_key("metrics", MetricsRequest(section_id=uuid4(), content="Some text."))
+        put_memo(test_db_session, key, {"spam": {"spam": numpy.float32(0.5)}}, fingerprint="a")
+
+        assert get_memo(test_db_session, key, fingerprint="a") == {"spam": {"spam": 0.5}}
+        assert get_memo(test_db_session, key, fingerprint="b") is None
+
+    def test_put_overwrites_stale_results(self, test_db_session: Session):
+        """Test results recomputed with new model settings replace the stale ones"""
+        key = memo_key("metrics", MetricsRequest(section_id=uuid4(), content="Some text."))
+        put_memo(test_db_session, key, {"spam": {"spam": 0.5}}, fingerprint="a")
+        put_memo(test_db_session, key, {"spam": {"spam": 0.7}}, fingerprint="b")
+
+        assert get_memo(test_db_session, key, fingerprint="b") == {"spam": {"spam": 0.7}}
+        assert get_memo(test_db_session, key, fingerprint="a") is None
+
+    def test_prune_memos(self, test_db_session: Session):
+        """Test pruning deletes results of other fingerprints"""
+        first = memo_key("metrics", MetricsRequest(section_id=uuid4(), content="First."))
+        second = memo_key("metrics", MetricsRequest(section_id=uuid4(), content="Second."))
+        put_memo(test_db_session, first, {}, fingerprint="a")
+        put_memo(test_db_session, second, {}, fingerprint="b")
+
+        assert prune_memos(test_db_session, fingerprint="b") == 1
+        assert get_memo(test_db_session, second, fingerprint="b") == {}
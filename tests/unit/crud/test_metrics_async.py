@@ -0,0 +1,65 @@
+"""Unit tests for the async app.crud.metrics CRUD operations."""
+
+import asyncio
+import pytest
+
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.pool import StaticPool
+
+from app.crud.metrics import (
+    add_metric_async,
+    delete_metric_async,
+    get_metric_async,
+    list_section_metrics_async,
+    upsert_metrics_async,
+)
+
+
+def run_with_session(test):
+    """Run an async test function with an in-memory aiosqlite session"""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            await test(session)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_add_get_delete_metric_async():
+    """Test a metric is created, overwritten, listed and deleted"""
+    section_id = uuid4()
+
+    async def test(session: AsyncSession):
+        await add_metric_async(session, section_id, "spam", 0.2)
+        metric = await add_metric_async(session, section_id, "spam", 0.7)
+        assert metric.value == 0.7
+        assert (await get_metric_async(session, section_id, "spam")).value == 0.7
+        assert len(await list_section_metrics_async(session, section_id)) == 1
+
+        assert await delete_metric_async(session, section_id, "spam")
+        assert not await delete_metric_async(session, section_id, "spam")
+        assert await get_metric_async(session, section_id, "spam") is None
+
+    run_with_session(test)
+
+
+def test_upsert_metrics_async():
+    """Test rows are bulk inserted and overwritten on conflict"""
+    section_id = uuid4()
+
+    async def test(session: AsyncSession):
+        rows = [dict(section_id=section_id, name=name, value=0.5) for name in ("spam", "toxicity")]
+        assert await upsert_metrics_async(session, rows) == 2
+        assert await upsert_metrics_async(session, [dict(section_id=section_id, name="spam", value=0.9)]) == 1
+
+        metrics = {m.name: m.value for m in await list_section_metrics_async(session, section_id)}
+        assert metrics == {"spam": 0.9, "toxicity": 0.5}
+
+    run_with_session(test)
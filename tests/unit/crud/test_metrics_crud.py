@@ -14,9 +14,11 @@ from app.crud.metrics import (
     delete_metric,
     list_section_metrics,
     handle_metrics_request,
+    persist_metrics_batch,
+    upsert_metrics,
 )
 from app.crud.tables import Metric
-from app.schemas.metrics import MetricsRequest
+from app.schemas.metrics import MetricsBatchRequest, MetricsRequest
 
 
 @pytest.fixture
@@ -278,3 +280,44 @@ class TestHandleMetricsRequest:
 
         # Assert: verify get_metrics was called with correct args
         mock_get_metrics.assert_called_once_with("Content", metrics_list)
+
+
+class TestPersistMetricsBatch:
+    """Tests for persist_metrics_batch function."""
+
+    def test_persist_metrics_batch(self, test_db_session: Session, sample_section_id: UUID):
+        """Test successful items are persisted together and failed items are reported"""
+        failed_section_id = uuid4()
+        request = MetricsBatchRequest(items=[
+            MetricsRequest(section_id=sample_section_id, content="Content", metrics=["toxicity"]),
+            MetricsRequest(section_id=failed_section_id, content="Content", metrics=["toxicity"]),
+        ])
+        results = [({"toxicity": {"toxicity": 0.1}}, None), (None, "ValueError: bad input")]
+        response = persist_metrics_batch(test_db_session, request, results)
+
+        assert [item["status"] for item in response["results"]] == ["created", "failed"]
+        assert response["results"][0]["results"] == {"toxicity": 0.1}
+        assert response["results"][1]["error"] == "ValueError: bad input"
+        assert len(list_section_metrics(test_db_session, sample_section_id)) == 1
+        assert list_section_metrics(test_db_session, failed_section_id) == []
+
+
+class TestUpsertMetrics:
+    """Tests for upsert_metrics function."""
+
+    def test_upsert_metrics(self, test_db_session: Session, sample_section_id: UUID):
+        """Test rows are inserted, then overwritten on conflict, in bulk"""
+        rows = [dict(section_id=sample_section_id, name=name, value=0.5) for name in ("spam", "toxicity")]
+        assert upsert_metrics(test_db_session, rows) == 2
+
+        rows = [dict(section_id=sample_section_id, name="spam", value=0.9), dict(section_id=uuid4(), name="spam", value=0.1)]
+        assert upsert_metrics(test_db_session, rows) == 2
+
+        result = {m.name: m.value for m in list_section_metrics(test_db_session, sample_section_id)}
+        assert result == {"spam": 0.9, "toxicity": 0.5}
+
+    def test_upsert_metrics_duplicates(self, test_db_session: Session, sample_section_id: UUID):
+        """Test the last value of a repeated (section_id, name) is kept"""
+        rows = [dict(section_id=sample_section_id, name="spam", value=v) for v in (0.1, 0.2)]
+        assert upsert_metrics(test_db_session, rows) == 1
+        assert get_metric(test_db_session, sample_section_id, "spam").value == 0.2
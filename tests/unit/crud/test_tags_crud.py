@@ -0,0 +1,88 @@
+"""Unit tests for app.crud.tags CRUD operations."""
+
+import pytest
+
+from uuid import uuid4
+
+from sqlmodel import Session, create_engine, select, SQLModel
+from sqlmodel.pool import StaticPool
+
+from app.crud.tables import SectionTag, Tag
+from app.crud.tags import list_section_tags, list_tag_sections, list_top_tags, persist_tags
+from app.schemas.tags import TagsRequest
+
+
+@pytest.fixture
+def test_db_session():
+    """Create an in-memory SQLite database for testing"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def tag_results(entities: list, keywords: list) -> dict:
+    """Return tag results with descending scores for each tag"""
+    tags = dict(entities=entities, keywords=keywords)
+    scores = {k: [1.0 - 0.1 * i for i in range(len(v))] for k, v in tags.items()}
+    return dict(tags=tags, scores=scores)
+
+
+class TestPersistTags:
+    """Tests for persist_tags"""
+
+    def test_persist_tags(self, test_db_session: Session):
+        """Test tags and section links are written with relevance and position"""
+        section_id = uuid4()
+        results = tag_results(["Paris", "France"], ["travel", "paris"])
+        response = persist_tags(test_db_session, TagsRequest(section_id=section_id, content="text"), results)
+
+        assert response["id"] == str(section_id)
+        assert response["results"] == results
+        links = list_section_tags(test_db_session, section_id)
+        assert sorted((l.position, l.tag_name, l.relevance) for l in links) == [
+            (0, "Paris", 1.0), (0, "travel", 1.0), (1, "France", 0.9), (1, "paris", 0.9)
+        ]
+        assert test_db_session.get(Tag, "travel").category == "keywords"
+
+    def test_persist_tags_replaces_links(self, test_db_session: Session):
+        """Test persisting again replaces a section's links and keeps shared tags"""
+        first, second = uuid4(), uuid4()
+        persist_tags(test_db_session, TagsRequest(section_id=first, content="text"), tag_results(["Paris"], ["travel"]))
+        persist_tags(test_db_session, TagsRequest(section_id=second, content="text"), tag_results(["Paris"], []))
+        persist_tags(test_db_session, TagsRequest(section_id=first, content="text"), tag_results([], ["food"]))
+
+        assert [l.tag_name for l in list_section_tags(test_db_session, first)] == ["food"]
+        assert [l.section_id for l in list_tag_sections(test_db_session, "Paris")] == [second]
+        assert len(test_db_session.exec(select(Tag)).all()) == 3
+        assert list_top_tags(test_db_session, "entities") == [("Paris", 1)]
+
+    def test_persist_tags_keeps_unrequested_categories(self, test_db_session: Session):
+        """Test persisting some tag types only replaces the links of those types"""
+        section_id = uuid4()
+        persist_tags(test_db_session, TagsRequest(section_id=section_id, content="text"), tag_results(["Paris"], ["travel"]))
+        results = dict(tags=dict(entities=["France"]), scores=dict(entities=[1.0]))
+        persist_tags(test_db_session, TagsRequest(section_id=section_id, content="text", tags=["entities"]), results)
+
+        assert sorted(l.tag_name for l in list_section_tags(test_db_session, section_id)) == ["France", "travel"]
+
+    def test_persist_tags_updates_category(self, test_db_session: Session):
+        """Test a tag takes the category it was last extracted under"""
+        section_id = uuid4()
+        persist_tags(test_db_session, TagsRequest(section_id=section_id, content="text"), tag_results(["Paris"], []))
+        persist_tags(test_db_session, TagsRequest(section_id=section_id, content="text"), tag_results([], ["Paris"]))
+
+        assert test_db_session.get(Tag, "Paris").category == "keywords"
+        assert [l.tag_name for l in list_section_tags(test_db_session, section_id)] == ["Paris"]
+
+    def test_persist_tags_without_section(self, test_db_session: Session):
+        """Test requests without a section are returned without persisting"""
+        response = persist_tags(test_db_session, TagsRequest(content="text"), tag_results(["Paris"], []))
+
+        assert response["status"] == "created"
+        assert "id" not in response
+        assert test_db_session.exec(select(SectionTag)).all() == []
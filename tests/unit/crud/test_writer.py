@@ -0,0 +1,70 @@
+"""Unit tests for the app.crud.writer write-behind queue."""
+
+import asyncio
+
+from app.crud.writer import WriteBehindQueue
+
+
+def test_queue_not_running():
+    """Verify rows are rejected (for a direct write) until the queue is started"""
+    queue = WriteBehindQueue("test", lambda session, rows: len(rows))
+    assert queue.put([1, 2]) is False
+
+
+def test_queue_flush_on_size_and_drain():
+    """Verify a full batch is flushed early and the remainder is flushed on drain"""
+    batches = []
+
+    def write(session, rows):
+        batches.append(list(rows))
+        return len(rows)
+
+    async def run():
+        queue = WriteBehindQueue("test", write, batch_size=2, interval=60)
+        queue.start()
+        assert queue.put([1, 2])
+        await asyncio.sleep(0.1)
+        assert queue.put([3])
+        await queue.drain()
+        return queue
+
+    queue = asyncio.run(run())
+    assert batches == [[1, 2], [3]]
+    assert not queue.running
+
+
+def test_queue_retry_rows_on_failure():
+    """Verify rows of a failed flush are retried one at a time"""
+    calls = []
+
+    def write(session, rows):
+        calls.append(list(rows))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return len(rows)
+
+    queue = WriteBehindQueue("test", write)
+    queue._rows = [(1, 0), (2, 0)]
+    assert queue.flush() == 2
+    assert calls == [[1, 2], [1], [2]]
+    assert queue.flush() == 0
+
+
+def test_queue_dead_letter_failing_row():
+    """Verify a row failing every write is dead-lettered after max_attempts while the others are written"""
+    written = []
+
+    def write(session, rows):
+        if "bad" in rows:
+            raise RuntimeError("foreign key constraint failed")
+        written.extend(rows)
+        return len(rows)
+
+    queue = WriteBehindQueue("test", write, max_attempts=2)
+    queue._rows = [(1, 0), ("bad", 0), (2, 0)]
+    assert queue.flush() == 2
+    assert queue._rows == [("bad", 1)]
+    assert queue.flush() == 0
+    assert queue._rows == []
+    assert list(queue.dead_letters) == ["bad"]
+    assert written == [1, 2]
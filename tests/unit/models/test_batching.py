@@ -0,0 +1,79 @@
+"""Unit tests for the app.models.batching micro-batcher."""
+
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.batching import BATCHERS, MicroBatcher, stop_batcher
+from app.models.registry import model_key
+
+
+def test_batcher_merges_concurrent_inputs():
+    """Verify concurrent inputs share batches and each caller gets its own result"""
+    batches = []
+
+    def batch_function(items: list) -> list:
+        batches.append(list(items))
+        return [len(item) for item in items]
+
+    batcher = MicroBatcher("test", batch_function, max_batch_size=8, max_wait_ms=50)
+    items = ["a" * n for n in range(1, 9)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(batcher, items))
+
+    assert results == list(range(1, 9))
+    assert len(batches) < len(items)
+    assert all(len(batch) <= 8 for batch in batches)
+
+    stats = batcher.stats()
+    assert stats["items"] == 8
+    assert 0.0 < stats["fill_ratio"] <= 1.0
+
+
+def test_batcher_map_order():
+    """Verify mapped inputs are returned in order"""
+    batcher = MicroBatcher("test", lambda items: [i * 2 for i in items], max_batch_size=3, max_wait_ms=1)
+    assert batcher.map([1, 2, 3, 4, 5]) == [2, 4, 6, 8, 10]
+
+
+def test_batcher_failure():
+    """Verify a failed batch raises for every input of the batch"""
+    batcher = MicroBatcher("test", lambda items: 1 / 0, max_batch_size=2, max_wait_ms=1)
+    with pytest.raises(ZeroDivisionError):
+        batcher("input")
+    assert batcher.stats()["failed"] == 1
+
+
+def test_batcher_result_count_mismatch():
+    """Verify every input fails when the batch function returns the wrong number of results"""
+    batcher = MicroBatcher("test", lambda items: items[:-1], max_batch_size=2, max_wait_ms=50)
+    futures = [batcher.submit(1), batcher.submit(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="results for"):
+            future.result(timeout=5)
+    assert batcher.stats()["failed"] == 1
+
+
+def test_batcher_stop():
+    """Verify a stopped batcher finishes queued inputs, exits its thread and restarts on demand"""
+    batcher = MicroBatcher("test", lambda items: [i * 2 for i in items], max_batch_size=2, max_wait_ms=1)
+    assert batcher(1) == 2
+    worker = batcher._worker
+    batcher.stop()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert batcher(2) == 4
+
+
+def test_stop_batcher_on_eviction():
+    """Verify evicting a model stops and unregisters its micro-batcher"""
+    batcher = MicroBatcher("test", lambda items: items, max_batch_size=2, max_wait_ms=1)
+    BATCHERS["test"] = batcher
+    batcher("input")
+    worker = batcher._worker
+
+    stop_batcher(model_key("test", top_n=3))
+    worker.join(timeout=5)
+    assert "test" not in BATCHERS
+    assert not worker.is_alive()
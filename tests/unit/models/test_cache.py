@@ -0,0 +1,108 @@
+"""Unit tests for the app.models.cache inference result cache."""
+
+import numpy
+import pytest
+
+from app.models.cache import INFERENCE_CACHE, GenerationCache, InferenceCache, cache_key, cached_inference
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Reset the shared inference cache between tests"""
+    INFERENCE_CACHE.clear()
+    yield
+    INFERENCE_CACHE.clear()
+
+
+def test_cache_key():
+    """Verify keys ignore whitespace but not model ids, arguments or content"""
+    key = cache_key("model", "Some  content\n", top_n=3)
+    assert key == cache_key("model", "Some content", top_n=3)
+    assert key != cache_key("other", "Some content", top_n=3)
+    assert key != cache_key("model", "Some content", top_n=4)
+    assert key != cache_key("model", "some content", top_n=3)
+
+
+def test_cache_key_rejects_unserializable_arguments():
+    """Verify arguments without an exact JSON encoding are rejected rather than keyed by str()"""
+    with pytest.raises(TypeError):
+        cache_key("model", "Some content", weights=numpy.zeros(2000))
+
+
+def test_cache_returns_copies():
+    """Verify mutating a stored or returned result does not change later hits"""
+    cache = InferenceCache(max_size=2)
+    result = {"score": [1.0]}
+    cache.put("model", "a", result)
+    result["score"].append(2.0)
+    cache.get("model", "a")[1]["score"].append(3.0)
+
+    assert cache.get("model", "a") == (True, {"score": [1.0]})
+
+
+def test_cache_eviction():
+    """Verify the least recently used result is evicted and counted"""
+    cache = InferenceCache(max_size=2)
+    cache.put("model", "a", 1)
+    cache.put("model", "b", 2)
+    cache.get("model", "a")
+    cache.put("model", "c", 3)
+
+    assert cache.get("model", "b") == (False, None)
+    assert cache.get("model", "a") == (True, 1)
+    assert cache.stats()["models"]["model"] == dict(hits=2, misses=1, evictions=1)
+
+
+def test_cache_eviction_owner():
+    """Verify evictions are counted against the model whose result was evicted"""
+    cache = InferenceCache(max_size=1)
+    cache.put("first", "a", 1)
+    cache.put("second", "b", 2)
+
+    assert cache.stats()["models"]["first"]["evictions"] == 1
+    assert "second" not in cache.stats()["models"]
+
+
+def test_cached_inference():
+    """Verify repeated content is served from the cache"""
+    calls = []
+
+    @cached_inference("mock")
+    def score(content: str) -> dict:
+        calls.append(content)
+        return {'score': len(content)}
+
+    assert score("repeated text") == score("repeated  text") == {'score': 13}
+    assert calls == ["repeated text"]
+
+
+def test_cached_inference_batch():
+    """Verify list inputs only compute cache misses and keep the input order"""
+    calls = []
+
+    @cached_inference("mock-embedding")
+    def embed(content: list) -> numpy.ndarray:
+        calls.append(list(content))
+        return numpy.array([[len(s), 0.0] for s in content])
+
+    embed(["a", "bb"])
+    result = embed(["ccc", "a", "bb"])
+
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert result.tolist() == [[3, 0.0], [1, 0.0], [2, 0.0]]
+
+
+def test_generation_cache(tmp_path):
+    """Verify generations persist across cache instances and the least recently used is evicted"""
+    path = str(tmp_path / "generations.db")
+    cache = GenerationCache(path, max_size=2)
+    cache.put("model", "a", ["first"])
+    cache.put("model", "b", ["second"])
+    cache.get("a")
+    cache.put("model", "c", ["third", "fourth"])
+
+    reopened = GenerationCache(path, max_size=2)
+    assert reopened.get("b") is None
+    assert reopened.get("a") == ["first"]
+    assert reopened.get("c") == ["third", "fourth"]
+    assert reopened.stats() == dict(size=2, max_size=2)
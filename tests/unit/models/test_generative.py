@@ -0,0 +1,153 @@
+"""Unit tests for the app.models.generative helpers."""
+
+import queue
+import threading
+
+import pytest
+import torch
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from transformers import BatchEncoding
+
+from app.models.generative import SeededSampling, get_generative_model, stream_generation
+
+
+class QueueStreamer:
+    """A minimal text streamer yielding queued text until it is ended"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def put(self, text: str):
+        self.queue.put(text)
+
+    def end(self):
+        self.queue.put(None)
+
+    def __iter__(self):
+        while (text := self.queue.get(timeout=5)) is not None:
+            yield text
+
+
+def test_stream_generation():
+    """Verify streamed text is yielded in order"""
+    streamer = QueueStreamer()
+
+    def generate(texts: list[str]):
+        for text in texts:
+            streamer.put(text)
+        streamer.end()
+
+    assert list(stream_generation(streamer, generate, ["a", "b"])) == ["a", "b"]
+
+
+def test_stream_generation_error():
+    """Verify a failed generation ends the stream and re-raises its error in the consumer"""
+    streamer = QueueStreamer()
+
+    def generate():
+        streamer.put("partial")
+        raise RuntimeError("out of memory")
+
+    chunks = []
+    with pytest.raises(RuntimeError, match="out of memory"):
+        for chunk in stream_generation(streamer, generate):
+            chunks.append(chunk)
+    assert chunks == ["partial"]
+
+
+class WordTokenizer:
+    """A whitespace tokenizer encoding each word as its length, left-padding with 0"""
+    pad_token = "<pad>"
+    pad_token_id = 0
+    padding_side = "right"
+
+    def __call__(self, content, return_tensors: str="pt", padding: bool=False, add_special_tokens: bool=True):
+        content = [content] if isinstance(content, str) else content
+        ids = [[len(word) for word in text.split()] for text in content]
+        length = max(len(row) for row in ids)
+        input_ids = [[0] * (length - len(row)) + row for row in ids]
+        attention_mask = [[0] * (length - len(row)) + [1] * len(row) for row in ids]
+        return BatchEncoding(dict(input_ids=torch.tensor(input_ids), attention_mask=torch.tensor(attention_mask)))
+
+    def batch_decode(self, sequences, skip_special_tokens: bool=True) -> list[str]:
+        return [" ".join(str(int(i)) for i in row) for row in sequences]
+
+
+class RecordingCache:
+    """A key/value cache stand-in recording how its batch rows were expanded"""
+
+    def __init__(self):
+        self.repeats = None
+
+    def batch_repeat_interleave(self, repeats: int):
+        self.repeats = repeats
+
+
+def test_generate_with_prefix_batches_suffixes():
+    """Verify every suffix is generated in one call over an expanded copy of the prefix cache"""
+    prefix_cache = RecordingCache()
+    model = MagicMock(device="cpu")
+    model.return_value = SimpleNamespace(past_key_values=prefix_cache)
+
+    def generate(input_ids, num_return_sequences: int=1, **kwargs):
+        input_ids = input_ids.repeat_interleave(num_return_sequences, dim=0)
+        return torch.cat([input_ids, torch.full((input_ids.shape[0], 1), 7)], dim=-1)
+    model.generate.side_effect = generate
+
+    with patch("app.models.generative.AutoTokenizer.from_pretrained", return_value=WordTokenizer()), \
+            patch("app.models.generative.AutoModelForCausalLM.from_pretrained", return_value=model):
+        get_model_inference = get_generative_model.__wrapped__()
+        sequences = get_model_inference(["a bb", "ccc"], prefix="pre fix", num_return_sequences=2, deterministic=False)
+
+    assert sequences == [["7", "7"], ["7", "7"]]
+    assert model.generate.call_count == 1
+
+    kwargs = model.generate.call_args.kwargs
+    assert kwargs["cache_implementation"] is None
+    assert kwargs["input_ids"].tolist() == [[3, 3, 1, 2], [3, 3, 0, 3]]
+    assert kwargs["attention_mask"].tolist() == [[1, 1, 1, 1], [1, 1, 0, 1]]
+    assert kwargs["past_key_values"] is not prefix_cache
+    assert kwargs["past_key_values"].repeats == 4
+    assert prefix_cache.repeats is None
+
+
+def test_seeded_sampling_ignores_global_generator():
+    """Verify seeded sampling only depends on its seed and leaves a single possible token per row"""
+    scores = torch.randn(2, 16)
+    first = SeededSampling(seed=3, temperature=0.7, top_k=5, top_p=0.9)(None, scores.clone())
+    torch.manual_seed(0)
+    torch.rand(100)
+    second = SeededSampling(seed=3, temperature=0.7, top_k=5, top_p=0.9)(None, scores.clone())
+
+    assert torch.equal(first, second)
+    assert (first == 0).sum(dim=-1).tolist() == [1, 1]
+
+
+def test_generation_is_not_serialized():
+    """Verify unseeded and seeded generations run concurrently, seeded ones with a private sampler"""
+    barrier = threading.Barrier(4, timeout=5)
+    model = MagicMock(device="cpu")
+    model.generation_config = SimpleNamespace(temperature=None, top_k=None, top_p=None)
+
+    def generate(input_ids, num_return_sequences: int=1, **kwargs):
+        barrier.wait()
+        return torch.cat([input_ids, torch.full((input_ids.shape[0], 1), 7)], dim=-1)
+    model.generate.side_effect = generate
+
+    cache = MagicMock()
+    cache.get.return_value = None
+    with patch("app.models.generative.AutoTokenizer.from_pretrained", return_value=WordTokenizer()), \
+            patch("app.models.generative.AutoModelForCausalLM.from_pretrained", return_value=model), \
+            patch("app.models.generative.GENERATION_CACHE", cache):
+        get_model_inference = get_generative_model.__wrapped__()
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(get_model_inference, "a b", deterministic=i % 2 == 0) for i in range(4)]
+            assert all(future.result() == ["7"] for future in futures)
+
+    seeded = [call.kwargs for call in model.generate.call_args_list if "logits_processor" in call.kwargs]
+    assert len(seeded) == 2
+    assert all(isinstance(kwargs["logits_processor"][-1], SeededSampling) for kwargs in seeded)
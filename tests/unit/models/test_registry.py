@@ -0,0 +1,179 @@
+"""Unit tests for the app.models.registry model registry."""
+
+import threading
+
+import pytest
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.models.registry import ModelRegistry, model_key
+
+
+@pytest.fixture
+def registry() -> ModelRegistry:
+    """Return a registry with two cheap mock models of a fixed size"""
+    registry = ModelRegistry(memory_budget=100, idle_seconds=0.0)
+    registry.register("first", lambda: object())
+    registry.register("second", lambda: object())
+    registry.register("scaled", lambda scale=1: [scale])
+    return registry
+
+
+def set_size(registry: ModelRegistry, key: str, size: int):
+    """Override the measured resident size of a loaded model"""
+    registry._entries[key].size = size
+
+
+def test_registry_lazy(registry: ModelRegistry):
+    """Verify models are only loaded on first use and then reused"""
+    assert registry.stats() == {}
+    first = registry.get("first")
+    assert registry.get("first") is first
+    assert set(registry.stats().keys()) == {"first"}
+
+
+def test_registry_arguments(registry: ModelRegistry):
+    """Verify loader arguments are part of the registry key"""
+    assert registry.get("scaled", scale=2) == [2]
+    assert registry.get("scaled", scale=3) == [3]
+    assert set(registry.stats().keys()) == {model_key("scaled", scale=2), model_key("scaled", scale=3)}
+
+
+def test_registry_unknown(registry: ModelRegistry):
+    """Verify an unregistered model name raises an error"""
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_registry_eviction(registry: ModelRegistry):
+    """Verify the least recently used model is evicted when over budget"""
+    registry.get("first")
+    set_size(registry, "first", 80)
+    registry.get("second")
+    set_size(registry, "second", 80)
+    registry._enforce_budget(exclude="second")
+
+    assert set(registry.stats().keys()) == {"second"}
+    assert registry.resident_size() == 80
+
+
+def test_registry_pinned(registry: ModelRegistry):
+    """Verify preloaded models are never evicted"""
+    registry.pinned = {"first"}
+    registry.preload()
+    set_size(registry, "first", 80)
+    registry.get("second")
+    set_size(registry, "second", 80)
+    registry._enforce_budget()
+
+    assert "first" in registry.stats()
+
+
+def test_registry_idle(registry: ModelRegistry):
+    """Verify recently used models are not evicted"""
+    registry.idle_seconds = 60.0
+    registry.get("first")
+    set_size(registry, "first", 200)
+    registry.get("second")
+    registry._enforce_budget(exclude="second")
+
+    assert set(registry.stats().keys()) == {"first", "second"}
+
+
+def test_registry_load_does_not_block_lookups(registry: ModelRegistry):
+    """Verify a slow load only blocks loads of the same model"""
+    started, release = threading.Event(), threading.Event()
+
+    def slow_loader():
+        started.set()
+        release.wait(timeout=5)
+        return object()
+
+    registry.register("slow", slow_loader)
+    first = registry.get("first")
+    thread = threading.Thread(target=registry.get, args=("slow",))
+    thread.start()
+    started.wait(timeout=5)
+
+    # Loaded and unrelated models are returned while the slow load is running
+    assert registry.get("first") is first
+    assert registry.get("second") is not None
+    release.set()
+    thread.join(timeout=5)
+    assert "slow" in registry.stats()
+
+
+def test_registry_nested_sizes(registry: ModelRegistry):
+    """Verify models loaded by another loader are dependencies excluded from its size"""
+    registry.register("parent", lambda: [registry.get("first")])
+    rss = iter([0, 100, 150, 400])
+    memory_info = lambda: SimpleNamespace(rss=next(rss))
+
+    with patch("app.models.registry.psutil.Process", return_value=SimpleNamespace(memory_info=memory_info)):
+        registry.get("parent")
+
+    stats = registry.stats()
+    assert stats["first"]["size"] == 50
+    assert stats["parent"] == dict(size=350, idle_seconds=stats["parent"]["idle_seconds"], dependencies=["first"])
+
+
+def test_registry_eviction_skips_held_models(registry: ModelRegistry):
+    """Verify dependencies of loaded models and models held by callers are not evicted"""
+    registry.register("parent", lambda: [registry.get("first")])
+    registry.get("parent")
+    held = registry.get("second")
+    for key in ("first", "parent", "second"):
+        set_size(registry, key, 80)
+    registry._enforce_budget(exclude="parent")
+
+    assert set(registry.stats().keys()) == {"first", "parent", "second"}
+
+    # Once the caller releases the model it can be evicted
+    del held
+    registry._enforce_budget(exclude="parent")
+    assert set(registry.stats().keys()) == {"first", "parent"}
+
+
+def test_registry_eviction_hooks(registry: ModelRegistry):
+    """Verify eviction hooks are called with the evicted model key"""
+    evicted = []
+    registry.add_eviction_hook(evicted.append)
+    registry.get("first")
+
+    assert registry.evict("first")
+    assert not registry.evict("first")
+    assert evicted == ["first"]
+
+
+def test_registry_preload_arguments(registry: ModelRegistry):
+    """Verify models are preloaded with the arguments (and registry key) requests use"""
+    registry.register("scaled", lambda scale=1: [scale], scale=2)
+    registry.preload(["scaled"])
+
+    assert set(registry.stats().keys()) == {model_key("scaled", scale=2)}
+    assert registry.get("scaled", scale=2) == [2]
+    assert set(registry.stats().keys()) == {model_key("scaled", scale=2)}
+
+
+def test_registry_eviction_hooks_run_unlocked(registry: ModelRegistry):
+    """Verify budget evictions run their hooks after releasing the registry lock"""
+    acquired = []
+
+    def try_lock():
+        acquired.append(registry._lock.acquire(timeout=1))
+        if acquired[-1]:
+            registry._lock.release()
+
+    def hook(key: str):
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+
+    registry.add_eviction_hook(hook)
+    registry.get("first")
+    set_size(registry, "first", 200)
+    registry.get("second")
+
+    assert set(registry.stats().keys()) == {"second"}
+    assert acquired == [True]
@@ -0,0 +1,56 @@
+"""Unit tests for the app.models.runtime classifier helpers."""
+
+import numpy
+import pytest
+
+from types import SimpleNamespace
+
+from app.models.runtime import DEFAULT_WINDOW_SIZE, SequenceClassifier, reduce_windows, softmax, sigmoid, top_label_scores
+from app.settings import EncoderSettings
+
+
+def test_softmax():
+    """Verify softmax rows sum to one and preserve ordering"""
+    logits = numpy.array([[1.0, 2.0, 3.0], [1000.0, 1000.0, 1000.0]])
+    scores = softmax(logits)
+    assert scores.sum(axis=-1) == pytest.approx([1.0, 1.0])
+    assert scores[0].argmax() == 2
+    assert scores[1] == pytest.approx([1 / 3] * 3)
+
+
+@pytest.mark.parametrize("problem_type, num_labels, expected", [
+    ("multi_label_classification", 2, sigmoid(numpy.array([2.0]))[0]),
+    ("single_label_classification", 2, softmax(numpy.array([0.0, 2.0]))[1]),
+    (None, 1, sigmoid(numpy.array([2.0]))[0]),
+])
+def test_top_label_scores(problem_type: str, num_labels: int, expected: float):
+    """Verify the pipeline activation is selected from the model config"""
+    config = SimpleNamespace(problem_type=problem_type, num_labels=num_labels)
+    logits = numpy.array([[0.0, 2.0]]) if num_labels == 2 else numpy.array([[2.0]])
+    assert top_label_scores(logits, config)[0] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("reducer, expected", [
+    ("max", [0.9, 0.2]),
+    ("mean", [0.5, 0.2]),
+    ("weighted", [(0.1 * 512 + 0.9 * 128) / 640, 0.2]),
+])
+def test_reduce_windows(reducer: str, expected: list):
+    """Verify window scores are aggregated per content by the configured reducer"""
+    scores = numpy.array([0.1, 0.9, 0.2])
+    mapping = numpy.array([0, 0, 1])
+    lengths = numpy.array([512, 128, 40])
+    assert reduce_windows(scores, mapping, lengths, 2, reducer) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("model_max_length, window_size, window_stride, expected", [
+    (512, 0, 128, (512, 128)),
+    (512, 256, 200, (256, 128)),
+    (int(1e30), 0, 64, (DEFAULT_WINDOW_SIZE, 64)),
+])
+def test_classifier_windows(model_max_length: int, window_size: int, window_stride: int, expected: tuple):
+    """Verify window sizes are bounded by the model maximum and overlaps by half a window"""
+    tokenizer = SimpleNamespace(model_max_length=model_max_length)
+    settings = EncoderSettings(window_size=window_size, window_stride=window_stride)
+    classifier = SequenceClassifier("model", tokenizer, config=None, model=object(), settings=settings)
+    assert (classifier.window_size, classifier.window_stride) == expected
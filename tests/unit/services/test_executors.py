@@ -0,0 +1,75 @@
+"""Unit tests for the app.services.executors operation executors."""
+
+import asyncio
+import threading
+import time
+
+from app.services.executors import OperationExecutor
+from app.settings import ExecutorSettings
+
+
+def test_executor_run():
+    """Verify operations run off the event loop thread and are counted"""
+    executor = OperationExecutor("test", ExecutorSettings(max_workers=2))
+    result = asyncio.run(executor.run(threading.get_ident))
+    executor.shutdown()
+
+    assert result != threading.get_ident()
+    stats = executor.stats()
+    assert stats["submitted"] == stats["completed"] == 1
+    assert stats["in_flight"] == stats["failed"] == 0
+
+
+def test_executor_concurrency_limit():
+    """Verify operations beyond the concurrency limit wait in the queue"""
+    executor = OperationExecutor("test", ExecutorSettings(max_workers=2, max_concurrency=1))
+
+    async def run_all():
+        return await asyncio.gather(*[executor.run(time.sleep, 0.05) for _ in range(3)])
+
+    asyncio.run(run_all())
+    executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["completed"] == 3
+    assert stats["queue_seconds_max"] >= 0.09
+
+
+def test_executor_failure():
+    """Verify failed operations raise and are counted"""
+    executor = OperationExecutor("test", ExecutorSettings())
+
+    async def run_failure():
+        try:
+            await executor.run(int, "not a number")
+        except ValueError:
+            return True
+
+    assert asyncio.run(run_failure())
+    executor.shutdown()
+    assert executor.stats()["failed"] == 1
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_executor_stream():
+    """Verify streamed items are produced on the pool while a concurrency slot is held"""
+    executor = OperationExecutor("test", ExecutorSettings(max_workers=2, max_concurrency=1))
+
+    def generate(n: int):
+        for _ in range(n):
+            yield threading.get_ident()
+
+    async def consume():
+        items = []
+        async for item in executor.stream(generate, 2):
+            assert executor._semaphore.locked()
+            items.append(item)
+        return items
+
+    items = asyncio.run(consume())
+    executor.shutdown()
+
+    assert len(items) == 2 and threading.get_ident() not in items
+    stats = executor.stats()
+    assert stats["submitted"] == stats["completed"] == 1
+    assert stats["in_flight"] == 0